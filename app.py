@@ -2,10 +2,20 @@ import streamlit as st
 import os
 import tempfile
 import sys
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Add the modules directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Warm the Lisp program caches so template previews skip parsing
+try:
+    from utils.lisp_templates import precompile_templates
+    precompile_templates()
+except Exception:
+    logger.exception("Precompiling Lisp templates failed")
+
 # Import the lintel and sunshade modules specifically (these are the ones the user wants)
 try:
     from modules.lintel import page_lintel
@@ -0,0 +1,30 @@
+"""
+Shared Test Setup
+Keeps the disk program cache off and provides a sample Lisp program
+"""
+
+import os
+import pytest
+
+# Keep the opt-in disk cache off; its test uses a temporary directory
+os.environ["LISP_CACHE_DIR"] = ""
+
+
+SAMPLE_CODE = """
+(def size 50)
+(def spacing 60)
+(fill #ff0000)
+(repeat 5 (do
+    (circle (+ 50 (* i spacing)) 100 (/ size 2))
+))
+(defn draw-square (x y s)
+    (rect x y s s))
+(fill #00ff00)
+(draw-square 50 200 size)
+"""
+
+
+@pytest.fixture
+def sample_code():
+    """Loops, a user function and color changes"""
+    return SAMPLE_CODE
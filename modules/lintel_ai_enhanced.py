@@ -5,11 +5,11 @@ Combines Week 1 features with AI code generation
 
 import streamlit as st
 from components.monaco_editor import monaco_editor
-from components.canvas_preview import canvas_preview
 from components.ai_panel import ai_generator_panel, show_ai_examples
 from utils.lisp_interpreter import LispInterpreter
 from utils.lisp_templates import get_template, list_templates
 from modules.lintel import page_lintel as original_lintel, generate_lintel_dxf
+from modules.lintel_enhanced import show_preview
 import numpy as np
 
 def page_lintel_ai_enhanced():
@@ -129,7 +129,7 @@ def code_mode_interface():
                 commands = interpreter.execute(st.session_state.get('lintel_code', ''))
                 
                 # Display canvas
-                canvas_preview(commands, width=600, height=400, key="lintel_canvas")
+                show_preview(commands, width=600, height=400, key="lintel_canvas")
                 
                 # Show variables
                 with st.expander("🔍 Variables", expanded=False):
@@ -193,7 +193,7 @@ def ai_mode_interface():
                 interpreter = LispInterpreter()
                 commands = interpreter.execute(code)
                 
-                canvas_preview(commands, width=700, height=500, key="ai_canvas")
+                show_preview(commands, width=700, height=500, key="ai_canvas")
                 
                 # Show design info
                 st.markdown("---")
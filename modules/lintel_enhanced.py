@@ -13,6 +13,34 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from components.monaco_editor import monaco_editor, code_editor_simple
 from components.canvas_preview import canvas_preview, canvas_preview_simple
 from utils.lisp_interpreter import LispInterpreter
+from utils.lisp_dxf import script_to_dxf
+from utils.svg_renderer import get_svg_renderer, use_svg_preview
+from utils.level_of_detail import LevelOfDetail
+from utils.spatial_index import SpatialIndex
+
+
+def show_preview(commands, width: int, height: int, key=None,
+                 zoom: float = 1.0, center=(0.5, 0.5)):
+    """
+    Show drawing commands as a cached SVG (LISP_PREVIEW=svg) or on the canvas
+    
+    When zoomed in, only commands the spatial index finds in the visible
+    part of the drawing are kept. Detail below a pixel at the preview's
+    scale is dropped next, so dense drawings send only what can be seen.
+    """
+    viewport = None
+    if zoom > 1:
+        index = SpatialIndex(commands)
+        viewport = index.zoom_viewport(zoom, center)
+        if viewport is not None:
+            commands = index.visible(*viewport)
+    commands = LevelOfDetail().fit(commands, width, height, viewport=viewport)
+    if use_svg_preview():
+        svg = get_svg_renderer().render(commands, width=width, height=height,
+                                        background="#1e1e1e", viewport=viewport)
+        st.markdown(svg, unsafe_allow_html=True)
+    else:
+        canvas_preview(commands, width=width, height=height, key=key)
 
 
 def page_lintel_enhanced():
@@ -72,7 +100,7 @@ def show_form_mode():
         # Execute and preview
         interpreter = LispInterpreter()
         commands = interpreter.execute(code)
-        canvas_preview(commands, width=400, height=300)
+        show_preview(commands, width=400, height=300)
     
     # Show generated code
     with st.expander("📄 View Generated Code"):
@@ -193,8 +221,20 @@ def show_code_mode():
             interpreter = LispInterpreter()
             commands = interpreter.execute(st.session_state.lintel_code)
             
+            # Zoom into part of the drawing
+            col_zoom, col_x, col_y = st.columns(3)
+            with col_zoom:
+                zoom = st.slider("Zoom", 1.0, 10.0, 1.0, 0.5, key="lintel_zoom")
+            with col_x:
+                pan_x = st.slider("Pan X", 0.0, 1.0, 0.5, 0.05, key="lintel_pan_x",
+                                  disabled=zoom == 1.0)
+            with col_y:
+                pan_y = st.slider("Pan Y", 0.0, 1.0, 0.5, 0.05, key="lintel_pan_y",
+                                  disabled=zoom == 1.0)
+            
             # Show preview
-            canvas_preview(commands, width=600, height=400, key="lintel_canvas")
+            show_preview(commands, width=600, height=400, key="lintel_canvas",
+                         zoom=zoom, center=(pan_x, pan_y))
             
             # Show variables
             with st.expander("📊 Variables"):
@@ -248,8 +288,17 @@ def show_code_mode():
     # Generate DXF button
     st.markdown("---")
     if st.button("📐 Generate DXF Drawing", type="primary"):
-        st.info("DXF generation will be implemented in Week 2!")
-        st.code("Coming soon: Convert your Lisp design to production DXF", language="text")
+        try:
+            dxf_content = script_to_dxf(st.session_state.get('lintel_code', ''), hatch_fills=True)
+            st.success("DXF drawing generated")
+            st.download_button(
+                label="Download DXF File",
+                data=dxf_content,
+                file_name="lintel_beam.dxf",
+                mime="application/dxf"
+            )
+        except Exception as e:
+            st.error(f"DXF generation failed: {str(e)}")
 
 
 def generate_lintel_code(span, width, depth, bearing, num_bars, bar_dia):
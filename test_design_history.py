@@ -0,0 +1,27 @@
+"""
+Test Design History
+Tests saving design snapshots
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.design_history import DesignHistory
+
+
+def test_snapshots_keep_svg_thumbnails():
+    """Snapshots saved with drawing commands get an SVG thumbnail"""
+    code = """
+    (fill #ccc) (rect 0 0 1000 200)
+    (stroke #333) (repeat 100 (line (* i 10) 0 (* i 10) 200))
+    (text 500 240 "A < B" 12)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        history = DesignHistory(os.path.join(directory, "history.db"))
+        commands = AdvancedLispInterpreter().execute(code)
+        history.save_snapshot("p1", code, metadata={'commands': commands})
+        history.save_snapshot("p1", code + " ")
+        assert history.get_thumbnail("p1").startswith('<svg')
@@ -0,0 +1,31 @@
+"""
+Test Draw List
+Tests columnar storage of drawing commands
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.draw_list import DrawList
+
+
+def test_drawlist_matches_commands(sample_code):
+    """The columnar draw list yields the same commands as execute()"""
+    expected = AdvancedLispInterpreter().execute(sample_code)
+    drawlist = AdvancedLispInterpreter().execute_drawlist(sample_code)
+    
+    assert list(drawlist) == expected
+    assert drawlist.count('circle') == 5
+    assert drawlist.columns('circle')['x'].tolist() == [50, 110, 170, 230, 290]
+    
+    # Ints and floats in one column keep their own types
+    mixed = [{'type': 'rect', 'x': 100, 'y': 0.5, 'width': 2.5, 'height': 10, 'color': '#ccc'},
+             {'type': 'rect', 'x': 12.5, 'y': 1, 'width': 3, 'height': 10, 'color': '#ccc'}]
+    for cmd, expected_cmd in zip(DrawList(mixed), mixed):
+        assert cmd == expected_cmd
+        assert {k: type(v) for k, v in cmd.items()} == {k: type(v) for k, v in expected_cmd.items()}
+    code = "(repeat 20 (rect (* i 0.5) 0 1 1)) (rect 100 0 1 1)"
+    assert [type(cmd['x']) for cmd in AdvancedLispInterpreter().execute_drawlist(code)] == \
+        [type(cmd['x']) for cmd in AdvancedLispInterpreter().execute(code)]
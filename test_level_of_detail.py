@@ -0,0 +1,41 @@
+"""
+Test Level of Detail
+Tests decimating drawings for the preview scale
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.level_of_detail import LevelOfDetail
+
+
+def test_level_of_detail_merges_dense_primitives():
+    """Sub-pixel stirrups merge and straight polylines collapse at low zoom"""
+    code = """
+    (stroke #333)
+    (repeat 1000 (rect (* i 0.5) 0 10 300))
+    (for k 0 50 (line (* k 10) 500 (* (+ k 1) 10) 500))
+    (text 0 -20 "STIRRUPS" 12)
+    """
+    commands = AdvancedLispInterpreter().execute(code)
+    lod = LevelOfDetail(tolerance=1.0)
+    
+    detailed = lod.apply(commands, scale=10.0)
+    assert len([cmd for cmd in detailed if cmd['type'] == 'rect']) == 1000
+    reduced = lod.apply(commands, scale=0.1)
+    assert len([cmd for cmd in reduced if cmd['type'] == 'rect']) == 50
+    lines = [cmd for cmd in reduced if cmd['type'] == 'line']
+    assert [(line['x1'], line['x2']) for line in lines] == [(0, 500)]
+    assert reduced[-1]['text'] == 'STIRRUPS'
+    assert lod.last_stats['output'] == len(reduced)
+    
+    # A 400 x 300 px preview is bounded by the drawing's height, label to lines
+    fitted = lod.fit(commands, 400, 300)
+    assert fitted == lod.apply(commands, scale=300 / (501 + 32 + 2 * 10))
+    assert len(fitted) < len(commands)
+    
+    # Zoomed in, the scale is the viewport's, not the whole drawing's
+    viewport = (0, 0, 100, 600)
+    assert lod.fit(commands, 400, 300, viewport=viewport) == lod.apply(commands, scale=300 / 600)
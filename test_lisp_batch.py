@@ -0,0 +1,74 @@
+"""
+Test Batch Execution
+Tests running scripts, sweeps and template rows in worker processes
+"""
+
+import sys
+import os
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.lisp_batch import execute_batch, execute_sweep, instantiate_template
+from utils.draw_list import DrawList
+from utils.template_engine import Template
+
+
+def test_batch_execution_keeps_order():
+    """Batch jobs run in worker processes and come back in input order"""
+    jobs = [("(def w {{w}}) (rect 0 0 w 10)", {'w': w}) for w in range(1, 9)]
+    jobs.append("(repeat 100000000 (text i 0 \"x\"))")
+    results = execute_batch(jobs, max_workers=2, max_steps=1000)
+    
+    assert len(results) == len(jobs)
+    for w, result in enumerate(results[:-1], 1):
+        assert isinstance(result, DrawList)
+        assert [cmd['width'] for cmd in result] == [w]
+    assert list(results[-1]) == [{'type': 'error',
+                                  'message': 'Step budget exceeded (1000 steps)'}]
+
+
+def test_batch_timeout_stops_uninterruptible_jobs():
+    """A job stuck inside one builtin call is stopped and the others still finish"""
+    # Squaring a huge integer is one step, so the budget never reads the clock
+    stuck = "(defn sq (x n) (if (= n 0) 0 (sq (* x x) (- n 1)))) (def y (sq 3 40))"
+    jobs = [stuck] + [f"(rect 0 0 {w} 1)" for w in range(1, 6)]
+    results = execute_batch(jobs, max_workers=2, timeout=1.0)
+    
+    assert list(results[0]) == [{'type': 'error', 'message': 'Time budget exceeded (1 s)'}]
+    assert [[cmd['width'] for cmd in result] for result in results[1:]] == [[1], [2], [3], [4], [5]]
+
+
+def test_sweep_runs_variants_after_one_prelude():
+    """Sweep variants share one prelude run and get their own commands"""
+    prelude = "(fill #ccc) (rect 0 0 10 10) (defn bar (x) (circle x 5 2))"
+    results = execute_sweep(prelude, "(repeat n (bar (* i 10)))", [{'n': 1}, {'n': 3}])
+    assert [len(commands) for commands in results] == [2, 4]
+    assert results[1] == AdvancedLispInterpreter().execute(
+        "(def n 3) " + prelude + " (repeat n (bar (* i 10)))")
+    results[0][0]['color'] = '#f00'
+    assert results[1][0]['color'] == '#ccc'
+
+
+def test_template_rows_bind_placeholders_as_symbols():
+    """Template rows evaluate one compiled program and match rendered code"""
+    template = Template("t", "Beam", """
+    (def span {{span}}) (def depth {{depth}}) ; {{note}}
+    (rect 0 0 span depth)
+    (repeat {{n}} (circle (* (+ i 1) (/ span (+ {{n}} 1))) 20 {{bar}}))
+    """, "beam", variables={'span': 1000, 'depth': 200, 'n': 3, 'bar': 6})
+    rows = pd.DataFrame({'span': [1200, 1500, 900], 'n': [2, 4, 1], 'bar': [6.5, 1e-05, 8]})
+    expected = execute_batch([(template.code, {**template.variables, **row})
+                              for row in rows.to_dict('records')], max_workers=1)
+    
+    results = instantiate_template(template, rows, max_workers=1)
+    assert [list(r) for r in results] == [list(e) for e in expected]
+    assert [len(r) for r in results] == [3, 5, 2]
+    assert results[0][1]['radius'] == 6.5
+    
+    labelled = template.code + '(text 0 0 "L {{span}}" 12)'
+    rows = [{'span': 5, 'depth': 1, 'n': 0}, {'span': 7}]
+    results = instantiate_template(labelled, rows, max_workers=2)
+    assert results[0][-1]['text'] == "L 5"
+    assert [list(r) for r in results] == [list(e) for e in execute_batch(
+        [(labelled, row) for row in rows], max_workers=1)]
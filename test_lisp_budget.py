@@ -0,0 +1,28 @@
+"""
+Test Execution Budget
+Tests step limits and profiling of script execution
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_budget_aborts_runaway_scripts():
+    """Exceeding the step budget aborts cleanly; profiling counts calls"""
+    interpreter = AdvancedLispInterpreter()
+    interpreter.set_budget(max_steps=1000)
+    commands = interpreter.execute("(repeat 1000000 (do (def x i) (rect x 0 1 1)))")
+    
+    assert commands == [{'type': 'error', 'message': 'Step budget exceeded (1000 steps)'}]
+    
+    interpreter.set_budget()
+    interpreter.enable_profiling()
+    interpreter.execute("(defn bar (x) (rect x 0 5 5))\n(repeat 10 (bar i))")
+    profile = interpreter.get_profile()
+    
+    assert profile['functions'][0]['name'] == 'bar'
+    assert profile['functions'][0]['count'] == 10
+    assert [form['line'] for form in profile['forms']] in ([2, 1], [1, 2])
@@ -0,0 +1,21 @@
+"""
+Test Lisp Builtins
+Tests the builtin registries of both interpreters
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter import LispInterpreter
+from utils.lisp_builtins import SIMPLE_BUILTINS, ADVANCED_BUILTINS
+
+
+def test_builtin_registry_shared():
+    """Both interpreters dispatch through registries sharing the core builtins"""
+    assert SIMPLE_BUILTINS.get('+').func is ADVANCED_BUILTINS.get('+').func
+    assert 'sin' in ADVANCED_BUILTINS and 'sin' not in SIMPLE_BUILTINS
+    
+    simple = LispInterpreter().execute("(fill #00f) (circle (+ 1 2) 5 (/ 9 3))")
+    assert simple == [{'type': 'circle', 'x': 3, 'y': 5, 'radius': 3.0,
+                       'color': '#00f', 'fill': True}]
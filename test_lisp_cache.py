@@ -0,0 +1,85 @@
+"""
+Test Lisp Program Caches
+Tests the in-memory LRU and the on-disk cache of parsed programs
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.lisp_reader import tokenize, read_all
+from utils.lisp_cache import ProgramCache, DiskProgramCache
+from utils.performance_optimizer import get_performance_monitor
+
+
+def test_program_cache_hits_and_evicts():
+    """Identical source hits the LRU and the oldest program is evicted at capacity"""
+    cache = ProgramCache(max_entries=2)
+    builds = []
+    
+    def build(source):
+        builds.append(source)
+        return read_all(tokenize(source))
+    
+    first = cache.get_or_build('parsed', "(rect 0 0 1 1)", build)
+    assert cache.get_or_build('parsed', "(rect 0 0 1 1)", build) is first
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5,
+                                 'entries': 1, 'max_entries': 2}
+    
+    cache.get_or_build('parsed', "(circle 0 0 1)", build)
+    cache.get_or_build('parsed', "(rect 0 0 1 1)", build)
+    cache.get_or_build('parsed', "(line 0 0 1 1)", build)
+    assert cache.get_stats()['entries'] == 2
+    assert cache.get('parsed', "(circle 0 0 1)") is None
+    assert cache.get('parsed', "(rect 0 0 1 1)") is first
+    assert len(builds) == 3
+    
+    code = "(def rerun-probe 1) (rect 0 0 rerun-probe 1)"
+    before = get_performance_monitor().get_cache_stats()['lisp_programs']
+    AdvancedLispInterpreter().execute(code)
+    AdvancedLispInterpreter().execute(code)
+    after = get_performance_monitor().get_cache_stats()['lisp_programs']
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+    
+    cache.clear()
+    assert cache.get_stats()['entries'] == cache.hits == cache.misses == 0
+
+
+def test_disk_cache_shares_parsed_programs(sample_code):
+    """Parsed forms written by one cache instance load in another"""
+    with tempfile.TemporaryDirectory() as directory:
+        builds = []
+        
+        def build(source):
+            builds.append(source)
+            return read_all(tokenize(source))
+        
+        first = DiskProgramCache(directory)
+        forms = first.get_or_build('parsed', sample_code, build)
+        second = DiskProgramCache(directory)
+        assert second.get_or_build('parsed', sample_code, build) == forms
+        assert len(builds) == 1
+        assert second.get_stats()['hits'] == 1
+        
+        # Corrupt files are rebuilt instead of failing
+        with open(second.path('parsed', sample_code), 'wb') as f:
+            f.write(b'\x00garbage')
+        assert second.get_or_build('parsed', sample_code, build) == forms
+        assert len(builds) == 2
+        
+        # Directories of other formats go away; old files are pruned first
+        stale = os.path.join(directory, "0123456789abcdef")
+        os.makedirs(stale)
+        bounded = DiskProgramCache(os.path.join(directory, "bounded"), max_entries=2)
+        os.makedirs(os.path.join(bounded.root, "0123456789abcdef"))
+        for k in range(3):
+            bounded.get_or_build('parsed', f"(rect 0 0 {k} 1)", build)
+            os.utime(bounded.path('parsed', f"(rect 0 0 {k} 1)"), (k, k))
+        bounded.get_or_build('parsed', "(rect 0 0 0 1)", build)
+        assert bounded.get_stats()['entries'] == 2
+        assert os.listdir(bounded.root) == [os.path.basename(bounded.directory)]
+        assert os.path.isdir(stale)
+        assert not os.path.exists(bounded.path('parsed', "(rect 0 0 1 1)"))
@@ -0,0 +1,81 @@
+"""
+Test Lisp Compiler
+Tests compiled execution, scoping and recursion of user functions
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_compiled_execution(sample_code):
+    """Loops, functions and drawing state through the compiled path"""
+    interpreter = AdvancedLispInterpreter()
+    commands = interpreter.execute(sample_code)
+    
+    assert [c['type'] for c in commands] == ['circle'] * 5 + ['rect']
+    assert commands[4]['x'] == 50 + 4 * 60
+    assert commands[0]['color'] == '#ff0000'
+    assert commands[5] == {
+        'type': 'rect', 'x': 50, 'y': 200, 'width': 50, 'height': 50,
+        'color': '#00ff00', 'fill': True, 'stroke_width': 2
+    }
+    assert interpreter.get_variables() == {'size': 50, 'spacing': 60}
+
+
+def test_compiled_program_reuse(sample_code):
+    """A program compiled once can be run by several interpreters"""
+    program = AdvancedLispInterpreter().compile(sample_code)
+    
+    first = AdvancedLispInterpreter().run(program)
+    second = AdvancedLispInterpreter().run(program)
+    
+    assert first == second
+    assert len(first) == 6
+
+
+def test_scopes_do_not_leak():
+    """Loop and function frames keep their bindings out of the globals"""
+    interpreter = AdvancedLispInterpreter()
+    commands = interpreter.execute("""
+    (def i 7)
+    (repeat 3 (def q i))
+    (defn f (n) (do (def tmp n) (circle n i 1)))
+    (f 5)
+    """)
+    
+    assert commands[0]['x'] == 5 and commands[0]['y'] == 7
+    assert interpreter.get_variables() == {'i': 7}
+
+
+def test_tail_calls_run_in_constant_stack():
+    """Tail-recursive functions recurse far past the Python stack limit"""
+    interpreter = AdvancedLispInterpreter()
+    interpreter.execute("""
+    (defn count (n acc) (if (= n 0) acc (count (- n 1) (+ acc 1))))
+    (def s (count 50000 0))
+    """)
+    assert interpreter.get_variables()['s'] == 50000
+    
+    result = interpreter.execute("(defn loop (n) (loop n)) (loop 1)")
+    assert result[0]['type'] == 'error'
+
+
+def test_nested_calls_recurse_hundreds_deep():
+    """Non-tail recursion runs 500+ levels deep and stops cleanly past the cap"""
+    limit = sys.getrecursionlimit()
+    interpreter = AdvancedLispInterpreter()
+    interpreter.set_memoization(False)
+    interpreter.execute("""
+    (defn depth (n) (if (= n 0) 0 (+ 1 (depth (- n 1)))))
+    (def d (depth 800))
+    """)
+    assert interpreter.get_variables()['d'] == 800
+    assert sys.getrecursionlimit() == limit
+    
+    result = interpreter.execute("(def e (depth 5000))")
+    assert result == [{'type': 'error',
+                       'message': 'maximum recursion depth exceeded (1000 nested calls)'}]
+    assert sys.getrecursionlimit() == limit
@@ -0,0 +1,45 @@
+"""
+Test DXF Export
+Tests writing Lisp drawings as DXF documents and R12 streams
+"""
+
+import sys
+import os
+import io
+import ezdxf
+import pytest
+from ezdxf.enums import TextEntityAlignment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_dxf import script_to_dxf, stream_script_to_r12
+
+
+def test_dxf_backend_maps_layers_and_blocks():
+    """Colors become layers, equal circles share a block and R12 streams"""
+    code = """
+    (fill #ccc) (rect 0 0 1000 200)
+    (fill #ff6600) (repeat 3 (circle (+ 100 (* i 50)) 170 8))
+    (text 500 240 "LINTEL" 12)
+    """
+    doc = ezdxf.read(io.StringIO(script_to_dxf(code).decode()))
+    entities = list(doc.modelspace())
+    assert [e.dxftype() for e in entities] == ['LWPOLYLINE'] + ['INSERT'] * 3 + ['TEXT']
+    assert 'COLOR_CCCCCC' in doc.layers and 'COLOR_FF6600' in doc.layers
+    assert len({e.dxf.name for e in entities if e.dxftype() == 'INSERT'}) == 1
+    assert entities[1].dxf.layer == 'COLOR_FF6600'
+    assert entities[1].dxf.insert.y == -170
+    # Text is centered on its anchor, as in the previews
+    label = entities[-1]
+    assert label.get_align_enum() == TextEntityAlignment.MIDDLE_CENTER
+    assert label.dxf.align_point == (500, -240, 0)
+    
+    stream = io.StringIO()
+    assert stream_script_to_r12(code, stream) == 5
+    r12 = ezdxf.read(io.StringIO(stream.getvalue()))
+    assert len([e for e in r12.modelspace() if e.dxftype() == 'CIRCLE']) == 3
+    label = r12.modelspace().query('TEXT').first
+    assert label.get_align_enum() == TextEntityAlignment.MIDDLE_CENTER
+    assert label.dxf.align_point == (500, -240, 0)
+    
+    with pytest.raises(ValueError):
+        script_to_dxf('(rect 0 0 (+ 1 "a") 10)')
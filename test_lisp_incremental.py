@@ -0,0 +1,25 @@
+"""
+Test Incremental Execution
+Tests re-evaluating only the forms affected by an edit
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_incremental_reuses_unaffected_forms(sample_code):
+    """Editing one def only re-evaluates the forms depending on it"""
+    interpreter = AdvancedLispInterpreter()
+    code = sample_code + "(rect 0 0 spacing spacing)"
+    interpreter.execute_incremental(code)
+    
+    edited = code.replace("(def size 50)", "(def size 40)")
+    commands = interpreter.execute_incremental(edited)
+    
+    assert commands == AdvancedLispInterpreter().execute(edited)
+    stats = interpreter.get_incremental_stats()
+    assert stats['evaluated'] == 3  # the def, the loop and draw-square
+    assert stats['reused'] == stats['forms'] - 3
@@ -0,0 +1,40 @@
+"""
+Test Lisp Interpreter
+Tests error reporting, streaming and forking of the advanced interpreter
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_errors_become_commands():
+    """Runtime errors are reported as a single error command"""
+    commands = AdvancedLispInterpreter().execute('(def x)')
+    
+    assert commands == [{'type': 'error', 'message': 'list index out of range'}]
+
+
+def test_iter_execute_streams_with_budget(sample_code):
+    """iter_execute yields execute()'s commands and stops at the budget"""
+    expected = AdvancedLispInterpreter().execute(sample_code)
+    
+    assert list(AdvancedLispInterpreter().iter_execute(sample_code)) == expected
+    
+    stream = AdvancedLispInterpreter().iter_execute("(repeat 1000000 (rect i 0 1 1))", 3)
+    assert [cmd['x'] for cmd in stream] == [0, 1, 2]
+
+
+def test_forks_share_prelude_not_state():
+    """Forks start from the prelude state and never see each other's defs"""
+    interpreter = AdvancedLispInterpreter()
+    interpreter.execute("(stroke #333) (def cover 25) (defn inner (w) (- w (* 2 cover)))")
+    first, second = interpreter.fork(), interpreter.fork()
+    first.execute("(def cover 40) (defn inner (w) 0)")
+    assert first.execute("(rect 0 0 (inner 100) 10)")[0]['width'] == 0
+    assert second.execute("(rect 0 0 (inner 100) 10)")[0]['width'] == 50
+    assert second.execute("(line 0 0 1 1)")[0]['color'] == '#333'
+    assert interpreter.get_variables() == {'cover': 25}
+
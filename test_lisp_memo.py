@@ -0,0 +1,32 @@
+"""
+Test Function Memoization
+Tests result caching of pure user functions
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_pure_functions_are_memoized():
+    """Pure defn results are cached; impure ones and disabled memos are not"""
+    code = """
+    (defn fib (k) (if (< k 2) k (+ (fib (- k 1)) (fib (- k 2)))))
+    (defn paint (c) (do (fill c) (fib 5)))
+    (def a (fib 25))
+    (def b (paint #f00))
+    (def c (paint #0f0))
+    """
+    memoized = AdvancedLispInterpreter()
+    memoized.execute(code)
+    plain = AdvancedLispInterpreter()
+    plain.set_memoization(False)
+    plain.execute(code)
+    
+    assert memoized.get_variables() == plain.get_variables()
+    assert memoized.get_variables()['a'] == 75025
+    assert memoized.get_memo_stats()['hits'] > 0
+    assert memoized.current_color == plain.current_color == '#0f0'
+    assert plain.get_memo_stats() == {'enabled': False}
@@ -0,0 +1,36 @@
+"""
+Test Lisp Optimizer
+Tests constant folding of parsed programs
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.lisp_reader import tokenize, read_all
+from utils.lisp_optimizer import optimize_program
+
+
+def test_constants_are_folded():
+    """Constant defs and pure arithmetic are folded without changing results"""
+    code = """
+    (def span 1200)
+    (def bearing 150)
+    (def total-length (+ span (* 2 bearing)))
+    (rect 0 100 total-length (if (> span 1000) 250 200))
+    """
+    forms = optimize_program(read_all(tokenize(code)))
+    assert forms[2] == ['def', 'total-length', 1500]
+    assert forms[3] == ['rect', 0, 100, 1500, 250]
+    
+    optimized = AdvancedLispInterpreter()
+    plain = AdvancedLispInterpreter()
+    plain.set_optimization(False)
+    assert optimized.execute(code) == plain.execute(code)
+    assert optimized.get_variables() == plain.get_variables()
+    
+    # A builtin shadowed by a user function is never folded
+    optimized.execute("(defn sqrt (x) x)")
+    optimized.execute("(def r (sqrt 16))")
+    assert optimized.get_variables()['r'] == 16
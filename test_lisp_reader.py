@@ -0,0 +1,19 @@
+"""
+Test Lisp Reader
+Tests tokenizing and reading Lisp source
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_reader import tokenize, read_all
+
+
+def test_reader_spans():
+    """Tokens report line/column spans and parsing is cursor based"""
+    tokens = tokenize('(def x 10) ; comment\n  (text 0 0 "a b")')
+    
+    assert tokens[9] == '"a b"'
+    assert tokens.span(9) == (2, 13, 2, 18)
+    assert read_all(tokens) == [['def', 'x', 10], ['text', 0, 0, 'a b']]
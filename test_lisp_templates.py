@@ -0,0 +1,24 @@
+"""
+Test Lisp Templates
+Tests warming the program cache with the built-in templates
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter import LispInterpreter
+from utils.lisp_cache import get_program_cache
+from utils.lisp_templates import TEMPLATES, precompile_templates
+
+
+def test_precompiled_templates_hit_the_preview_cache():
+    """After warm-up, previews of every template parse nothing"""
+    precompile_templates()
+    before = get_program_cache().get_stats()
+    for template in TEMPLATES.values():
+        LispInterpreter().execute(template['code'])
+    after = get_program_cache().get_stats()
+    
+    assert after['misses'] == before['misses']
+    assert after['hits'] - before['hits'] == len(TEMPLATES)
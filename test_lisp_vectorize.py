@@ -0,0 +1,28 @@
+"""
+Test Vectorized Loops
+Tests batching long pure loops into columns
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+def test_vectorized_loop_matches_scalar():
+    """Long pure loops are batched but produce the same commands"""
+    code = "(def pitch 2.5) (repeat 100 (do (def x (* i pitch)) (circle x (+ i 1) 3)))"
+    expected = [
+        {'type': 'circle', 'x': i * 2.5, 'y': i + 1, 'radius': 3,
+         'color': '#ffffff', 'fill': True, 'stroke_width': 2}
+        for i in range(100)
+    ]
+    
+    assert AdvancedLispInterpreter().execute(code) == expected
+    assert list(AdvancedLispInterpreter().execute_drawlist(code)) == expected
+    
+    # + adds left to right like Python's operator, never with compensated sums
+    code = "(repeat 100 (circle (+ 0.1 (* i 0.2) 0.3) 0 1))"
+    assert [cmd['x'] for cmd in AdvancedLispInterpreter().execute(code)] == \
+        [0 + 0.1 + i * 0.2 + 0.3 for i in range(100)]
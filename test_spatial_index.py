@@ -0,0 +1,43 @@
+"""
+Test Spatial Index
+Tests viewport culling, zooming and hit testing
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.spatial_index import SpatialIndex
+
+
+def test_spatial_index_culls_and_hit_tests():
+    """Viewport queries return visible commands in draw order; clicks find primitives"""
+    code = """
+    (rect 0 0 40000 900)
+    (repeat 200 (circle (* i 200) 450 8))
+    (text x 0 "label")
+    """
+    commands = AdvancedLispInterpreter().execute(code)
+    drawlist = AdvancedLispInterpreter().execute_drawlist(code)
+    
+    for source in (commands, drawlist):
+        index = SpatialIndex(source)
+        visible = index.visible(1800, 400, 2300, 500)
+        assert [cmd['type'] for cmd in visible] == ['rect', 'circle', 'circle', 'circle', 'text']
+        assert [cmd['x'] for cmd in visible[1:4]] == [1800, 2000, 2200]
+        
+        # Topmost first: the bar, then the slab under it
+        assert index.hit_test(2003, 452) == [11, 0]
+        assert index.hit_test(2100, 452) == [0]
+    
+    # A 10x zoom on the left end keeps the slab, the first bars and the label
+    index = SpatialIndex(commands)
+    x0, y0, x1, y1 = index.extent
+    viewport = index.zoom_viewport(10, center=(0, 0.5))
+    assert viewport[0] == x0 and viewport[2] == x0 + (x1 - x0) / 10
+    assert viewport[1] + viewport[3] == y0 + y1
+    visible = index.visible(*viewport)
+    assert [cmd['type'] for cmd in visible] == ['rect'] + ['circle'] * 21 + ['text']
+    assert index.zoom_viewport(1) == index.extent
+
@@ -0,0 +1,41 @@
+"""
+Test SQLite Connection Pool
+Tests sharing, reuse and transactions of pooled connections
+"""
+
+import sys
+import os
+import tempfile
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.sqlite_pool import get_connection_pool
+
+
+def test_pool_shares_connections_and_rolls_back():
+    """Pools are shared per file, reuse their connections and roll back failed work"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pool.db")
+        pool = get_connection_pool(path)
+        assert get_connection_pool(path) is pool
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (v INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1)")
+        for _ in range(20):
+            with pool.connection() as conn:
+                conn.execute("UPDATE t SET v = v + 1")
+        assert pool.get_stats() == {'connections': 1, 'idle': 1, 'max_connections': 4}
+        
+        with pytest.raises(RuntimeError):
+            with pool.connection() as conn:
+                conn.execute("UPDATE t SET v = 0")
+                raise RuntimeError("abort")
+        with pool.connection() as conn:
+            assert conn.execute("SELECT v FROM t").fetchone()[0] == 21
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        pool.close()
+        assert pool.get_stats()['connections'] == 0
+    
+    memory = get_connection_pool(':memory:')
+    assert get_connection_pool(':memory:') is not memory
+    assert memory.get_stats()['max_connections'] == 1
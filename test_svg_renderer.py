@@ -0,0 +1,35 @@
+"""
+Test SVG Renderer
+Tests batched SVG output and the render cache
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.svg_renderer import SVGRenderer
+
+
+def test_svg_renderer_batches_and_caches():
+    """Same-style primitives share one path and unchanged drawings hit the cache"""
+    code = """
+    (fill #ccc) (rect 0 0 1000 200)
+    (stroke #333) (repeat 100 (line (* i 10) 0 (* i 10) 200))
+    (text 500 240 "A < B" 12)
+    """
+    renderer = SVGRenderer()
+    svg = renderer.render(AdvancedLispInterpreter().execute(code))
+    assert svg.count('<path') == 2
+    assert svg.count('M') == 1 + 100
+    assert '<text x="500" y="240" font-size="12" fill="#333">A &lt; B</text>' in svg
+    
+    assert renderer.render(AdvancedLispInterpreter().execute_drawlist(code)) == svg
+    assert renderer.render(AdvancedLispInterpreter().execute_drawlist(code)) == svg
+    assert renderer.get_stats()['hits'] == 1
+
+    
+    # A viewport replaces the padded extent in the viewBox and the cache key
+    zoomed = renderer.render(AdvancedLispInterpreter().execute(code), viewport=(0, 0, 100, 50))
+    assert 'viewBox="0 0 100 50"' in zoomed
+    assert zoomed != svg
@@ -0,0 +1,128 @@
+"""
+Test Template Engine
+Tests template storage, search and placeholder rendering
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.template_engine import TemplateEngine, Template
+
+
+def test_template_engine_reuses_pooled_connections():
+    """Engines on one file share a WAL pool and failed work rolls back"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "templates.db")
+        engine = TemplateEngine(path)
+        engine.save_template(Template("t1", "Lintel", "(rect 0 0 {{w}} 10)", "lintel"))
+        for _ in range(20):
+            engine.increment_use_count("t1")
+        assert TemplateEngine(path).get_template("t1").use_count == 20
+        assert TemplateEngine(path).pool is engine.pool
+        assert engine.pool.get_stats()['connections'] == 1
+        
+        with pytest.raises(RuntimeError):
+            with engine.pool.connection() as conn:
+                conn.execute("UPDATE templates SET use_count = 0")
+                raise RuntimeError("abort")
+        assert engine.get_template("t1").use_count == 20
+        with engine.pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        engine.pool.close()
+    
+    memory = TemplateEngine(':memory:')
+    memory.save_template(Template("m1", "Lintel", "(rect 0 0 1 1)", "lintel"))
+    other = TemplateEngine(':memory:')
+    assert other.pool is not memory.pool
+    assert other.get_template("m1") is None
+    assert memory.get_template("m1").name == "Lintel"
+
+
+def test_template_search_uses_ranked_prefix_index():
+    """Prefix search finds templates through FTS5 and follows edits and deletes"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = TemplateEngine(os.path.join(directory, "templates.db"))
+        assert engine.fts_enabled
+        engine.save_template(Template("a", "Lintel Beam", "c", "lintel",
+                                      description="Precast lintel", tags=["beam"]))
+        engine.save_template(Template("b", "Road Section", "c", "road",
+                                      description="Flexible pavement with beam kerb"))
+        engine.save_template(Template("c", "Lintel Small", "c", "lintel", rating=5.0))
+        
+        assert [t.id for t in engine.search_templates("lin bea")] == ["a"]
+        assert [t.id for t in engine.search_templates("beam")] == ["a", "b"]
+        assert [t.id for t in engine.search_templates("beam", element_type="road")] == ["b"]
+        assert {t.id for t in engine.search_templates("lintel")} == {"a", "c"}
+        
+        engine.save_template(Template("b", "Road Camber", "c", "road"))
+        assert [t.id for t in engine.search_templates("beam")] == ["a"]
+        engine.delete_template("a")
+        assert engine.search_templates("beam") == []
+        
+        # VACUUM keeps the seq keys the index refers to
+        with engine.pool.connection() as conn:
+            conn.execute("VACUUM")
+        assert [t.id for t in engine.search_templates("lintel")] == ["c"]
+        engine.pool.close()
+        
+        # Tables keyed by their TEXT id only are migrated and re-indexed
+        path = os.path.join(directory, "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.execute("""CREATE TABLE templates (id TEXT PRIMARY KEY, name TEXT NOT NULL,
+            code TEXT NOT NULL, element_type TEXT NOT NULL, category TEXT NOT NULL,
+            description TEXT, tags TEXT, variables TEXT, author TEXT, is_public BOOLEAN,
+            rating REAL, created_at TEXT, updated_at TEXT, use_count INTEGER DEFAULT 0)""")
+        for key, name in (("p", "Parapet"), ("q", "Lintel Deep"), ("r", "Road")):
+            conn.execute("INSERT INTO templates (id, name, code, element_type, category, "
+                         "tags, is_public) VALUES (?, ?, 'c', 'x', 'x', '[]', 1)", (key, name))
+        conn.commit()
+        conn.close()
+        legacy = TemplateEngine(path)
+        assert [t.id for t in legacy.search_templates("deep")] == ["q"]
+        assert legacy.delete_template("p")
+        with legacy.pool.connection() as conn:
+            conn.execute("VACUUM")
+        assert [t.id for t in legacy.search_templates("road")] == ["r"]
+        legacy.pool.close()
+
+
+def test_tag_filters_run_before_limit():
+    """Tag filters find matches beyond the first page, with any/all semantics"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = TemplateEngine(os.path.join(directory, "templates.db"))
+        for k in range(30):
+            engine.save_template(Template(f"t{k}", f"T{k}", "c", "lintel", tags=["beam"], rating=5.0))
+        engine.save_template(Template("x", "X", "c", "lintel", tags=["precast", "beam"]))
+        engine.save_template(Template("y", "Y", "c", "lintel", tags=["precast"]))
+        
+        assert {t.id for t in engine.list_templates(tags=["precast"], limit=5)} == {"x", "y"}
+        assert [t.id for t in engine.list_templates(tags=["precast", "beam"], limit=40,
+                                                    match_all_tags=True)] == ["x"]
+        assert len(engine.list_templates(tags=["precast", "beam"], limit=40)) == 32
+        
+        assert engine.get_template("x").tags == ["precast", "beam"]
+        
+        engine.save_template(Template("x", "X", "c", "lintel", tags=["steel"]))
+        assert [t.id for t in engine.list_templates(tags=["precast"])] == ["y"]
+        assert engine.delete_template("y")
+        assert engine.list_templates(tags=["precast"]) == []
+        engine.pool.close()
+
+
+def test_placeholders_render_from_cached_segments():
+    """Templates render single values and batches alike, following code edits"""
+    template = Template("t", "Lintel", "(def span {{span}}) (def w {{width}}) {{span}} {{other}}",
+                        "lintel", variables={'span': 1000, 'width': 230})
+    assert template.apply_variables({'width': 300}) == \
+        "(def span 1000) (def w 300) 1000 {{other}}"
+    
+    batch = [{'span': k} for k in range(3)] + [{'other': r'\1'}]
+    assert template.render_many(batch) == [template.apply_variables(v) for v in batch]
+    assert template.render_many(batch)[-1].endswith(r'1000 \1')
+    
+    template.code = "{{span}}"
+    assert template.apply_variables({}) == "1000"
@@ -10,6 +10,8 @@ from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import hashlib
 
+from utils.svg_renderer import get_svg_renderer
+
 class DesignHistory:
     """Manages design history with undo/redo and version tracking"""
     
@@ -81,7 +83,9 @@ class DesignHistory:
             project_id: Project identifier
             code: Current code
             description: Optional description of changes
-            metadata: Optional metadata (variables, commands, etc.)
+            metadata: Optional metadata (variables, commands, etc.);
+                drawing commands under 'commands' refresh the project
+                thumbnail
             
         Returns:
             Snapshot ID
@@ -95,6 +99,8 @@ class DesignHistory:
         # Extract metadata
         variables_json = json.dumps(metadata.get('variables', {})) if metadata else '{}'
         commands_count = metadata.get('commands_count', 0) if metadata else 0
+        commands = metadata.get('commands') if metadata else None
+        thumbnail = get_svg_renderer().render_thumbnail(commands) if commands is not None else None
         
         # Insert snapshot
         c.execute('''
@@ -113,21 +119,23 @@ class DesignHistory:
         
         snapshot_id = c.lastrowid
         
-        # Update project
+        # Update project (keeping the thumbnail unless a new one was rendered)
         c.execute('''
-            INSERT OR REPLACE INTO projects (id, name, element_type, created_at, updated_at, current_code)
+            INSERT OR REPLACE INTO projects (id, name, element_type, created_at, updated_at,
+                                             current_code, thumbnail)
             VALUES (
                 ?,
                 COALESCE((SELECT name FROM projects WHERE id = ?), ?),
                 COALESCE((SELECT element_type FROM projects WHERE id = ?), 'lintel'),
                 COALESCE((SELECT created_at FROM projects WHERE id = ?), ?),
                 ?,
-                ?
+                ?,
+                COALESCE(?, (SELECT thumbnail FROM projects WHERE id = ?))
             )
         ''', (
             project_id, project_id, f"Project {project_id}", 
             project_id, project_id, datetime.now().isoformat(),
-            datetime.now().isoformat(), code
+            datetime.now().isoformat(), code, thumbnail, project_id
         ))
         
         conn.commit()
@@ -206,6 +214,49 @@ class DesignHistory:
         
         return row[0] if row else None
     
+    def set_thumbnail(self, project_id: str, commands: List[Dict]) -> bool:
+        """
+        Render and store the thumbnail of a project
+        
+        Args:
+            project_id: Project identifier
+            commands: Drawing commands of the current design
+        
+        Returns:
+            True if the project exists
+        """
+        thumbnail = get_svg_renderer().render_thumbnail(commands)
+        
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        
+        c.execute('UPDATE projects SET thumbnail = ? WHERE id = ?', (thumbnail, project_id))
+        
+        conn.commit()
+        updated = c.rowcount > 0
+        conn.close()
+        
+        return updated
+    
+    def get_thumbnail(self, project_id: str) -> Optional[str]:
+        """
+        Get the SVG thumbnail of a project
+        
+        Args:
+            project_id: Project identifier
+        
+        Returns:
+            SVG markup, or None if the project has no thumbnail
+        """
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        
+        c.execute('SELECT thumbnail FROM projects WHERE id = ?', (project_id,))
+        row = c.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+    
     def undo(self) -> Optional[Tuple[str, str]]:
         """
         Undo last change
@@ -0,0 +1,368 @@
+"""
+Columnar Draw List
+Compact storage for interpreter drawing commands with NumPy column access
+"""
+
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+
+# Geometry fields stored as numeric columns, per primitive type
+PRIMITIVE_FIELDS = {
+    'rect': ('x', 'y', 'width', 'height'),
+    'circle': ('x', 'y', 'radius'),
+    'line': ('x1', 'y1', 'x2', 'y2'),
+    'arc': ('x', 'y', 'radius', 'start', 'end'),
+    'text': ('x', 'y', 'size'),
+    'polygon': (),
+}
+
+KINDS = ('rect', 'circle', 'line', 'arc', 'text', 'polygon', 'other')
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+_OTHER = _KIND_CODES['other']
+
+# Largest integer a float64 column holds exactly
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _is_number(value: Any) -> bool:
+    """Check for a plain int/float that round-trips through float64"""
+    kind = type(value)
+    if kind is float:
+        return True
+    return kind is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT
+
+
+class _Column:
+    """
+    Growable float64 column remembering which values were ints
+    
+    While every value has the same type, all_int tells which; once ints
+    and floats mix, int_rows keeps one flag per value.
+    """
+    
+    __slots__ = ('data', 'all_int', 'int_rows')
+    
+    def __init__(self):
+        self.data = array('d')
+        self.all_int = True
+        self.int_rows = None
+    
+    def _mark(self, is_int: bool, count: int):
+        """Record the type of count values about to be appended"""
+        if self.int_rows is not None:
+            self.int_rows.extend([is_int] * count)
+        elif not self.data:
+            self.all_int = is_int
+        elif is_int != self.all_int:
+            self.int_rows = array('b', [self.all_int]) * len(self.data)
+            self.int_rows.extend([is_int] * count)
+            self.all_int = False
+    
+    def append(self, value):
+        self._mark(type(value) is int, 1)
+        self.data.append(value)
+    
+    def extend(self, values: np.ndarray, all_int: bool):
+        """Append a float64 array of values in one step"""
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        if len(values):
+            self._mark(all_int, len(values))
+            self.data.frombytes(values.tobytes())
+    
+    def get(self, index: int):
+        value = self.data[index]
+        if self.int_rows is not None:
+            return int(value) if self.int_rows[index] else value
+        return int(value) if self.all_int else value
+    
+    def view(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype=np.float64)
+
+
+class _PrimitiveTable:
+    """Column storage for one primitive type"""
+    
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.fields = PRIMITIVE_FIELDS[kind]
+        self.columns = {field: _Column() for field in self.fields}
+        self.color = array('i')
+        self.fill = array('b')          # -1 when the command has no 'fill'
+        self.stroke_width = _Column()
+        self.has_stroke = array('b')
+        self.text = [] if kind == 'text' else None
+        self.point_offsets = array('q', [0]) if kind == 'polygon' else None
+        self.points = _Column() if kind == 'polygon' else None
+        self.count = 0
+        
+        required = {'type', 'color', *self.fields}
+        if kind == 'text':
+            required.add('text')
+        if kind == 'polygon':
+            required.add('points')
+        self.required = frozenset(required)
+    
+    def accepts(self, cmd: Dict) -> bool:
+        """Check whether a command fits this table's columns"""
+        keys = set(cmd)
+        keys.discard('fill')
+        keys.discard('stroke_width')
+        if keys != self.required:
+            return False
+        for field in self.fields:
+            if not _is_number(cmd[field]):
+                return False
+        fill = cmd.get('fill', False)
+        if fill is not True and fill is not False:
+            return False
+        if 'stroke_width' in cmd and not _is_number(cmd['stroke_width']):
+            return False
+        if self.text is not None and type(cmd['text']) is not str:
+            return False
+        if self.points is not None:
+            points = cmd['points']
+            if not isinstance(points, list):
+                return False
+            for point in points:
+                if (type(point) is not dict or len(point) != 2
+                        or not _is_number(point.get('x'))
+                        or not _is_number(point.get('y'))):
+                    return False
+        return True
+    
+    def append(self, cmd: Dict, color_id: int):
+        for field in self.fields:
+            self.columns[field].append(cmd[field])
+        self.color.append(color_id)
+        self.fill.append(int(cmd['fill']) if 'fill' in cmd else -1)
+        if 'stroke_width' in cmd:
+            self.stroke_width.append(cmd['stroke_width'])
+            self.has_stroke.append(1)
+        else:
+            self.stroke_width.append(0)
+            self.has_stroke.append(0)
+        if self.text is not None:
+            self.text.append(cmd['text'])
+        if self.points is not None:
+            for point in cmd['points']:
+                self.points.append(point['x'])
+                self.points.append(point['y'])
+            self.point_offsets.append(len(self.points.data) // 2)
+        self.count += 1
+    
+    def row(self, index: int, colors: List[Any]) -> Dict:
+        """Rebuild the command dictionary for one row"""
+        cmd = {'type': self.kind}
+        columns = self.columns
+        if self.kind == 'text':
+            cmd['x'] = columns['x'].get(index)
+            cmd['y'] = columns['y'].get(index)
+            cmd['text'] = self.text[index]
+            cmd['size'] = columns['size'].get(index)
+        elif self.kind == 'polygon':
+            start = self.point_offsets[index]
+            end = self.point_offsets[index + 1]
+            cmd['points'] = [
+                {'x': self.points.get(2 * p), 'y': self.points.get(2 * p + 1)}
+                for p in range(start, end)
+            ]
+        else:
+            for field in self.fields:
+                cmd[field] = columns[field].get(index)
+        cmd['color'] = colors[self.color[index]]
+        if self.fill[index] >= 0:
+            cmd['fill'] = bool(self.fill[index])
+        if self.has_stroke[index]:
+            cmd['stroke_width'] = self.stroke_width.get(index)
+        return cmd
+
+
+class DrawList:
+    """
+    Columnar list of drawing commands
+    
+    Commands are stored per primitive type in flat float64 columns with an
+    interned color table instead of one dictionary per primitive. Iterating
+    yields ordinary command dictionaries, so existing consumers keep
+    working; renderers can read whole columns through columns(), which are
+    zero-copy NumPy views (do not append while holding them).
+    
+    Every value comes back with the type it was appended with, int or
+    float, also in columns mixing both. Commands that do not fit a column layout (errors,
+    symbolic coordinates, unknown types) are kept verbatim.
+    """
+    
+    def __init__(self, commands: Optional[Iterable[Dict]] = None):
+        """
+        Initialize draw list
+        
+        Args:
+            commands: Optional drawing commands to append
+        """
+        self.kinds = array('B')
+        self.rows = array('i')
+        self.colors = []
+        self._color_ids = {}
+        self._tables = {kind: _PrimitiveTable(kind) for kind in PRIMITIVE_FIELDS}
+        self.others = []
+        if commands is not None:
+            self.extend(commands)
+    
+    @classmethod
+    def from_commands(cls, commands: Iterable[Dict]) -> 'DrawList':
+        """Build a draw list from command dictionaries"""
+        return cls(commands)
+    
+    def intern_color(self, color: Any) -> int:
+        """Get the color table index of a color, adding it if new"""
+        key = (type(color), color)
+        color_id = self._color_ids.get(key)
+        if color_id is None:
+            color_id = len(self.colors)
+            self.colors.append(color)
+            self._color_ids[key] = color_id
+        return color_id
+    
+    def append(self, cmd: Dict):
+        """Append one drawing command"""
+        table = self._tables.get(cmd.get('type')) if isinstance(cmd, dict) else None
+        if table is not None and table.accepts(cmd):
+            try:
+                color_id = self.intern_color(cmd['color'])
+            except TypeError:
+                color_id = None
+            if color_id is not None:
+                self.kinds.append(_KIND_CODES[table.kind])
+                self.rows.append(table.count)
+                table.append(cmd, color_id)
+                return
+        self.kinds.append(_OTHER)
+        self.rows.append(len(self.others))
+        self.others.append(cmd)
+    
+    def extend(self, commands: Iterable[Dict]):
+        """Append several drawing commands"""
+        for cmd in commands:
+            self.append(cmd)
+    
+    def extend_batch(self, batch: Any):
+        """
+        Append a PrimitiveBatch from a vectorized loop column by column
+        
+        Args:
+            batch: utils.lisp_vectorize.PrimitiveBatch
+        """
+        table = self._tables[batch.kind]
+        fill = -1 if batch.kind == 'line' else batch.fill
+        if (fill not in (-1, True, False) or type(fill) not in (int, bool)
+                or not _is_number(batch.stroke_width)):
+            self.extend(batch.to_commands())
+            return
+        try:
+            color_id = self.intern_color(batch.color)
+        except TypeError:
+            self.extend(batch.to_commands())
+            return
+        
+        count = batch.count
+        for field, (data, all_int) in batch.columns.items():
+            table.columns[field].extend(data, all_int)
+        table.color.frombytes(np.full(count, color_id, dtype=np.int32).tobytes())
+        table.fill.frombytes(np.full(count, int(fill), dtype=np.int8).tobytes())
+        table.stroke_width.extend(
+            np.full(count, batch.stroke_width, dtype=np.float64),
+            type(batch.stroke_width) is int
+        )
+        table.has_stroke.frombytes(np.ones(count, dtype=np.int8).tobytes())
+        
+        self.kinds.frombytes(
+            np.full(count, _KIND_CODES[batch.kind], dtype=np.uint8).tobytes()
+        )
+        self.rows.frombytes(
+            np.arange(table.count, table.count + count, dtype=np.int32).tobytes()
+        )
+        table.count += count
+    
+    def __len__(self) -> int:
+        return len(self.kinds)
+    
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self.kinds)
+        kind = KINDS[self.kinds[index]]
+        row = self.rows[index]
+        if kind == 'other':
+            return self.others[row]
+        return self._tables[kind].row(row, self.colors)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        tables = [self._tables.get(kind) for kind in KINDS]
+        colors = self.colors
+        others = self.others
+        for code, row in zip(self.kinds, self.rows):
+            if code == _OTHER:
+                yield others[row]
+            else:
+                yield tables[code].row(row, colors)
+    
+    def to_commands(self) -> List[Dict]:
+        """Get all commands as a list of dictionaries"""
+        return list(self)
+    
+    def count(self, kind: str) -> int:
+        """Number of commands of one primitive type"""
+        if kind == 'other':
+            return len(self.others)
+        return self._tables[kind].count
+    
+    def columns(self, kind: str) -> Dict[str, Any]:
+        """
+        Get the column arrays of one primitive type
+        
+        Args:
+            kind: Primitive type ('rect', 'circle', 'line', 'arc', 'text', 'polygon')
+        
+        Returns:
+            Dictionary of zero-copy NumPy views: one float64 array per
+            geometry field, 'color' (int32 indexes into self.colors),
+            'fill' (int8, -1 when absent), 'stroke_width' (float64) and
+            'has_stroke' (int8). Text adds a 'text' list; polygons add
+            'offsets' (int64) and 'points' (n x 2 float64).
+        """
+        table = self._tables[kind]
+        result = {field: column.view() for field, column in table.columns.items()}
+        result['color'] = np.frombuffer(table.color, dtype=np.int32)
+        result['fill'] = np.frombuffer(table.fill, dtype=np.int8)
+        result['stroke_width'] = table.stroke_width.view()
+        result['has_stroke'] = np.frombuffer(table.has_stroke, dtype=np.int8)
+        if table.text is not None:
+            result['text'] = table.text
+        if table.points is not None:
+            result['offsets'] = np.frombuffer(table.point_offsets, dtype=np.int64)
+            result['points'] = table.points.view().reshape(-1, 2)
+        return result
+    
+    def order(self) -> Dict[str, np.ndarray]:
+        """Get the draw order as 'kind' codes (indexes into KINDS) and 'row' indexes"""
+        return {
+            'kind': np.frombuffer(self.kinds, dtype=np.uint8),
+            'row': np.frombuffer(self.rows, dtype=np.int32)
+        }
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the column storage in bytes"""
+        total = len(self.kinds) * self.kinds.itemsize + len(self.rows) * self.rows.itemsize
+        for table in self._tables.values():
+            for column in table.columns.values():
+                total += len(column.data) * 8
+                if column.int_rows is not None:
+                    total += len(column.int_rows)
+            total += len(table.color) * 4 + len(table.fill) + len(table.has_stroke)
+            total += len(table.stroke_width.data) * 8
+            if table.points is not None:
+                total += len(table.points.data) * 8 + len(table.point_offsets) * 8
+        return total
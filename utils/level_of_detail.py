@@ -0,0 +1,259 @@
+"""
+Level of Detail for Drawing Previews
+Drops primitives that collapse into the same pixels and simplifies polylines
+"""
+
+from typing import List, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.draw_list import DrawList, KINDS, PRIMITIVE_FIELDS
+from utils.spatial_index import Box, command_bounds
+
+
+# Primitive types merged when they quantize to the same pixels
+MERGED_KINDS = ('rect', 'circle', 'arc', 'line')
+
+# Quantized values must stay exactly representable
+_LIMIT = 2.0 ** 52
+
+
+def simplify_points(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of a polyline
+    
+    Args:
+        points: (n, 2) array of vertices
+        epsilon: Maximum distance of a dropped vertex from the result
+    
+    Returns:
+        Indexes of the kept vertices (always the first and the last)
+    """
+    count = len(points)
+    if count <= 2:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    pending = [(0, count - 1)]
+    while pending:
+        start, end = pending.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        offset = points[start + 1:end] - a
+        dx, dy = b - a
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(offset[:, 0], offset[:, 1])
+        else:
+            distances = np.abs(dx * offset[:, 1] - dy * offset[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > epsilon:
+            split = start + 1 + farthest
+            keep[split] = True
+            pending.append((start, split))
+            pending.append((split, end))
+    return np.flatnonzero(keep)
+
+
+class LevelOfDetail:
+    """
+    Reduces drawing commands to what is distinguishable at a zoom level
+    
+    Three passes, all within a pixel tolerance at the given scale:
+    - primitives (rect, circle, arc, line) whose geometry and style
+      quantize to the same tolerance-sized pixels as an earlier one are
+      dropped, which merges sub-pixel primitives and repeated circles or
+      stirrups spaced closer than a pixel;
+    - runs of consecutive lines joined end to end with the same style
+      are simplified with Douglas-Peucker;
+    - polygon outlines are simplified with Douglas-Peucker.
+    Text and commands without numeric geometry are kept unchanged, and
+    the result keeps the original draw order. A dropped duplicate was
+    drawn over whatever came between it and its twin, so the output is
+    exact only up to the tolerance.
+    """
+    
+    def __init__(self, tolerance: float = 1.0):
+        """
+        Initialize level of detail stage
+        
+        Args:
+            tolerance: Pixel tolerance; larger values drop more detail,
+                0 returns the commands unchanged
+        """
+        self.tolerance = tolerance
+        self.last_stats = {'input': 0, 'output': 0, 'merged': 0, 'simplified': 0}
+    
+    def apply(self, commands: Iterable[Dict], scale: float = 1.0) -> List[Dict]:
+        """
+        Decimate drawing commands for display
+        
+        Args:
+            commands: Drawing commands (list or DrawList)
+            scale: Pixels per drawing unit at the current zoom
+        
+        Returns:
+            Drawing command dictionaries to render, in draw order
+        """
+        if isinstance(commands, DrawList):
+            draw_list = commands
+        else:
+            commands = commands if isinstance(commands, list) else list(commands)
+            draw_list = DrawList(commands)
+        get = commands.__getitem__
+        
+        unit = self.tolerance / scale if scale > 0 and self.tolerance > 0 else 0.0
+        if unit == 0:
+            result = [get(index) for index in range(len(draw_list))]
+            self.last_stats = {'input': len(result), 'output': len(result),
+                               'merged': 0, 'simplified': 0}
+            return result
+        
+        order = draw_list.order()
+        chains = _line_chains(draw_list, order)
+        in_chain = np.zeros(len(draw_list), dtype=bool)
+        for start, end in chains.items():
+            in_chain[start:end + 1] = True
+        keep = np.ones(len(draw_list), dtype=bool)
+        for kind in MERGED_KINDS:
+            _merge(draw_list, order, kind, unit, keep, in_chain)
+        
+        polygon = KINDS.index('polygon')
+        result = []
+        simplified = 0
+        index = 0
+        while index < len(draw_list):
+            if index in chains:
+                end = chains[index]
+                lines = _simplify_chain([get(i) for i in range(index, end + 1)], unit)
+                simplified += end + 1 - index - len(lines)
+                result.extend(lines)
+                index = end + 1
+                continue
+            if keep[index]:
+                cmd = get(index)
+                if order['kind'][index] == polygon:
+                    cmd, dropped = _simplify_polygon(cmd, unit)
+                    simplified += dropped
+                result.append(cmd)
+            index += 1
+        
+        self.last_stats = {
+            'input': len(draw_list),
+            'output': len(result),
+            'merged': int(len(keep) - keep.sum()),
+            'simplified': simplified
+        }
+        return result
+    
+    def fit(self, commands: Iterable[Dict], width: float, height: float,
+            padding: float = 10, viewport: Optional[Box] = None) -> List[Dict]:
+        """
+        Decimate drawing commands for a preview of width x height pixels
+        
+        The scale is the one of a preview fitting the viewport, or else the
+        whole drawing plus padding drawing units on every side, into the
+        preview, as render_svg and the canvas preview do.
+        
+        Args:
+            commands: Drawing commands (list or DrawList)
+            width: Viewport width in pixels
+            height: Viewport height in pixels
+            padding: Margin around the drawing in drawing units
+            viewport: (x0, y0, x1, y1) shown, in drawing units (default:
+                the whole drawing)
+        
+        Returns:
+            Drawing command dictionaries to render, in draw order
+        """
+        commands = commands if isinstance(commands, (list, DrawList)) else list(commands)
+        scale = 0.0
+        if viewport is not None:
+            extent_x, extent_y = viewport[2] - viewport[0], viewport[3] - viewport[1]
+            if extent_x > 0 and extent_y > 0:
+                scale = min(width / extent_x, height / extent_y)
+            return self.apply(commands, scale=scale)
+        boxes = [box for box in map(command_bounds, commands) if box is not None]
+        if boxes:
+            extent_x = max(b[2] for b in boxes) - min(b[0] for b in boxes) + 2 * padding
+            extent_y = max(b[3] for b in boxes) - min(b[1] for b in boxes) + 2 * padding
+            if extent_x > 0 and extent_y > 0:
+                scale = min(width / extent_x, height / extent_y)
+        return self.apply(commands, scale=scale)
+
+
+def _merge(draw_list: DrawList, order: Dict[str, np.ndarray], kind: str,
+           unit: float, keep: np.ndarray, in_chain: np.ndarray):
+    """Clear keep for primitives quantizing like an earlier one of the same kind"""
+    if draw_list.count(kind) < 2:
+        return
+    cols = draw_list.columns(kind)
+    quantized = [np.floor(cols[field] / unit) for field in PRIMITIVE_FIELDS[kind]]
+    quantized.append(np.floor(cols['stroke_width'] / unit))
+    key = np.column_stack(quantized + [cols['color'], cols['fill'], cols['has_stroke']])
+    
+    # Global position of every table row (rows are appended in draw order)
+    positions = np.flatnonzero(order['kind'] == KINDS.index(kind))
+    usable = np.all(np.abs(key) < _LIMIT, axis=1) & ~in_chain[positions]
+    rows = np.flatnonzero(usable)
+    if len(rows) < 2:
+        return
+    _, first = np.unique(key[rows], axis=0, return_index=True)
+    duplicate = np.ones(len(rows), dtype=bool)
+    duplicate[first] = False
+    keep[positions[rows[duplicate]]] = False
+
+
+def _line_chains(draw_list: DrawList, order: Dict[str, np.ndarray]) -> Dict[int, int]:
+    """Runs of three or more lines drawn one after another end to end: start -> end index"""
+    positions = np.flatnonzero(order['kind'] == KINDS.index('line'))
+    if len(positions) < 3:
+        return {}
+    cols = draw_list.columns('line')
+    joined = ((np.diff(positions) == 1)
+              & (cols['x2'][:-1] == cols['x1'][1:]) & (cols['y2'][:-1] == cols['y1'][1:]))
+    for field in ('color', 'stroke_width', 'has_stroke'):
+        joined &= cols[field][:-1] == cols[field][1:]
+    finite = np.isfinite(cols['x1']) & np.isfinite(cols['y1']) \
+        & np.isfinite(cols['x2']) & np.isfinite(cols['y2'])
+    joined &= finite[:-1] & finite[1:]
+    
+    chains = {}
+    # Boundaries of runs of True in joined; line k joins line k + 1
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], joined.astype(np.int8), [0]))))
+    for first, last in zip(edges[::2], edges[1::2]):
+        if last - first >= 2:
+            chains[int(positions[first])] = int(positions[last])
+    return chains
+
+
+def _simplify_chain(lines: List[Dict], unit: float) -> List[Dict]:
+    """Replace connected lines by the segments between Douglas-Peucker vertices"""
+    vertices = [(line['x1'], line['y1']) for line in lines]
+    vertices.append((lines[-1]['x2'], lines[-1]['y2']))
+    kept = simplify_points(np.array(vertices, dtype=np.float64), unit)
+    if len(kept) == len(vertices):
+        return lines
+    result = []
+    for a, b in zip(kept[:-1], kept[1:]):
+        line = dict(lines[a])
+        line['x2'], line['y2'] = vertices[b]
+        result.append(line)
+    return result
+
+
+def _simplify_polygon(cmd: Dict, unit: float) -> Tuple[Dict, int]:
+    """Simplify a polygon outline, returning (command, dropped vertices)"""
+    points = cmd['points']
+    if len(points) <= 3:
+        return cmd, 0
+    # Close the ring so the last edge is simplified too
+    ring = np.array([(p['x'], p['y']) for p in points] + [(points[0]['x'], points[0]['y'])],
+                    dtype=np.float64)
+    kept = simplify_points(ring, unit)[:-1]
+    if len(kept) < 3 or len(kept) == len(points):
+        return cmd, 0
+    cmd = dict(cmd)
+    cmd['points'] = [points[i] for i in kept]
+    return cmd, len(points) - len(kept)
@@ -0,0 +1,327 @@
+"""
+Batch Execution of Lisp Scripts
+Runs many (code, variables) jobs across a process pool into compact draw lists,
+parameter sweeps over forks of one evaluated prelude, and templates over tables
+of parameter rows
+"""
+
+import os
+import numbers
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from functools import partial, lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+
+from utils.draw_list import DrawList
+from utils.lisp_cache import disable_disk_cache
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+from utils.lisp_reader import tokenize, parse_atom
+from utils.template_engine import apply_placeholders, split_placeholders
+
+
+# A job is Lisp code, optionally with values for its {{name}} placeholders
+Job = Union[str, Tuple[str, Optional[Dict[str, Any]]]]
+
+# Seconds a job may run past its timeout before its worker is stopped
+TIMEOUT_GRACE = 1.0
+
+
+def _run_job(job: Job, timeout: Optional[float] = None,
+             max_primitives: Optional[int] = None,
+             max_steps: Optional[int] = None) -> DrawList:
+    """Execute one job on a fresh interpreter (runs inside the workers)"""
+    code, variables = (job, None) if isinstance(job, str) else job
+    if variables:
+        code = apply_placeholders(code, variables)
+    
+    interpreter = AdvancedLispInterpreter()
+    interpreter.set_budget(max_steps=max_steps, max_seconds=timeout,
+                           max_primitives=max_primitives)
+    return interpreter.execute_drawlist(code)
+
+
+def _init_worker():
+    """
+    Prepare a worker process before it takes any task
+    
+    Workers never write the shared disk cache. Living in this module, the
+    initializer also makes every worker import the interpreter at start-up
+    rather than while its first job's time is running.
+    """
+    disable_disk_cache()
+
+
+def _worker_ready() -> bool:
+    """No-op task telling that a worker has started"""
+    return True
+
+
+def _worker_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Start worker processes, which never write the shared disk cache"""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+
+
+def _stop_workers(executor: ProcessPoolExecutor):
+    """Kill the worker processes of a pool, whatever they are running"""
+    if hasattr(executor, 'terminate_workers'):  # Python 3.14+
+        executor.terminate_workers()
+        return
+    # Older pools have no public way to stop a busy worker
+    processes = getattr(executor, '_processes', None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_with_deadlines(run: Any, jobs: List[Job], max_workers: int,
+                        timeout: float) -> List[DrawList]:
+    """
+    Execute jobs one task each, stopping any job that overruns its timeout
+    
+    The execution budget only checks the clock between evaluation steps,
+    so a job stuck in one long builtin call or vectorized loop would
+    block its worker. Results are collected in order, each waited for at
+    most timeout plus TIMEOUT_GRACE seconds; on expiry that job gets an
+    error command, the whole pool is killed and the jobs it had not
+    finished are resubmitted to a fresh one.
+    
+    Waits never start before their job: each pool first runs a no-op
+    task, so process start-up (slow with the spawn start method) is not
+    charged to any job, and as tasks are dispatched in order, a job is
+    running by the time every earlier result has been collected.
+    """
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    while pending:
+        executor = _worker_pool(min(max_workers, len(pending)))
+        executor.submit(_worker_ready).result()
+        futures = [(index, executor.submit(run, jobs[index])) for index in pending]
+        pending = []
+        try:
+            for position, (index, future) in enumerate(futures):
+                try:
+                    results[index] = future.result(timeout=timeout + TIMEOUT_GRACE)
+                except TimeoutError:
+                    results[index] = DrawList([{
+                        'type': 'error',
+                        'message': f"Time budget exceeded ({timeout:g} s)"
+                    }])
+                    for later, other in futures[position + 1:]:
+                        if other.done():
+                            results[later] = other.result()
+                        else:
+                            pending.append(later)
+                    _stop_workers(executor)
+                    break
+        finally:
+            executor.shutdown(wait=not pending, cancel_futures=True)
+    return results
+
+
+def execute_batch(jobs: Iterable[Job], max_workers: Optional[int] = None,
+                  chunksize: Optional[int] = None,
+                  timeout: Optional[float] = None,
+                  max_primitives: Optional[int] = None,
+                  max_steps: Optional[int] = None) -> List[DrawList]:
+    """
+    Execute many Lisp scripts in parallel
+    
+    Every job runs on a fresh interpreter, so jobs never see each other's
+    variables or functions. Jobs are sent to the worker processes in
+    chunks to keep the pickling overhead low, and results come back as
+    DrawLists, whose column storage pickles compactly. A job passing its
+    timeout, step or primitive limit is aborted through the execution
+    budget and yields a single error command, like any other failing
+    script. With a timeout, jobs are sent one per task instead, so a job
+    the budget cannot interrupt has its worker killed once it overruns
+    (see _run_with_deadlines).
+    
+    Args:
+        jobs: Lisp code strings or (code, variables) tuples, where
+            variables fill {{name}} placeholders as in Template.apply_variables
+        max_workers: Worker processes (default: CPU count); 1 runs the jobs
+            in this process
+        chunksize: Jobs per task sent to a worker (default: about four
+            chunks per worker)
+        timeout: Maximum seconds per job; workers running past it are
+            killed, while in-process jobs rely on the budget alone
+        max_primitives: Maximum drawing commands per job
+        max_steps: Maximum evaluation steps per job
+    
+    Returns:
+        One DrawList per job, in input order
+    """
+    jobs = list(jobs)
+    run = partial(_run_job, timeout=timeout, max_primitives=max_primitives,
+                  max_steps=max_steps)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(jobs))
+    if max_workers <= 1:
+        return [run(job) for job in jobs]
+    
+    if timeout is not None:
+        return _run_with_deadlines(run, jobs, max_workers, timeout)
+    
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (max_workers * 4))
+    with _worker_pool(max_workers) as executor:
+        return list(executor.map(run, jobs, chunksize=chunksize))
+
+
+def execute_sweep(prelude: str, tail: str, parameter_sets: Iterable[Dict[str, Any]],
+                  interpreter: Optional[AdvancedLispInterpreter] = None) -> List[List[Dict]]:
+    """
+    Execute a prelude once, then a tail once per set of parameters
+    
+    The prelude (typically the defs and defns shared by every variant)
+    runs on one interpreter; every parameter set then gets a fork() of
+    it with the parameters bound as global variables, on which only the
+    tail is executed. Parameters are bound after the prelude, so they
+    override its defs but values the prelude already computed from them
+    do not change.
+    
+    Args:
+        prelude: Lisp code shared by all variants
+        tail: Lisp code evaluated for each parameter set
+        parameter_sets: Variable bindings, one dictionary per variant
+        interpreter: Interpreter to run the prelude on (default: a new one)
+    
+    Returns:
+        Per parameter set, the prelude's drawing commands followed by the
+        tail's, like execute() of prelude and tail together; a failing
+        prelude or tail yields its error command alone
+    """
+    interpreter = interpreter or AdvancedLispInterpreter()
+    head = interpreter.execute(prelude)
+    failed = any(cmd.get('type') == 'error' for cmd in head)
+    
+    results = []
+    for parameters in parameter_sets:
+        if failed:
+            results.append([dict(cmd) for cmd in head])
+            continue
+        fork = interpreter.fork()
+        fork.variables.update(parameters)
+        commands = fork.execute(tail)
+        if len(commands) == 1 and commands[0].get('type') == 'error':
+            results.append(commands)
+        else:
+            # Fresh prelude commands, so restyling one result leaves the others
+            results.append([dict(cmd) for cmd in head] + commands)
+    return results
+
+
+@lru_cache(maxsize=64)
+def _symbolic_names(code: str) -> Optional[Tuple[str, ...]]:
+    """
+    Placeholder names of template code whose placeholders are all whole atoms
+    
+    Such a placeholder reads as a symbol named after itself ({{span}}), so
+    binding that symbol evaluates like substituting the value's text.
+    Placeholders inside string literals or larger tokens only work as
+    text: None.
+    """
+    for token in tokenize(code):
+        literals, names = split_placeholders(token)
+        if names and literals != ('', ''):
+            return None
+    return split_placeholders(code)[1]
+
+
+def _atom(value: Any) -> Optional[Union[int, float]]:
+    """The number the reader parses from str(value), or None if it differs from value"""
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        atom = parse_atom(str(value))
+        if not isinstance(atom, str) and atom == value:
+            return atom
+    return None
+
+
+def _run_rows(code: str, rows: List[Dict[str, Any]], timeout: Optional[float] = None,
+              max_primitives: Optional[int] = None,
+              max_steps: Optional[int] = None) -> List[DrawList]:
+    """Execute template code once per parameter row (runs inside the workers)"""
+    names = _symbolic_names(code)
+    results = []
+    for row in rows:
+        interpreter = AdvancedLispInterpreter()
+        interpreter.set_budget(max_steps=max_steps, max_seconds=timeout,
+                               max_primitives=max_primitives)
+        
+        symbolic = names is not None
+        bindings = {}
+        for name in names or ():
+            if name in row:
+                atom = _atom(row[name])
+                if atom is None:
+                    symbolic = False
+                    break
+                bindings['{{' + name + '}}'] = atom
+        if symbolic:
+            # Same source every row: compiled once, parameters are variables
+            interpreter.variables.update(bindings)
+            source = code
+        else:
+            source = apply_placeholders(code, row)
+        results.append(interpreter.execute_drawlist(source))
+    return results
+
+
+def instantiate_template(template: Any, rows: Any, max_workers: Optional[int] = None,
+                         chunksize: Optional[int] = None,
+                         timeout: Optional[float] = None,
+                         max_primitives: Optional[int] = None,
+                         max_steps: Optional[int] = None) -> List[DrawList]:
+    """
+    Evaluate a template once per row of a parameter table
+    
+    The template code is parsed and compiled once, with every {{name}}
+    placeholder read as a symbol; each row then runs the same compiled
+    program on a fresh interpreter with its values bound to those
+    symbols, so no code is rendered or re-parsed per row. The result
+    matches execute_batch() of the rendered code. Rows whose values
+    would not read back as the same number (strings, nan) and templates
+    with placeholders inside strings or larger tokens fall back to
+    rendering the code for that row. Large tables are split into chunks
+    over worker processes, each compiling the template once.
+    
+    Args:
+        template: Template code, a Template, or a template library
+            dictionary; the defaults of the latter two fill values a row
+            leaves out
+        rows: Dictionaries of placeholder values, or a table with
+            to_dict('records') such as a pandas DataFrame
+        max_workers: Worker processes (default: CPU count); 1 runs the rows
+            in this process
+        chunksize: Rows per task sent to a worker (default: about four
+            chunks per worker)
+        timeout: Maximum seconds per row, checked by the execution budget
+        max_primitives: Maximum drawing commands per row
+        max_steps: Maximum evaluation steps per row
+    
+    Returns:
+        One DrawList per row, in input order
+    """
+    if isinstance(template, str):
+        code, defaults = template, {}
+    elif isinstance(template, dict):
+        code, defaults = template['code'], template.get('variables') or {}
+    else:
+        code, defaults = template.code, template.variables or {}
+    if hasattr(rows, 'to_dict'):
+        rows = rows.to_dict('records')
+    rows = [{**defaults, **row} for row in rows]
+    
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(rows))
+    if max_workers <= 1:
+        return _run_rows(code, rows, timeout, max_primitives, max_steps)
+    
+    if chunksize is None:
+        chunksize = max(1, len(rows) // (max_workers * 4))
+    chunks = [rows[start:start + chunksize] for start in range(0, len(rows), chunksize)]
+    run = partial(_run_rows, code, timeout=timeout, max_primitives=max_primitives,
+                  max_steps=max_steps)
+    with _worker_pool(max_workers) as executor:
+        return [draw_list for chunk in executor.map(run, chunks) for draw_list in chunk]
@@ -0,0 +1,160 @@
+"""
+Execution Budgets and Profiling for the Lisp Runtime
+Step, time and primitive limits with clean aborts, plus per-form timing
+"""
+
+import time
+from typing import List, Dict, Any, Optional
+
+
+class BudgetExceeded(Exception):
+    """Raised when a script exceeds its execution budget"""
+
+
+class ExecutionBudget:
+    """
+    Limits on how much work one execution may do
+    
+    Steps are top-level forms, loop iterations and user function calls;
+    primitives are drawing commands created, whether or not they end up
+    in the output.
+    The clock is read every CLOCK_INTERVAL steps to keep ticking cheap.
+    Counters restart at the beginning of every execution.
+    """
+    
+    CLOCK_INTERVAL = 1024
+    
+    def __init__(self, max_steps: Optional[int] = None,
+                 max_seconds: Optional[float] = None,
+                 max_primitives: Optional[int] = None):
+        """
+        Initialize budget
+        
+        Args:
+            max_steps: Maximum evaluation steps (None for unlimited)
+            max_seconds: Maximum wall-clock time in seconds
+            max_primitives: Maximum number of drawing commands
+        """
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_primitives = max_primitives
+        self.reset()
+    
+    def reset(self):
+        """Restart counters and the clock"""
+        self.steps = 0
+        self.primitives = 0
+        self.started = time.perf_counter()
+        self._next_clock = self.CLOCK_INTERVAL
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the last reset"""
+        return time.perf_counter() - self.started
+    
+    def step(self, count: int = 1):
+        """Account for evaluation steps, raising when a limit is passed"""
+        self.steps += count
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExceeded(
+                f"Step budget exceeded ({self.max_steps} steps)"
+            )
+        if self.max_seconds is not None and self.steps >= self._next_clock:
+            self._next_clock = self.steps + self.CLOCK_INTERVAL
+            self.check_time()
+    
+    def check_time(self):
+        """Raise when the time limit is passed"""
+        if self.max_seconds is not None and self.elapsed > self.max_seconds:
+            raise BudgetExceeded(
+                f"Time budget exceeded ({self.max_seconds:g} s)"
+            )
+    
+    def primitive(self, count: int = 1):
+        """Account for produced drawing commands"""
+        self.primitives += count
+        if self.max_primitives is not None and self.primitives > self.max_primitives:
+            raise BudgetExceeded(
+                f"Primitive budget exceeded ({self.max_primitives} primitives)"
+            )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get usage of the last execution"""
+        return {
+            'steps': self.steps,
+            'primitives': self.primitives,
+            'elapsed': self.elapsed
+        }
+
+
+class ExecutionProfiler:
+    """
+    Evaluation counts and cumulative time per top-level form and per
+    user function
+    
+    Time of recursive calls is only counted for the outermost call, so a
+    function's cumulative time never exceeds the time spent inside it.
+    """
+    
+    def __init__(self):
+        self.forms = []
+        self.functions = {}
+        self._active = {}
+    
+    def reset(self, labels: Optional[List[Dict[str, Any]]] = None):
+        """
+        Start a new profile
+        
+        Args:
+            labels: One dictionary per top-level form with 'line' and 'source'
+        """
+        self.forms = [
+            {'index': index, 'line': label['line'], 'source': label['source'],
+             'count': 0, 'time': 0.0}
+            for index, label in enumerate(labels or [])
+        ]
+        self.functions = {}
+        self._active = {}
+    
+    def record_form(self, index: int, duration: float):
+        """Record one evaluation of a top-level form"""
+        while len(self.forms) <= index:
+            self.forms.append({'index': len(self.forms), 'line': None,
+                               'source': '', 'count': 0, 'time': 0.0})
+        entry = self.forms[index]
+        entry['count'] += 1
+        entry['time'] += duration
+    
+    def enter_function(self, name: Any) -> float:
+        """Mark a user function call, returning its start time"""
+        entry = self.functions.get(name)
+        if entry is None:
+            entry = self.functions[name] = {'count': 0, 'time': 0.0}
+        entry['count'] += 1
+        self._active[name] = self._active.get(name, 0) + 1
+        return time.perf_counter()
+    
+    def exit_function(self, name: Any, started: float):
+        """Mark the end of a user function call"""
+        depth = self._active[name] - 1
+        self._active[name] = depth
+        if depth == 0:
+            self.functions[name]['time'] += time.perf_counter() - started
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the profile, slowest entries first
+        
+        Returns:
+            Dictionary with 'forms' (list of per-form entries), 'functions'
+            (list of entries with 'name', 'count', 'time') and 'total_time'
+        """
+        functions = [
+            {'name': name, 'count': entry['count'], 'time': entry['time']}
+            for name, entry in self.functions.items()
+        ]
+        return {
+            'forms': sorted(self.forms, key=lambda e: e['time'], reverse=True),
+            'functions': sorted(functions, key=lambda e: e['time'], reverse=True),
+            'total_time': sum(entry['time'] for entry in self.forms)
+        }
@@ -0,0 +1,386 @@
+"""
+Builtin Registry for the Lisp Interpreters
+Dispatch tables mapping symbols to builtin implementations with arity metadata
+"""
+
+import math
+import operator
+from functools import reduce
+from typing import List, Dict, Any, Callable, Iterator, Optional
+
+
+class Builtin:
+    """
+    One builtin function
+    
+    Builtins never raise on a wrong argument count: outside the arity
+    they return a neutral value (0, False or None), so min_args/max_args
+    describe the useful call shapes for tooling such as the linter.
+    """
+    
+    __slots__ = ('name', 'func', 'min_args', 'max_args', 'pure',
+                 'reads_style', 'writes_style')
+    
+    def __init__(self, name: str, func: Callable, min_args: int = 0,
+                 max_args: Optional[int] = None, pure: bool = True,
+                 reads_style: bool = False, writes_style: bool = False):
+        """
+        Initialize builtin
+        
+        Args:
+            name: Lisp symbol
+            func: Implementation called as func(interpreter, args)
+            min_args: Minimum useful argument count
+            max_args: Maximum useful argument count (None for variadic)
+            pure: True when the result only depends on the arguments
+                (and the drawing state for reads_style builtins) and the
+                call has no side effects
+            reads_style: Result depends on color/fill/stroke width
+            writes_style: Changes color/fill/stroke width
+        """
+        self.name = name
+        self.func = func
+        self.min_args = min_args
+        self.max_args = max_args
+        self.pure = pure
+        self.reads_style = reads_style
+        self.writes_style = writes_style
+    
+    def accepts(self, count: int) -> bool:
+        """Check whether an argument count is within the arity"""
+        return count >= self.min_args and (self.max_args is None or count <= self.max_args)
+
+
+class BuiltinRegistry:
+    """Symbol -> Builtin table with O(1) lookup"""
+    
+    def __init__(self, entries: Optional[Dict[str, Builtin]] = None):
+        self._entries = dict(entries or {})
+    
+    def add(self, name: str, func: Callable, min_args: int = 0,
+            max_args: Optional[int] = None, **flags) -> Builtin:
+        """
+        Register a builtin, replacing any previous one of the same name
+        
+        Args:
+            name: Lisp symbol
+            func: Implementation called as func(interpreter, args)
+            min_args: Minimum useful argument count
+            max_args: Maximum useful argument count (None for variadic)
+            **flags: pure, reads_style, writes_style
+        
+        Returns:
+            The registered Builtin
+        """
+        entry = Builtin(name, func, min_args, max_args, **flags)
+        self._entries[name] = entry
+        return entry
+    
+    def get(self, name: Any) -> Optional[Builtin]:
+        """Look up a builtin (None for unknown or non-symbol names)"""
+        if not isinstance(name, str):
+            return None
+        return self._entries.get(name)
+    
+    def copy(self) -> 'BuiltinRegistry':
+        """Get an independent registry with the same entries"""
+        return BuiltinRegistry(self._entries)
+    
+    def names(self) -> List[str]:
+        """Get all registered symbols"""
+        return list(self._entries)
+    
+    def __contains__(self, name: Any) -> bool:
+        return self.get(name) is not None
+    
+    def __iter__(self) -> Iterator[Builtin]:
+        return iter(self._entries.values())
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ---------------------------------------------------------------------------
+# Implementations - each takes the interpreter and the evaluated argument list
+# ---------------------------------------------------------------------------
+
+def _add(rt, args):
+    # Plain left-to-right +: sum() compensates float rounding on Python 3.12+
+    return reduce(operator.add, args, 0)
+
+
+def _sub(rt, args):
+    return -args[0] if len(args) == 1 else args[0] - _add(rt, args[1:])
+
+
+def _mul(rt, args):
+    result = 1
+    for arg in args:
+        result *= arg
+    return result
+
+
+def _div(rt, args):
+    return args[0] / args[1] if len(args) == 2 and args[1] != 0 else 0
+
+
+def _mod(rt, args):
+    return args[0] % args[1] if len(args) == 2 else 0
+
+
+def _unary(func: Callable) -> Callable:
+    """Wrap a one-argument math function returning 0 without arguments"""
+    def builtin(rt, args):
+        return func(args[0]) if args else 0
+    return builtin
+
+
+def _sqrt(rt, args):
+    return math.sqrt(args[0]) if args and args[0] >= 0 else 0
+
+
+def _pow(rt, args):
+    return math.pow(args[0], args[1]) if len(args) == 2 else 0
+
+
+def _min(rt, args):
+    return min(args) if args else 0
+
+
+def _max(rt, args):
+    return max(args) if args else 0
+
+
+def _compare(op: Callable) -> Callable:
+    """Wrap a binary comparison returning False on wrong arity"""
+    def builtin(rt, args):
+        return op(args[0], args[1]) if len(args) == 2 else False
+    return builtin
+
+
+def _and(rt, args):
+    return all(args)
+
+
+def _or(rt, args):
+    return any(args)
+
+
+def _not(rt, args):
+    return not args[0] if args else True
+
+
+def _fill(rt, args):
+    rt.current_color = args[0] if args else '#ffffff'
+    rt.current_fill = True
+    return None
+
+
+def _stroke(rt, args):
+    rt.current_color = args[0] if args else '#ffffff'
+    rt.current_fill = False
+    return None
+
+
+def _stroke_width(rt, args):
+    rt.current_stroke_width = args[0] if args else 2
+    return None
+
+
+def _produced(rt):
+    """Account one drawing command against the execution budget"""
+    budget = getattr(rt, 'budget', None)
+    if budget is not None:
+        budget.primitive()
+
+
+def _rect(rt, args):
+    if len(args) >= 4:
+        _produced(rt)
+        return {
+            'type': 'rect',
+            'x': args[0],
+            'y': args[1],
+            'width': args[2],
+            'height': args[3],
+            'color': rt.current_color,
+            'fill': rt.current_fill,
+            'stroke_width': rt.current_stroke_width
+        }
+    return None
+
+
+def _circle(rt, args):
+    if len(args) >= 3:
+        _produced(rt)
+        return {
+            'type': 'circle',
+            'x': args[0],
+            'y': args[1],
+            'radius': args[2],
+            'color': rt.current_color,
+            'fill': rt.current_fill,
+            'stroke_width': rt.current_stroke_width
+        }
+    return None
+
+
+def _line(rt, args):
+    if len(args) >= 4:
+        _produced(rt)
+        return {
+            'type': 'line',
+            'x1': args[0],
+            'y1': args[1],
+            'x2': args[2],
+            'y2': args[3],
+            'color': rt.current_color,
+            'stroke_width': rt.current_stroke_width
+        }
+    return None
+
+
+def _text(rt, args):
+    if len(args) >= 3:
+        _produced(rt)
+        return {
+            'type': 'text',
+            'x': args[0],
+            'y': args[1],
+            'text': str(args[2]),
+            'size': args[3] if len(args) > 3 else 12,
+            'color': rt.current_color
+        }
+    return None
+
+
+def _polygon(rt, args):
+    # (polygon ((x1 y1) (x2 y2) (x3 y3) ...))
+    if args and isinstance(args[0], list):
+        points = []
+        for point in args[0]:
+            if isinstance(point, list) and len(point) >= 2:
+                points.append({'x': point[0], 'y': point[1]})
+        _produced(rt)
+        return {
+            'type': 'polygon',
+            'points': points,
+            'color': rt.current_color,
+            'fill': rt.current_fill,
+            'stroke_width': rt.current_stroke_width
+        }
+    return None
+
+
+def _arc(rt, args):
+    # (arc x y radius start-angle end-angle)
+    if len(args) >= 5:
+        _produced(rt)
+        return {
+            'type': 'arc',
+            'x': args[0],
+            'y': args[1],
+            'radius': args[2],
+            'start': args[3],
+            'end': args[4],
+            'color': rt.current_color,
+            'fill': rt.current_fill,
+            'stroke_width': rt.current_stroke_width
+        }
+    return None
+
+
+def _basic_rect(rt, args):
+    if len(args) >= 4:
+        return {
+            'type': 'rect',
+            'x': args[0],
+            'y': args[1],
+            'width': args[2],
+            'height': args[3],
+            'color': rt.current_color,
+            'fill': rt.current_fill
+        }
+    return None
+
+
+def _basic_circle(rt, args):
+    if len(args) >= 3:
+        return {
+            'type': 'circle',
+            'x': args[0],
+            'y': args[1],
+            'radius': args[2],
+            'color': rt.current_color,
+            'fill': rt.current_fill
+        }
+    return None
+
+
+def _basic_line(rt, args):
+    if len(args) >= 4:
+        return {
+            'type': 'line',
+            'x1': args[0],
+            'y1': args[1],
+            'x2': args[2],
+            'y2': args[3],
+            'color': rt.current_color
+        }
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Registries
+# ---------------------------------------------------------------------------
+
+def _draws(registry: BuiltinRegistry, name: str, func: Callable, min_args: int):
+    """Register a drawing command (pure, but reads the drawing state)"""
+    registry.add(name, func, min_args, reads_style=True)
+
+
+def _sets_style(registry: BuiltinRegistry, name: str, func: Callable):
+    """Register a drawing state setter"""
+    registry.add(name, func, 0, 1, pure=False, writes_style=True)
+
+
+# Shared by both interpreters
+CORE_BUILTINS = BuiltinRegistry()
+CORE_BUILTINS.add('+', _add)
+CORE_BUILTINS.add('-', _sub, 1)
+CORE_BUILTINS.add('*', _mul)
+CORE_BUILTINS.add('/', _div, 2, 2)
+CORE_BUILTINS.add('%', _mod, 2, 2)
+for _name, _op in (('>', lambda a, b: a > b), ('<', lambda a, b: a < b),
+                   ('>=', lambda a, b: a >= b), ('<=', lambda a, b: a <= b),
+                   ('=', lambda a, b: a == b)):
+    CORE_BUILTINS.add(_name, _compare(_op), 2, 2)
+_sets_style(CORE_BUILTINS, 'fill', _fill)
+_sets_style(CORE_BUILTINS, 'stroke', _stroke)
+CORE_BUILTINS.add('text', _text, 3, 4, reads_style=True)
+
+# LispInterpreter: plain rect/circle/line without stroke width
+SIMPLE_BUILTINS = CORE_BUILTINS.copy()
+_draws(SIMPLE_BUILTINS, 'rect', _basic_rect, 4)
+_draws(SIMPLE_BUILTINS, 'circle', _basic_circle, 3)
+_draws(SIMPLE_BUILTINS, 'line', _basic_line, 4)
+
+# AdvancedLispInterpreter: math, logic, stroke width and more primitives
+ADVANCED_BUILTINS = CORE_BUILTINS.copy()
+for _name, _func in (('sin', math.sin), ('cos', math.cos), ('tan', math.tan),
+                     ('abs', abs), ('floor', math.floor), ('ceil', math.ceil),
+                     ('round', round)):
+    ADVANCED_BUILTINS.add(_name, _unary(_func), 1, 1)
+ADVANCED_BUILTINS.add('sqrt', _sqrt, 1, 1)
+ADVANCED_BUILTINS.add('pow', _pow, 2, 2)
+ADVANCED_BUILTINS.add('min', _min, 1)
+ADVANCED_BUILTINS.add('max', _max, 1)
+ADVANCED_BUILTINS.add('and', _and)
+ADVANCED_BUILTINS.add('or', _or)
+ADVANCED_BUILTINS.add('not', _not, 1, 1)
+_sets_style(ADVANCED_BUILTINS, 'stroke-width', _stroke_width)
+_draws(ADVANCED_BUILTINS, 'rect', _rect, 4)
+_draws(ADVANCED_BUILTINS, 'circle', _circle, 3)
+_draws(ADVANCED_BUILTINS, 'line', _line, 4)
+_draws(ADVANCED_BUILTINS, 'polygon', _polygon, 1)
+_draws(ADVANCED_BUILTINS, 'arc', _arc, 5)
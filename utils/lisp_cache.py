@@ -0,0 +1,362 @@
+"""
+Program Cache for the Lisp Interpreters
+Process-wide LRU cache of parsed and compiled programs keyed by source hash,
+optionally backed by an on-disk cache of parsed forms shared between processes
+"""
+
+import hashlib
+import marshal
+import os
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+# Modules whose code decides the forms stored in the disk cache
+FORMAT_MODULES = ('utils.lisp_reader', 'utils.lisp_optimizer', 'utils.lisp_builtins')
+
+_format_key = None
+
+
+def format_key() -> str:
+    """
+    Get the key of the current parsed-form format
+    
+    Hashes the source files of the reader, the optimizer and the builtins
+    it folds with, so any code change moves the disk cache to a fresh
+    directory instead of loading forms built by older code.
+    """
+    global _format_key
+    if _format_key is None:
+        import importlib
+        
+        digest = hashlib.sha256()
+        for name in FORMAT_MODULES:
+            with open(importlib.import_module(name).__file__, 'rb') as f:
+                digest.update(f.read())
+        digest.update(f"py{sys.version_info[0]}{sys.version_info[1]}".encode())
+        _format_key = digest.hexdigest()[:16]
+    return _format_key
+
+
+class ProgramCache:
+    """
+    Size-bounded LRU cache shared by every interpreter in the process
+    
+    Streamlit reruns and sessions execute the same source text over and
+    over; caching the parsed (or compiled) program means only evaluation
+    repeats while the text is unchanged.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize program cache
+        
+        Args:
+            max_entries: Maximum number of cached programs
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def source_key(kind: str, code: str) -> str:
+        """Build the cache key for a program kind and its source"""
+        digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        return f"{kind}:{digest}"
+    
+    def get(self, kind: str, code: str) -> Optional[Any]:
+        """
+        Look up a cached program
+        
+        Args:
+            kind: Program representation (e.g. 'parsed', 'compiled')
+            code: Lisp source code
+        
+        Returns:
+            Cached program or None
+        """
+        key = self.source_key(kind, code)
+        with self._lock:
+            program = self._entries.get(key)
+            if program is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return program
+    
+    def put(self, kind: str, code: str, program: Any):
+        """Store a program, evicting the least recently used entry"""
+        key = self.source_key(kind, code)
+        with self._lock:
+            self._entries[key] = program
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_or_build(self, kind: str, code: str,
+                     builder: Callable[[str], Any]) -> Any:
+        """
+        Get a cached program or build and cache it
+        
+        Args:
+            kind: Program representation
+            code: Lisp source code
+            builder: Function turning source code into the program
+        
+        Returns:
+            Program for the source code
+        """
+        program = self.get(kind, code)
+        if program is None:
+            program = builder(code)
+            self.put(kind, code, program)
+        return program
+    
+    def clear(self):
+        """Drop all cached programs and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+class DiskProgramCache:
+    """
+    Directory of serialized parsed programs
+    
+    Closures cannot be stored, so the cache holds the parsed (and
+    optimized) forms, which only need the cheap compile step when a new
+    process or Streamlit worker loads them. Files are marshal data named
+    by kind and source hash, in a subdirectory per format_key() so forms
+    built by other code are never read; those directories are removed
+    when the current one is created. At most max_entries files are kept,
+    pruning the least recently used on put. Unreadable or corrupt files
+    are rebuilt; a cache without a directory only builds.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 1024):
+        """
+        Initialize disk cache
+        
+        Args:
+            directory: Cache root directory (None disables the cache)
+            max_entries: Maximum number of cached files
+        """
+        self.root = directory or None
+        self.directory = None
+        if self.root:
+            self.directory = os.path.join(self.root, format_key())
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def path(self, kind: str, code: str) -> Optional[str]:
+        """Get the file holding a program (None when disabled)"""
+        if self.directory is None:
+            return None
+        key = ProgramCache.source_key(kind, code).replace(':', '-')
+        return os.path.join(self.directory, key + '.ast')
+    
+    def get(self, kind: str, code: str) -> Optional[Any]:
+        """
+        Load a cached program
+        
+        Args:
+            kind: Program representation (e.g. 'parsed', 'optimized')
+            code: Lisp source code
+        
+        Returns:
+            Parsed forms or None
+        """
+        path = self.path(kind, code)
+        program = None
+        if path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    program = marshal.load(f)
+                # The modification time orders files for LRU pruning
+                os.utime(path)
+            except (OSError, EOFError, ValueError, TypeError):
+                program = None
+            if not isinstance(program, list):
+                program = None
+        with self._lock:
+            if program is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return program
+    
+    def put(self, kind: str, code: str, program: Any):
+        """Store parsed forms; programs marshal cannot hold are skipped"""
+        path = self.path(kind, code)
+        if path is None:
+            return
+        try:
+            data = marshal.dumps(program)
+        except ValueError:
+            return
+        # Write a private file first so readers never see a partial one
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, exist_ok=True)
+                self._remove_stale_formats()
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, path)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return
+        self._prune()
+    
+    def _files(self) -> list:
+        """List cached files of the current format"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name)
+                for name in names if name.endswith('.ast')]
+    
+    def _prune(self):
+        """Delete the least recently used files beyond max_entries"""
+        files = self._files()
+        if len(files) <= self.max_entries:
+            return
+        
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0.0
+        
+        files.sort(key=mtime)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _remove_stale_formats(self):
+        """Delete the directories other format keys left under the root"""
+        current = os.path.basename(self.directory)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            # Only touch directories shaped like format keys
+            if (name != current and len(name) == len(current)
+                    and all(c in '0123456789abcdef' for c in name)
+                    and os.path.isdir(path)):
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def get_or_build(self, kind: str, code: str,
+                     builder: Callable[[str], Any]) -> Any:
+        """
+        Load cached forms or build and store them
+        
+        Args:
+            kind: Program representation
+            code: Lisp source code
+            builder: Function turning source code into parsed forms
+        
+        Returns:
+            Parsed forms for the source code
+        """
+        if self.directory is None:
+            return builder(code)
+        program = self.get(kind, code)
+        if program is None:
+            program = builder(code)
+            self.put(kind, code, program)
+        return program
+    
+    def clear(self):
+        """Delete all cached files of the current format and reset counters"""
+        if self.directory is not None:
+            for path in self._files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.directory is not None,
+                'directory': self.directory,
+                'entries': len(self._files()) if self.directory else 0,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Singleton program cache
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_program_cache() -> ProgramCache:
+    """Get process-wide program cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ProgramCache()
+    return _cache
+
+
+# Singleton disk cache
+_disk_cache = None
+
+def get_disk_cache() -> DiskProgramCache:
+    """
+    Get process-wide disk cache
+    
+    The cache is opt-in: it is only enabled when the LISP_CACHE_DIR
+    environment variable names a directory, and LISP_CACHE_MAX_ENTRIES
+    overrides its size limit.
+    """
+    global _disk_cache
+    if _disk_cache is None:
+        with _cache_lock:
+            if _disk_cache is None:
+                _disk_cache = DiskProgramCache(
+                    os.getenv("LISP_CACHE_DIR", ""),
+                    int(os.getenv("LISP_CACHE_MAX_ENTRIES", "1024"))
+                )
+    return _disk_cache
+
+
+def disable_disk_cache():
+    """Turn the process-wide disk cache off (e.g. in worker processes)"""
+    global _disk_cache
+    with _cache_lock:
+        _disk_cache = DiskProgramCache(None)
@@ -0,0 +1,462 @@
+"""
+Closure Compiler for the Advanced Lisp Interpreter
+Turns parsed forms into trees of Python closures once, so loops and
+reruns execute without re-dispatching on every node
+"""
+
+import sys
+import threading
+from typing import List, Dict, Any, Callable, Iterator, Tuple
+
+from utils.lisp_builtins import ADVANCED_BUILTINS
+from utils.lisp_environment import Environment
+from utils.lisp_vectorize import MIN_ITERATIONS, compile_loop
+
+
+# A compiled node is called as node(interpreter, environment)
+CompiledNode = Callable[[Any, Environment], Any]
+
+# Iterations per vectorized slice when a loop is streamed
+STREAM_CHUNK = 4096
+
+# Tail calls one _invoke runs before giving up on a runaway recursion
+MAX_TAIL_CALLS = 100000
+
+# Nested (non-tail) user function calls allowed, and the Python frames
+# reserved per call: compiled closures nest several frames per Lisp call
+MAX_CALL_DEPTH = 1000
+FRAMES_PER_CALL = 8
+
+
+class _CallDepth(threading.local):
+    """Nested user function calls running in the current thread"""
+    depth = 0
+
+
+_calls = _CallDepth()
+
+# Threads running user functions share one raised recursion limit
+_limit_lock = threading.Lock()
+_limit_users = 0
+_saved_limit = 0
+
+
+def _raise_recursion_limit():
+    """Make room for MAX_CALL_DEPTH nested calls while any thread needs it"""
+    global _limit_users, _saved_limit
+    with _limit_lock:
+        if _limit_users == 0:
+            _saved_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(_saved_limit + MAX_CALL_DEPTH * FRAMES_PER_CALL)
+        _limit_users += 1
+
+
+def _restore_recursion_limit():
+    """Undo _raise_recursion_limit once the last thread is done"""
+    global _limit_users
+    with _limit_lock:
+        _limit_users -= 1
+        if _limit_users == 0:
+            sys.setrecursionlimit(_saved_limit)
+
+
+def _const(value: Any) -> CompiledNode:
+    """Node returning a literal value"""
+    def node(rt, env):
+        return value
+    return node
+
+
+def _raiser(exc: Exception) -> CompiledNode:
+    """Node raising an error deferred from compile time to run time"""
+    def node(rt, env):
+        raise exc
+    return node
+
+
+def _missing() -> CompiledNode:
+    """Node for a missing operand of a special form"""
+    return _raiser(IndexError('list index out of range'))
+
+
+# ---------------------------------------------------------------------------
+# Special forms
+# ---------------------------------------------------------------------------
+
+def _binds_locally(expr: Any) -> bool:
+    """Check whether evaluating expr may add bindings to the current frame"""
+    if not isinstance(expr, list):
+        return False
+    if expr and expr[0] == 'def':
+        return True
+    return any(_binds_locally(e) for e in expr)
+
+
+def _compile_def(expr: List, tail: bool = False) -> CompiledNode:
+    # (def name value)
+    if len(expr) < 3:
+        return _missing()
+    var_name = expr[1]
+    value_node = compile_expr(expr[2])
+    
+    def node(rt, env):
+        value = value_node(rt, env)
+        env.vars[var_name] = value
+        return value
+    return node
+
+
+def _compile_defn(expr: List, tail: bool = False) -> CompiledNode:
+    # (defn name (args) body)
+    if len(expr) < 4:
+        return _missing()
+    func_name = expr[1]
+    args = expr[2] if isinstance(expr[2], list) else []
+    body = expr[3]
+    code = compile_expr(body, tail=True)
+    
+    def node(rt, env):
+        rt.functions[func_name] = {'args': args, 'body': body, 'code': code}
+        return None
+    return node
+
+
+def _compile_if(expr: List, tail: bool = False) -> CompiledNode:
+    # (if condition then [else])
+    if len(expr) < 2:
+        return _missing()
+    condition = compile_expr(expr[1])
+    then_node = compile_expr(expr[2], tail) if len(expr) > 2 else _missing()
+    else_node = compile_expr(expr[3], tail) if len(expr) > 3 else None
+    
+    def node(rt, env):
+        if condition(rt, env):
+            return then_node(rt, env)
+        elif else_node is not None:
+            return else_node(rt, env)
+        return None
+    return node
+
+
+def iter_commands(result: Any) -> Iterator[Dict]:
+    """Yield the drawing commands a top-level result contributes"""
+    if isinstance(result, dict) and 'type' in result:
+        yield result
+    elif isinstance(result, list):
+        for item in result:
+            if isinstance(item, dict) and 'type' in item:
+                yield item
+
+
+def _compile_do(expr: List, tail: bool = False) -> CompiledNode:
+    # (do expr1 expr2 ...) - value of the last expression
+    body = [compile_expr(e, tail and i == len(expr) - 1)
+            for i, e in enumerate(expr[1:], 1)]
+    
+    def node(rt, env):
+        result = None
+        for e in body:
+            result = e(rt, env)
+        return result
+    
+    def stream(rt, env):
+        # Only the last expression's commands are collected
+        for e in body[:-1]:
+            e(rt, env)
+        if body:
+            last = body[-1]
+            last_stream = getattr(last, 'stream', None)
+            if last_stream is not None:
+                yield from last_stream(rt, env)
+            else:
+                yield from iter_commands(last(rt, env))
+    node.stream = stream
+    return node
+
+
+def _charge(rt, batch):
+    """Account a vectorized batch against the execution budget"""
+    if rt.budget is not None:
+        rt.budget.step(batch.count)
+        rt.budget.primitive(batch.count)
+
+
+def _loop(body_expr: Any, var_name: Any) -> Tuple[Callable, Callable]:
+    """
+    Build the iteration of a loop body over a range of indices
+    
+    Returns two functions taking (rt, env, indices): iterate(), which also
+    takes a batched flag and returns the collected results, and stream(),
+    a generator yielding the collected commands one by one. Bodies that
+    compile_loop() accepts are evaluated over whole index vectors when
+    the loop is long enough; with batched=True the PrimitiveBatch itself
+    is returned so a DrawList can take the columns directly, and stream()
+    works through the vector in STREAM_CHUNK slices to bound memory.
+    """
+    body = compile_expr(body_expr)
+    reuse_frame = not _binds_locally(body_expr)
+    vectorized = compile_loop(body_expr, var_name)
+    
+    def scalar(rt, env, indices):
+        budget = rt.budget
+        loop_env = Environment({}, env)
+        for i in indices:
+            if budget is not None:
+                budget.step()
+            if not reuse_frame:
+                loop_env = Environment({}, env)
+            loop_env.vars[var_name] = i
+            result = body(rt, loop_env)
+            if isinstance(result, dict) and 'type' in result:
+                yield result
+    
+    def iterate(rt, env, indices, batched=False):
+        if vectorized is not None and len(indices) >= MIN_ITERATIONS:
+            batch = vectorized(rt, env, indices)
+            if batch is not None:
+                _charge(rt, batch)
+                return batch if batched else batch.to_commands()
+        
+        results = list(scalar(rt, env, indices))
+        return results if results else None
+    
+    def stream(rt, env, indices):
+        if vectorized is None or len(indices) < MIN_ITERATIONS:
+            yield from scalar(rt, env, indices)
+            return
+        
+        # The body is pure, so each slice may independently fall back
+        for offset in range(0, len(indices), STREAM_CHUNK):
+            chunk = indices[offset:offset + STREAM_CHUNK]
+            batch = vectorized(rt, env, chunk)
+            if batch is not None:
+                _charge(rt, batch)
+                yield from batch.to_commands()
+            else:
+                yield from scalar(rt, env, chunk)
+    
+    return iterate, stream
+
+
+def _compile_repeat(expr: List, tail: bool = False) -> CompiledNode:
+    # (repeat n body) - loop variable 'i'
+    if len(expr) < 3:
+        return _missing()
+    count_node = compile_expr(expr[1])
+    iterate, iterate_stream = _loop(expr[2], 'i')
+    
+    def batched(rt, env, batched=True):
+        count = count_node(rt, env)
+        return iterate(rt, env, range(int(count)), batched)
+    
+    def stream(rt, env):
+        count = count_node(rt, env)
+        yield from iterate_stream(rt, env, range(int(count)))
+    
+    def node(rt, env):
+        return batched(rt, env, False)
+    node.batched = batched
+    node.stream = stream
+    return node
+
+
+def _compile_for(expr: List, tail: bool = False) -> CompiledNode:
+    # (for var start end body)
+    if len(expr) < 5:
+        return _missing()
+    start_node = compile_expr(expr[2])
+    end_node = compile_expr(expr[3])
+    iterate, iterate_stream = _loop(expr[4], expr[1])
+    
+    def bounds(rt, env):
+        start = start_node(rt, env)
+        end = end_node(rt, env)
+        return range(int(start), int(end))
+    
+    def batched(rt, env, batched=True):
+        return iterate(rt, env, bounds(rt, env), batched)
+    
+    def stream(rt, env):
+        yield from iterate_stream(rt, env, bounds(rt, env))
+    
+    def node(rt, env):
+        return batched(rt, env, False)
+    node.batched = batched
+    node.stream = stream
+    return node
+
+
+SPECIAL_FORMS: Dict[str, Callable[[List, bool], CompiledNode]] = {
+    'def': _compile_def,
+    'defn': _compile_defn,
+    'if': _compile_if,
+    'do': _compile_do,
+    'repeat': _compile_repeat,
+    'for': _compile_for,
+}
+
+
+# ---------------------------------------------------------------------------
+# Compiler entry points
+# ---------------------------------------------------------------------------
+
+def _compile_symbol(name: str) -> CompiledNode:
+    """Variable lookup; unbound symbols evaluate to themselves"""
+    def node(rt, env):
+        while env is not None:
+            vars = env.vars
+            if name in vars:
+                return vars[name]
+            env = env.parent
+        return name
+    return node
+
+
+class TailCall:
+    """A user function call left for the enclosing _invoke to run"""
+    
+    __slots__ = ('name', 'func', 'args')
+    
+    def __init__(self, name: Any, func: Dict, args: List):
+        self.name = name
+        self.func = func
+        self.args = args
+
+
+def _invoke(rt, func: Dict, args: List, root: Environment) -> Any:
+    """
+    Run a user function call, counting how deeply calls are nested
+    
+    Other calls nest Python frames, so the outermost call raises the
+    recursion limit to fit MAX_CALL_DEPTH nested calls until it returns.
+    """
+    depth = _calls.depth
+    if depth >= MAX_CALL_DEPTH:
+        raise RecursionError(f'maximum recursion depth exceeded ({MAX_CALL_DEPTH} nested calls)')
+    _calls.depth = depth + 1
+    if depth == 0:
+        _raise_recursion_limit()
+    try:
+        return _trampoline(rt, func, args, root)
+    finally:
+        _calls.depth = depth
+        if depth == 0:
+            _restore_recursion_limit()
+
+
+def _trampoline(rt, func: Dict, args: List, root: Environment) -> Any:
+    """
+    Run a user function body as a trampoline
+    
+    Calls in tail position come back as TailCall and are run by this
+    loop instead of nesting Python frames, so tail recursion is only
+    limited by MAX_TAIL_CALLS. Pure functions go through the memo; every
+    call of a tail chain is cached with the chain's final result.
+    """
+    memo = rt.memo
+    profiler = rt.profiler
+    pending = []
+    entered = []
+    depth = 0
+    try:
+        while True:
+            key = memo.key(rt, func, args, root.vars) if memo is not None else None
+            if key is not None:
+                found, value = memo.get(func, key)
+                if found:
+                    result = value
+                    break
+                pending.append((func, key))
+            
+            code = func.get('code')
+            if code is None:
+                code = func['code'] = compile_expr(func['body'], tail=True)
+            # Function bodies see their arguments and the global frame
+            result = code(rt, Environment(dict(zip(func['args'], args)), root))
+            if type(result) is not TailCall:
+                break
+            
+            depth += 1
+            if depth > MAX_TAIL_CALLS:
+                raise RecursionError('maximum recursion depth exceeded (tail calls)')
+            if rt.budget is not None:
+                rt.budget.step()
+            if profiler is not None:
+                entered.append((result.name, profiler.enter_function(result.name)))
+            func, args = result.func, result.args
+    finally:
+        for name, started in reversed(entered):
+            profiler.exit_function(name, started)
+    
+    for func, key in pending:
+        memo.put(func, key, result)
+    return result
+
+
+def _compile_call(expr: List, tail: bool = False) -> CompiledNode:
+    """User function call or builtin application"""
+    cmd = expr[0]
+    arg_nodes = [compile_expr(arg) for arg in expr[1:]]
+    entry = ADVANCED_BUILTINS.get(cmd)
+    builtin = entry.func if entry is not None else None
+    
+    def node(rt, env):
+        func = rt.functions.get(cmd)
+        args = [arg(rt, env) for arg in arg_nodes]
+        if func is not None:
+            if tail:
+                return TailCall(cmd, func, args)
+            if rt.budget is not None:
+                rt.budget.step()
+            if rt.profiler is not None:
+                started = rt.profiler.enter_function(cmd)
+                try:
+                    return _invoke(rt, func, args, env.root)
+                finally:
+                    rt.profiler.exit_function(cmd, started)
+            return _invoke(rt, func, args, env.root)
+        if builtin is not None:
+            return builtin(rt, args)
+        return None
+    return node
+
+
+def compile_expr(expr: Any, tail: bool = False) -> CompiledNode:
+    """
+    Compile a parsed expression into a closure
+    
+    Args:
+        expr: Parsed expression (atom or nested list)
+        tail: True for the tail position of a function body, where
+            user function calls return a TailCall for _invoke to run
+    
+    Returns:
+        Callable taking (interpreter, environment)
+    """
+    if isinstance(expr, (int, float)):
+        return _const(expr)
+    
+    if isinstance(expr, str):
+        return _compile_symbol(expr)
+    
+    if not isinstance(expr, list) or len(expr) == 0:
+        return _const(None)
+    
+    cmd = expr[0]
+    if isinstance(cmd, str) and cmd in SPECIAL_FORMS:
+        return SPECIAL_FORMS[cmd](expr, tail)
+    
+    return _compile_call(expr, tail)
+
+
+def compile_program(forms: List[Any]) -> List[CompiledNode]:
+    """
+    Compile a sequence of top-level forms
+    
+    Args:
+        forms: Parsed top-level expressions
+    
+    Returns:
+        List of compiled closures in program order
+    """
+    return [compile_expr(form) for form in forms if form is not None]
@@ -0,0 +1,371 @@
+"""
+DXF Backend for Lisp Drawings
+Writes interpreter draw commands into an ezdxf modelspace or a streaming R12 file
+"""
+
+import io
+import math
+import re
+from typing import List, Dict, Any, Iterable, Optional, TextIO, Tuple
+
+from ezdxf.addons.r12writer import R12FastStreamWriter
+from ezdxf.colors import DXF_DEFAULT_COLORS, int2rgb
+from ezdxf.enums import TextEntityAlignment
+
+from utils.dxf_utils import create_dxf_header
+from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+
+
+_HEX_COLOR = re.compile(r'^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+
+RGB = Tuple[int, int, int]
+
+
+def parse_color(color: Any) -> Optional[RGB]:
+    """Parse '#rgb' or '#rrggbb' into an (r, g, b) tuple (None otherwise)"""
+    if not isinstance(color, str):
+        return None
+    match = _HEX_COLOR.match(color)
+    if match is None:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(d * 2 for d in digits)
+    value = int(digits, 16)
+    return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+
+def color_layer(color: Any) -> str:
+    """Layer name of a drawing color ('0' for colors that are not hex)"""
+    rgb = parse_color(color)
+    if rgb is None:
+        return '0'
+    return 'COLOR_%02X%02X%02X' % rgb
+
+
+def nearest_aci(rgb: RGB) -> int:
+    """Closest AutoCAD color index (1-255) for an RGB color"""
+    best, best_distance = 7, None
+    for index in range(1, 256):
+        r, g, b = int2rgb(DXF_DEFAULT_COLORS[index])
+        distance = (r - rgb[0]) ** 2 + (g - rgb[1]) ** 2 + (b - rgb[2]) ** 2
+        if best_distance is None or distance < best_distance:
+            best, best_distance = index, distance
+    return best
+
+
+def _number(value: Any) -> bool:
+    return type(value) in (int, float) and math.isfinite(value)
+
+
+class _Backend:
+    """
+    Shared conversion of drawing commands to DXF geometry
+    
+    Canvas coordinates grow downwards; DXF coordinates grow upwards, so
+    y is negated and arc angles are mirrored. Lengths are multiplied by
+    scale. Commands without usable geometry (errors, symbolic values,
+    unknown types) are skipped and counted; error messages are kept.
+    """
+    
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+        self.written = 0
+        self.skipped = 0
+        self.errors = []
+    
+    def _point(self, x: float, y: float) -> Tuple[float, float]:
+        return x * self.scale, -y * self.scale
+    
+    def add(self, cmd: Dict) -> bool:
+        """
+        Write one drawing command
+        
+        Returns:
+            True when an entity was written
+        """
+        kind = cmd.get('type') if isinstance(cmd, dict) else None
+        if kind == 'error':
+            self.errors.append(str(cmd.get('message', '')))
+        writer = getattr(self, '_add_' + kind, None) if isinstance(kind, str) else None
+        try:
+            ok = writer is not None and writer(cmd, color_layer(cmd.get('color')))
+        except (KeyError, TypeError, ValueError):
+            ok = False
+        if ok:
+            self.written += 1
+        else:
+            self.skipped += 1
+        return ok
+    
+    def extend(self, commands: Iterable[Dict]) -> int:
+        """Write drawing commands (any iterable, consumed lazily); returns entities written"""
+        before = self.written
+        for cmd in commands:
+            self.add(cmd)
+        return self.written - before
+    
+    def _rect_points(self, cmd: Dict) -> Optional[List[Tuple[float, float]]]:
+        x, y, w, h = cmd['x'], cmd['y'], cmd['width'], cmd['height']
+        if not all(_number(v) for v in (x, y, w, h)):
+            return None
+        return [self._point(x, y), self._point(x + w, y),
+                self._point(x + w, y + h), self._point(x, y + h)]
+    
+    def _polygon_points(self, cmd: Dict) -> Optional[List[Tuple[float, float]]]:
+        points = [(p['x'], p['y']) for p in cmd['points']]
+        if len(points) < 2 or not all(_number(v) for p in points for v in p):
+            return None
+        return [self._point(x, y) for x, y in points]
+    
+    def _arc_angles(self, cmd: Dict) -> Tuple[float, float]:
+        """DXF start/end angles in degrees of a canvas arc (radians, y down)"""
+        return -math.degrees(cmd['end']), -math.degrees(cmd['start'])
+
+
+class DXFBackend(_Backend):
+    """
+    Draw commands into an ezdxf document
+    
+    Every hex color becomes a layer (COLOR_RRGGBB) carrying the color as
+    true color, and entities are drawn BYLAYER. Circles are inserted as
+    blocks shared by every circle of the same radius (and fill), so
+    repeated bars cost one INSERT each. Filled shapes get a solid hatch
+    when hatch_fills is set; otherwise only outlines are drawn.
+    """
+    
+    def __init__(self, doc: Optional[Any] = None, scale: float = 1.0,
+                 hatch_fills: bool = False):
+        """
+        Initialize backend
+        
+        Args:
+            doc: ezdxf document to draw into (default: a new R2010
+                document in millimeters)
+            scale: Drawing units per canvas unit
+            hatch_fills: Add solid hatches for filled rects, polygons
+                and circles
+        """
+        super().__init__(scale)
+        self.doc = doc if doc is not None else create_dxf_header()
+        self.msp = self.doc.modelspace()
+        self.hatch_fills = hatch_fills
+        self._blocks = {}
+    
+    def _layer(self, name: str, color: Any) -> str:
+        if name != '0' and name not in self.doc.layers:
+            layer = self.doc.layers.add(name)
+            layer.rgb = parse_color(color)
+        return name
+    
+    def _outline(self, points, cmd: Dict, layer: str) -> bool:
+        if points is None:
+            return False
+        attribs = {'layer': self._layer(layer, cmd.get('color'))}
+        self.msp.add_lwpolyline(points, close=True, dxfattribs=attribs)
+        if self.hatch_fills and cmd.get('fill') is True:
+            hatch = self.msp.add_hatch(dxfattribs=attribs)
+            hatch.paths.add_polyline_path(points, is_closed=True)
+        return True
+    
+    def _add_rect(self, cmd: Dict, layer: str) -> bool:
+        return self._outline(self._rect_points(cmd), cmd, layer)
+    
+    def _add_polygon(self, cmd: Dict, layer: str) -> bool:
+        return self._outline(self._polygon_points(cmd), cmd, layer)
+    
+    def _add_line(self, cmd: Dict, layer: str) -> bool:
+        coords = (cmd['x1'], cmd['y1'], cmd['x2'], cmd['y2'])
+        if not all(_number(v) for v in coords):
+            return False
+        self.msp.add_line(self._point(coords[0], coords[1]), self._point(coords[2], coords[3]),
+                          dxfattribs={'layer': self._layer(layer, cmd.get('color'))})
+        return True
+    
+    def _circle_block(self, radius: float, filled: bool) -> str:
+        key = (radius, filled)
+        name = self._blocks.get(key)
+        if name is None:
+            name = f"CIRCLE_{len(self._blocks) + 1}"
+            block = self.doc.blocks.new(name=name)
+            # Layer 0 entities take the layer of the INSERT
+            block.add_circle((0, 0), radius)
+            if filled:
+                hatch = block.add_hatch()
+                hatch.paths.add_edge_path().add_arc((0, 0), radius, 0, 360)
+            self._blocks[key] = name
+        return name
+    
+    def _add_circle(self, cmd: Dict, layer: str) -> bool:
+        x, y, radius = cmd['x'], cmd['y'], cmd['radius']
+        if not all(_number(v) for v in (x, y, radius)) or radius <= 0:
+            return False
+        filled = self.hatch_fills and cmd.get('fill') is True
+        name = self._circle_block(radius * self.scale, filled)
+        self.msp.add_blockref(name, self._point(x, y),
+                              dxfattribs={'layer': self._layer(layer, cmd.get('color'))})
+        return True
+    
+    def _add_arc(self, cmd: Dict, layer: str) -> bool:
+        x, y, radius = cmd['x'], cmd['y'], cmd['radius']
+        if not all(_number(v) for v in (x, y, radius, cmd['start'], cmd['end'])) or radius <= 0:
+            return False
+        start, end = self._arc_angles(cmd)
+        self.msp.add_arc(self._point(x, y), radius * self.scale, start, end,
+                         dxfattribs={'layer': self._layer(layer, cmd.get('color'))})
+        return True
+    
+    def _add_text(self, cmd: Dict, layer: str) -> bool:
+        x, y, size = cmd['x'], cmd['y'], cmd.get('size', 12)
+        if not all(_number(v) for v in (x, y, size)):
+            return False
+        text = self.msp.add_text(str(cmd['text']), height=size * self.scale,
+                                 dxfattribs={'layer': self._layer(layer, cmd.get('color'))})
+        # Centered on the anchor point, as in the previews
+        text.set_placement(self._point(x, y), align=TextEntityAlignment.MIDDLE_CENTER)
+        return True
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the document as DXF file content"""
+        stream = io.StringIO()
+        self.doc.write(stream)
+        return stream.getvalue().encode(self.doc.output_encoding, errors='replace')
+
+
+class R12StreamBackend(_Backend):
+    """
+    Draw commands straight into a streaming DXF R12 writer
+    
+    Entities are written as they arrive and nothing is kept in memory,
+    so output size is unbounded. R12 has no true color and the fast
+    writer no blocks: colors become layers with the nearest AutoCAD
+    color index set on each entity, circles are written as circles and
+    fills are not hatched.
+    """
+    
+    def __init__(self, stream: TextIO, scale: float = 1.0):
+        """
+        Initialize backend
+        
+        Args:
+            stream: Text stream receiving the DXF content
+            scale: Drawing units per canvas unit
+        """
+        super().__init__(scale)
+        self.writer = R12FastStreamWriter(stream)
+        self._colors = {}
+    
+    def _attribs(self, cmd: Dict, layer: str) -> Dict[str, Any]:
+        color = None
+        if layer != '0':
+            color = self._colors.get(layer)
+            if color is None:
+                color = self._colors[layer] = nearest_aci(parse_color(cmd['color']))
+        return {'layer': layer, 'color': color}
+    
+    def _add_rect(self, cmd: Dict, layer: str) -> bool:
+        points = self._rect_points(cmd)
+        if points is None:
+            return False
+        self.writer.add_polyline(points, closed=True, **self._attribs(cmd, layer))
+        return True
+    
+    def _add_polygon(self, cmd: Dict, layer: str) -> bool:
+        points = self._polygon_points(cmd)
+        if points is None:
+            return False
+        self.writer.add_polyline(points, closed=True, **self._attribs(cmd, layer))
+        return True
+    
+    def _add_line(self, cmd: Dict, layer: str) -> bool:
+        coords = (cmd['x1'], cmd['y1'], cmd['x2'], cmd['y2'])
+        if not all(_number(v) for v in coords):
+            return False
+        self.writer.add_line(self._point(coords[0], coords[1]), self._point(coords[2], coords[3]),
+                             **self._attribs(cmd, layer))
+        return True
+    
+    def _add_circle(self, cmd: Dict, layer: str) -> bool:
+        x, y, radius = cmd['x'], cmd['y'], cmd['radius']
+        if not all(_number(v) for v in (x, y, radius)) or radius <= 0:
+            return False
+        self.writer.add_circle(self._point(x, y), radius * self.scale, **self._attribs(cmd, layer))
+        return True
+    
+    def _add_arc(self, cmd: Dict, layer: str) -> bool:
+        x, y, radius = cmd['x'], cmd['y'], cmd['radius']
+        if not all(_number(v) for v in (x, y, radius, cmd['start'], cmd['end'])) or radius <= 0:
+            return False
+        start, end = self._arc_angles(cmd)
+        self.writer.add_arc(self._point(x, y), radius * self.scale, start, end,
+                            **self._attribs(cmd, layer))
+        return True
+    
+    def _add_text(self, cmd: Dict, layer: str) -> bool:
+        x, y, size = cmd['x'], cmd['y'], cmd.get('size', 12)
+        if not all(_number(v) for v in (x, y, size)):
+            return False
+        self.writer.add_text(str(cmd['text']), self._point(x, y), height=size * self.scale,
+                             align='MIDDLE_CENTER', **self._attribs(cmd, layer))
+        return True
+    
+    def close(self):
+        """Write the end of file marker"""
+        self.writer.close()
+
+
+def script_to_dxf(code: str, scale: float = 1.0, hatch_fills: bool = False,
+                  interpreter: Optional[AdvancedLispInterpreter] = None) -> bytes:
+    """
+    Run a Lisp script and convert its drawing to DXF file content
+    
+    Commands are streamed from iter_execute() into the document, so no
+    command list is built.
+    
+    Args:
+        code: Lisp source code
+        scale: Drawing units per canvas unit
+        hatch_fills: Add solid hatches for filled shapes
+        interpreter: Interpreter to run the script on (default: a new one)
+    
+    Returns:
+        DXF file content
+    
+    Raises:
+        ValueError: When the script fails
+    """
+    interpreter = interpreter or AdvancedLispInterpreter()
+    backend = DXFBackend(scale=scale, hatch_fills=hatch_fills)
+    backend.extend(interpreter.iter_execute(code))
+    if backend.errors:
+        raise ValueError(backend.errors[0])
+    return backend.to_bytes()
+
+
+def stream_script_to_r12(code: str, stream: TextIO, scale: float = 1.0,
+                         interpreter: Optional[AdvancedLispInterpreter] = None) -> int:
+    """
+    Run a Lisp script and stream its drawing as DXF R12 into a text stream
+    
+    Args:
+        code: Lisp source code
+        stream: Text stream receiving the DXF content
+        scale: Drawing units per canvas unit
+        interpreter: Interpreter to run the script on (default: a new one)
+    
+    Returns:
+        Number of entities written
+    
+    Raises:
+        ValueError: When the script fails (the stream holds the entities
+            written before the error)
+    """
+    interpreter = interpreter or AdvancedLispInterpreter()
+    backend = R12StreamBackend(stream, scale=scale)
+    try:
+        backend.extend(interpreter.iter_execute(code))
+    finally:
+        backend.close()
+    if backend.errors:
+        raise ValueError(backend.errors[0])
+    return backend.written
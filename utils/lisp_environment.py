@@ -0,0 +1,81 @@
+"""
+Lexical Environments for the Lisp Runtime
+Chained scopes with O(1) creation and parent-walking lookup
+"""
+
+from typing import Any, Dict, Iterator, Optional
+
+
+class Environment:
+    """
+    One frame of variable bindings linked to its enclosing frame
+    
+    The root frame holds the interpreter's global variables. Function
+    calls open a frame directly under the root, loops open a frame under
+    the current one, so creating a scope never copies existing bindings.
+    """
+    
+    __slots__ = ('vars', 'parent', 'root')
+    
+    def __init__(self, vars: Optional[Dict[str, Any]] = None,
+                 parent: Optional['Environment'] = None):
+        """
+        Initialize environment frame
+        
+        Args:
+            vars: Bindings owned by this frame (used as-is, not copied)
+            parent: Enclosing frame, None for the global frame
+        """
+        self.vars = {} if vars is None else vars
+        self.parent = parent
+        self.root = self if parent is None else parent.root
+    
+    def lookup(self, name: Any, default: Any = None) -> Any:
+        """
+        Find the innermost binding of a name
+        
+        Args:
+            name: Variable name
+            default: Value returned when the name is unbound
+        
+        Returns:
+            Bound value or default
+        """
+        env = self
+        while env is not None:
+            vars = env.vars
+            if name in vars:
+                return vars[name]
+            env = env.parent
+        return default
+    
+    def define(self, name: Any, value: Any) -> Any:
+        """Bind a name in this frame"""
+        self.vars[name] = value
+        return value
+    
+    def child(self, vars: Optional[Dict[str, Any]] = None) -> 'Environment':
+        """Open a new frame enclosed by this one"""
+        return Environment(vars, self)
+    
+    def __contains__(self, name: Any) -> bool:
+        env = self
+        while env is not None:
+            if name in env.vars:
+                return True
+            env = env.parent
+        return False
+    
+    def frames(self) -> Iterator['Environment']:
+        """Iterate frames from innermost to the root"""
+        env = self
+        while env is not None:
+            yield env
+            env = env.parent
+    
+    def flatten(self) -> Dict[str, Any]:
+        """Get all visible bindings as a single dictionary"""
+        merged = {}
+        for env in reversed(list(self.frames())):
+            merged.update(env.vars)
+        return merged
@@ -0,0 +1,334 @@
+"""
+Incremental Re-evaluation for the Advanced Lisp Interpreter
+Dependency graph between top-level forms so edits only re-run what they affect
+"""
+
+import itertools
+from typing import List, Dict, Any, Set, Tuple, Optional
+
+from utils.lisp_builtins import ADVANCED_BUILTINS
+from utils.lisp_compiler import compile_expr
+from utils.lisp_environment import Environment
+from utils.lisp_reader import read_all
+
+
+# Pseudo-binding standing for the drawing state (color, fill, stroke width)
+STYLE = ('style',)
+
+PRIMITIVES = {b.name for b in ADVANCED_BUILTINS if b.reads_style}
+STYLE_SETTERS = {b.name for b in ADVANCED_BUILTINS if b.writes_style}
+
+_MISSING = object()
+
+
+def _hashable(value: Any) -> bool:
+    """Check whether a value can be used as a binding name"""
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+def scan_form(expr: Any, top: bool, reads: Set, writes: Set, calls: Set):
+    """
+    Collect the bindings an expression may read and write
+    
+    Variables are recorded as ('v', name), functions as ('f', name) and
+    the drawing state as STYLE. The analysis over-approximates: a symbol
+    shadowed by a loop variable still counts as a read.
+    
+    Args:
+        expr: Parsed expression
+        top: True when a def here binds a global (not inside a loop/function)
+        reads: Set receiving read dependencies
+        writes: Set receiving global writes
+        calls: Set receiving names of called functions
+    """
+    if isinstance(expr, str):
+        reads.add(('v', expr))
+        return
+    
+    if not isinstance(expr, list) or not expr:
+        return
+    
+    cmd = expr[0]
+    
+    if cmd == 'def':
+        if len(expr) > 2:
+            scan_form(expr[2], top, reads, writes, calls)
+        if top and len(expr) > 1 and _hashable(expr[1]):
+            # Writes are also reads: a def that fails halfway leaves the old value
+            reads.add(('v', expr[1]))
+            writes.add(('v', expr[1]))
+        return
+    
+    if cmd == 'defn':
+        if len(expr) > 1 and _hashable(expr[1]):
+            reads.add(('f', expr[1]))
+            writes.add(('f', expr[1]))
+        return
+    
+    if cmd in ('repeat', 'for'):
+        bounds = expr[1:2] if cmd == 'repeat' else expr[2:4]
+        for e in bounds:
+            scan_form(e, top, reads, writes, calls)
+        body = expr[2:3] if cmd == 'repeat' else expr[4:5]
+        for e in body:
+            scan_form(e, False, reads, writes, calls)
+        return
+    
+    if cmd in ('if', 'do'):
+        for e in expr[1:]:
+            scan_form(e, top, reads, writes, calls)
+        return
+    
+    if _hashable(cmd):
+        reads.add(('f', cmd))
+        calls.add(cmd)
+        if cmd in PRIMITIVES:
+            reads.add(STYLE)
+        elif cmd in STYLE_SETTERS:
+            reads.add(STYLE)
+            writes.add(STYLE)
+    else:
+        scan_form(cmd, top, reads, writes, calls)
+    
+    for e in expr[1:]:
+        scan_form(e, top, reads, writes, calls)
+
+
+def summarize_function(func: Dict) -> Tuple[Set, Set, Set]:
+    """
+    Summarize the bindings a user function touches when called
+    
+    Args:
+        func: Function entry from interpreter.functions
+    
+    Returns:
+        Tuple of (reads, writes, calls)
+    """
+    reads, writes, calls = set(), set(), set()
+    scan_form(func.get('body'), False, reads, writes, calls)
+    for arg in func.get('args', []):
+        if _hashable(arg):
+            reads.discard(('v', arg))
+    return reads, writes, calls
+
+
+class _FormRecord:
+    """Cached evaluation of one top-level form"""
+    
+    __slots__ = ('key', 'node', 'signature', 'effects', 'commands', 'version')
+    
+    def __init__(self, key, node, signature, effects, commands, version):
+        self.key = key
+        self.node = node
+        self.signature = signature
+        self.effects = effects
+        self.commands = commands
+        self.version = version
+
+
+class IncrementalExecutor:
+    """
+    Re-executes a script by re-evaluating only the forms affected by an edit
+    
+    Each run starts from the interpreter's initial state. A top-level form
+    is reused when its text is unchanged and every binding it reads (variables,
+    functions and the drawing state, including those read through called
+    functions) was produced by the same upstream evaluation as last time.
+    Reused forms replay their recorded bindings and drawing commands; the
+    output is identical to a full execute() on a fresh interpreter.
+    """
+    
+    def __init__(self, interpreter):
+        """
+        Initialize incremental executor
+        
+        Args:
+            interpreter: AdvancedLispInterpreter holding the initial state
+        """
+        self.interpreter = interpreter
+        self._initial_variables = dict(interpreter.variables)
+        self._initial_functions = dict(interpreter.functions)
+        self._initial_style = self._get_style()
+        self._records = {}
+        self._versions = itertools.count(1)
+        self._summaries = {}
+        self.graph = {}
+        self.last_stats = {'forms': 0, 'evaluated': 0, 'reused': 0}
+    
+    def _get_style(self) -> Tuple:
+        rt = self.interpreter
+        return (rt.current_color, rt.current_fill, rt.current_stroke_width)
+    
+    def _set_style(self, style: Tuple):
+        rt = self.interpreter
+        rt.current_color, rt.current_fill, rt.current_stroke_width = style
+    
+    def _reset(self):
+        """Restore the initial interpreter state"""
+        rt = self.interpreter
+        rt.variables = dict(self._initial_variables)
+        rt.functions = dict(self._initial_functions)
+        self._set_style(self._initial_style)
+        if rt.budget is not None:
+            rt.budget.reset()
+    
+    def invalidate(self):
+        """Forget all cached forms"""
+        self._records = {}
+        self._summaries = {}
+    
+    def _summary(self, name: Any) -> Optional[Tuple[Set, Set, Set]]:
+        """Summary of the function currently bound to name"""
+        func = self.interpreter.functions.get(name)
+        if func is None:
+            return None
+        cached = self._summaries.get(name)
+        if cached is None or cached[0] is not func:
+            cached = (func, summarize_function(func))
+            self._summaries[name] = cached
+        return cached[1]
+    
+    def analyze(self, expr: Any) -> Tuple[Set, Set]:
+        """
+        Get the reads and writes of a top-level form, including the
+        bindings touched through the user functions it calls
+        
+        Args:
+            expr: Parsed top-level expression
+        
+        Returns:
+            Tuple of (reads, writes)
+        """
+        reads, writes, calls = set(), set(), set()
+        scan_form(expr, True, reads, writes, calls)
+        
+        pending = list(calls)
+        seen = set(pending)
+        while pending:
+            summary = self._summary(pending.pop())
+            if summary is None:
+                continue
+            f_reads, f_writes, f_calls = summary
+            reads |= f_reads
+            reads |= f_writes
+            writes |= f_writes
+            for name in f_calls:
+                if name not in seen:
+                    seen.add(name)
+                    pending.append(name)
+        return reads, writes
+    
+    def _read_effects(self, writes: Set) -> Dict:
+        rt = self.interpreter
+        effects = {}
+        for dep in writes:
+            if dep is STYLE:
+                effects[dep] = self._get_style()
+            elif dep[0] == 'v':
+                effects[dep] = rt.variables.get(dep[1], _MISSING)
+            else:
+                effects[dep] = rt.functions.get(dep[1], _MISSING)
+        return effects
+    
+    def _apply_effects(self, effects: Dict):
+        rt = self.interpreter
+        for dep, value in effects.items():
+            if dep is STYLE:
+                self._set_style(value)
+                continue
+            target = rt.variables if dep[0] == 'v' else rt.functions
+            if value is _MISSING:
+                target.pop(dep[1], None)
+            else:
+                target[dep[1]] = value
+    
+    def execute(self, code: str) -> List[Dict]:
+        """
+        Execute Lisp code, reusing unaffected forms from the previous run
+        
+        Args:
+            code: Lisp source code
+        
+        Returns:
+            List of drawing command dictionaries
+        """
+        try:
+            return self._execute(code)
+        except Exception as e:
+            self.invalidate()
+            return [{
+                'type': 'error',
+                'message': str(e)
+            }]
+    
+    def _execute(self, code: str) -> List[Dict]:
+        rt = self.interpreter
+        forms = [form for form in read_all(rt.tokenize(code)) if form is not None]
+        
+        self._reset()
+        env = Environment(rt.variables)
+        previous = self._records
+        records = {}
+        writer = {}
+        writer_form = {}
+        graph = {}
+        commands = []
+        evaluated = 0
+        
+        for index, form in enumerate(forms):
+            key = repr(form)
+            reads, writes = self.analyze(form)
+            signature = frozenset((dep, writer.get(dep)) for dep in reads)
+            graph[index] = sorted({writer_form[dep] for dep in reads if dep in writer_form})
+            
+            candidates = previous.get(key)
+            candidate = candidates.pop(0) if candidates else None
+            
+            if candidate is not None and candidate.signature == signature:
+                record = candidate
+                self._apply_effects(record.effects)
+            else:
+                node = candidate.node if candidate is not None else compile_expr(form)
+                result = node(rt, env)
+                evaluated += 1
+                
+                form_commands = []
+                if isinstance(result, dict) and 'type' in result:
+                    form_commands.append(result)
+                elif isinstance(result, list):
+                    for item in result:
+                        if isinstance(item, dict) and 'type' in item:
+                            form_commands.append(item)
+                
+                effects = self._read_effects(writes)
+                version = None
+                if candidate is not None:
+                    # Early cutoff: same bindings produced, dependents stay valid
+                    try:
+                        if effects == candidate.effects:
+                            version = candidate.version
+                    except Exception:
+                        version = None
+                if version is None:
+                    version = next(self._versions)
+                record = _FormRecord(key, node, signature, effects,
+                                     form_commands, version)
+            
+            commands.extend(record.commands)
+            records.setdefault(key, []).append(record)
+            for dep in writes:
+                writer[dep] = record.version
+                writer_form[dep] = index
+        
+        self._records = records
+        self.graph = graph
+        self.last_stats = {
+            'forms': len(forms),
+            'evaluated': evaluated,
+            'reused': len(forms) - evaluated
+        }
+        return commands
@@ -3,8 +3,11 @@ Simple Lisp Interpreter for Design Code
 Week 1 Implementation - Basic Drawing Commands
 """
 
-import re
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterable
+
+from utils.lisp_reader import tokenize, read_form, read_all
+from utils.lisp_cache import get_program_cache, get_disk_cache
+from utils.lisp_builtins import SIMPLE_BUILTINS
 
 
 class LispInterpreter:
@@ -20,76 +23,14 @@ class LispInterpreter:
         self.current_fill = True
         
     def tokenize(self, code: str) -> List[str]:
-        """Convert Lisp code to tokens"""
-        # Remove comments (lines starting with ;)
-        lines = code.split('\n')
-        code_without_comments = '\n'.join(
-            line.split(';')[0] if ';' in line else line 
-            for line in lines
-        )
-        
-        # Tokenize
-        tokens = []
-        current = ''
-        in_string = False
-        
-        for char in code_without_comments:
-            if in_string:
-                if char == '"':
-                    in_string = False
-                    tokens.append(f'"{current}"')
-                    current = ''
-                else:
-                    current += char
-            elif char == '"':
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-                in_string = True
-            elif char in '()':
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-                tokens.append(char)
-            elif char.isspace():
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-            else:
-                current += char
-        
-        if current.strip():
-            tokens.append(current.strip())
-        
-        return tokens
+        """Convert Lisp code to tokens (carrying line/column spans)"""
+        return tokenize(code)
     
     def parse(self, tokens: List[str]) -> Any:
-        """Parse tokens into AST"""
-        if not tokens:
-            return None
-        
-        token = tokens.pop(0)
-        
-        if token == '(':
-            ast = []
-            while tokens and tokens[0] != ')':
-                ast.append(self.parse(tokens))
-            if tokens:
-                tokens.pop(0)  # Remove ')'
-            return ast
-        elif token == ')':
-            raise SyntaxError("Unexpected )")
-        else:
-            # String literal
-            if token.startswith('"') and token.endswith('"'):
-                return token[1:-1]
-            # Number
-            try:
-                if '.' in token:
-                    return float(token)
-                return int(token)
-            except ValueError:
-                return token
+        """Parse one expression, consuming its tokens from the list"""
+        expr, end = read_form(tokens)
+        del tokens[:end]
+        return expr
     
     def evaluate(self, expr: Any) -> Any:
         """Evaluate expression"""
@@ -126,95 +67,48 @@ class LispInterpreter:
         # Evaluate arguments for other commands
         args = [self.evaluate(arg) for arg in expr[1:]]
         
-        # Math operations
-        if cmd == '+':
-            return sum(args)
-        elif cmd == '-':
-            if len(args) == 1:
-                return -args[0]
-            return args[0] - sum(args[1:])
-        elif cmd == '*':
-            result = 1
-            for arg in args:
-                result *= arg
-            return result
-        elif cmd == '/':
-            if len(args) == 2:
-                return args[0] / args[1] if args[1] != 0 else 0
-            return 0
-        elif cmd == '%':
-            return args[0] % args[1] if len(args) == 2 else 0
-        
-        # Comparison
-        elif cmd == '>':
-            return args[0] > args[1] if len(args) == 2 else False
-        elif cmd == '<':
-            return args[0] < args[1] if len(args) == 2 else False
-        elif cmd == '>=':
-            return args[0] >= args[1] if len(args) == 2 else False
-        elif cmd == '<=':
-            return args[0] <= args[1] if len(args) == 2 else False
-        elif cmd == '=':
-            return args[0] == args[1] if len(args) == 2 else False
-        
-        # Drawing state
-        elif cmd == 'fill':
-            self.current_color = args[0] if args else '#ffffff'
-            self.current_fill = True
-            return None
-        
-        elif cmd == 'stroke':
-            self.current_color = args[0] if args else '#ffffff'
-            self.current_fill = False
-            return None
+        # Math, comparison, drawing state and drawing commands
+        builtin = SIMPLE_BUILTINS.get(cmd)
+        if builtin is not None:
+            return builtin.func(self, args)
         
-        # Drawing commands - return as dict for canvas
-        elif cmd == 'rect':
-            if len(args) >= 4:
-                return {
-                    'type': 'rect',
-                    'x': args[0],
-                    'y': args[1],
-                    'width': args[2],
-                    'height': args[3],
-                    'color': self.current_color,
-                    'fill': self.current_fill
-                }
+        return None
+    
+    def parse(self, code: str) -> List[Any]:
+        """
+        Parse Lisp code into forms through the program caches
         
-        elif cmd == 'circle':
-            if len(args) >= 3:
-                return {
-                    'type': 'circle',
-                    'x': args[0],
-                    'y': args[1],
-                    'radius': args[2],
-                    'color': self.current_color,
-                    'fill': self.current_fill
-                }
+        Args:
+            code: Lisp source code
         
-        elif cmd == 'line':
-            if len(args) >= 4:
-                return {
-                    'type': 'line',
-                    'x1': args[0],
-                    'y1': args[1],
-                    'x2': args[2],
-                    'y2': args[3],
-                    'color': self.current_color
-                }
+        Returns:
+            Parsed top-level forms
+        """
+        return get_program_cache().get_or_build(
+            'parsed', code,
+            lambda source: get_disk_cache().get_or_build(
+                'parsed', source, lambda text: read_all(self.tokenize(text))
+            )
+        )
+    
+    def precompile(self, codes: Iterable[str]) -> int:
+        """
+        Parse programs ahead of time, filling the memory and disk caches
         
-        elif cmd == 'text':
-            if len(args) >= 3:
-                return {
-                    'type': 'text',
-                    'x': args[0],
-                    'y': args[1],
-                    'text': str(args[2]),
-                    'size': args[3] if len(args) > 3 else 12,
-                    'color': self.current_color
-                }
+        Args:
+            codes: Lisp sources to parse
         
-        return None
+        Returns:
+            Number of programs that parsed
+        """
+        parsed = 0
+        for code in codes:
+            try:
+                self.parse(code)
+                parsed += 1
+            except Exception:
+                continue
+        return parsed
     
     def execute(self, code: str) -> List[Dict]:
         """
@@ -224,11 +118,11 @@ class LispInterpreter:
             List of drawing command dictionaries
         """
         try:
-            tokens = self.tokenize(code)
             commands = []
             
-            while tokens:
-                expr = self.parse(tokens)
+            program = self.parse(code)
+            
+            for expr in program:
                 if expr is not None:
                     result = self.evaluate(expr)
                     if isinstance(result, dict) and 'type' in result:
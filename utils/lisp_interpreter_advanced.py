@@ -3,9 +3,20 @@ Advanced Lisp Interpreter with Loops, Functions, and More Commands
 Week 1 - Days 4-5 Implementation
 """
 
-import re
-import math
-from typing import List, Dict, Any, Union, Callable
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from utils.lisp_builtins import ADVANCED_BUILTINS
+from utils.lisp_compiler import CompiledNode, compile_expr, compile_program, iter_commands
+from utils.lisp_environment import Environment
+from utils.lisp_reader import tokenize, read_form, read_all
+from utils.lisp_cache import get_program_cache, get_disk_cache
+from utils.lisp_incremental import IncrementalExecutor
+from utils.lisp_budget import ExecutionBudget, ExecutionProfiler
+from utils.lisp_memo import FunctionMemo
+from utils.lisp_optimizer import optimize_program
+from utils.lisp_vectorize import PrimitiveBatch
+from utils.draw_list import DrawList
 
 
 class AdvancedLispInterpreter:
@@ -23,340 +34,195 @@ class AdvancedLispInterpreter:
         self.current_color = '#ffffff'
         self.current_fill = True
         self.current_stroke_width = 2
+        self._incremental = None
+        self.budget = None
+        self.profiler = None
+        self.memo = FunctionMemo()
+        self.optimize = True
         
     def tokenize(self, code: str) -> List[str]:
-        """Convert Lisp code to tokens"""
-        lines = code.split('\n')
-        code_without_comments = '\n'.join(
-            line.split(';')[0] if ';' in line else line 
-            for line in lines
-        )
-        
-        tokens = []
-        current = ''
-        in_string = False
-        
-        for char in code_without_comments:
-            if in_string:
-                if char == '"':
-                    in_string = False
-                    tokens.append(f'"{current}"')
-                    current = ''
-                else:
-                    current += char
-            elif char == '"':
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-                in_string = True
-            elif char in '()':
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-                tokens.append(char)
-            elif char.isspace():
-                if current.strip():
-                    tokens.append(current.strip())
-                current = ''
-            else:
-                current += char
-        
-        if current.strip():
-            tokens.append(current.strip())
-        
-        return tokens
+        """Convert Lisp code to tokens (carrying line/column spans)"""
+        return tokenize(code)
     
     def parse(self, tokens: List[str]) -> Any:
-        """Parse tokens into AST"""
-        if not tokens:
-            return None
-        
-        token = tokens.pop(0)
-        
-        if token == '(':
-            ast = []
-            while tokens and tokens[0] != ')':
-                ast.append(self.parse(tokens))
-            if tokens:
-                tokens.pop(0)
-            return ast
-        elif token == ')':
-            raise SyntaxError("Unexpected )")
-        else:
-            if token.startswith('"') and token.endswith('"'):
-                return token[1:-1]
-            try:
-                if '.' in token:
-                    return float(token)
-                return int(token)
-            except ValueError:
-                return token
+        """Parse one expression, consuming its tokens from the list"""
+        expr, end = read_form(tokens)
+        del tokens[:end]
+        return expr
     
     def evaluate(self, expr: Any, local_scope: Dict = None) -> Any:
         """Evaluate expression with optional local scope"""
-        scope = {**self.variables, **(local_scope or {})}
-        
-        # Atomic values
-        if isinstance(expr, (int, float)):
-            return expr
-        
-        if isinstance(expr, str):
-            if expr in scope:
-                return scope[expr]
-            return expr
-        
-        if not isinstance(expr, list) or len(expr) == 0:
-            return None
-        
-        cmd = expr[0]
-        
-        # Special forms
-        if cmd == 'def':
-            var_name = expr[1]
-            value = self.evaluate(expr[2], local_scope)
-            if local_scope is not None:
-                local_scope[var_name] = value
-            else:
-                self.variables[var_name] = value
-            return value
-        
-        if cmd == 'defn':
-            # (defn name (args) body)
-            func_name = expr[1]
-            args = expr[2] if isinstance(expr[2], list) else []
-            body = expr[3]
-            self.functions[func_name] = {'args': args, 'body': body}
-            return None
-        
-        if cmd == 'if':
-            condition = self.evaluate(expr[1], local_scope)
-            if condition:
-                return self.evaluate(expr[2], local_scope)
-            elif len(expr) > 3:
-                return self.evaluate(expr[3], local_scope)
-            return None
-        
-        if cmd == 'do':
-            # Execute multiple expressions
-            result = None
-            for e in expr[1:]:
-                result = self.evaluate(e, local_scope)
-            return result
-        
-        if cmd == 'repeat':
-            # (repeat n body)
-            count = self.evaluate(expr[1], local_scope)
-            body = expr[2]
-            results = []
-            for i in range(int(count)):
-                # Add loop variable 'i'
-                loop_scope = {**(local_scope or {}), 'i': i}
-                result = self.evaluate(body, loop_scope)
-                if isinstance(result, dict) and 'type' in result:
-                    results.append(result)
-            return results if results else None
-        
-        if cmd == 'for':
-            # (for var start end body)
-            var_name = expr[1]
-            start = self.evaluate(expr[2], local_scope)
-            end = self.evaluate(expr[3], local_scope)
-            body = expr[4]
-            results = []
-            for i in range(int(start), int(end)):
-                loop_scope = {**(local_scope or {}), var_name: i}
-                result = self.evaluate(body, loop_scope)
-                if isinstance(result, dict) and 'type' in result:
-                    results.append(result)
-            return results if results else None
-        
-        # Check for user-defined functions
-        if cmd in self.functions:
-            func = self.functions[cmd]
-            args = [self.evaluate(arg, local_scope) for arg in expr[1:]]
-            func_scope = dict(zip(func['args'], args))
-            return self.evaluate(func['body'], func_scope)
-        
-        # Evaluate arguments for built-in functions
-        args = [self.evaluate(arg, local_scope) for arg in expr[1:]]
-        
-        # Math operations
-        if cmd == '+':
-            return sum(args)
-        elif cmd == '-':
-            return -args[0] if len(args) == 1 else args[0] - sum(args[1:])
-        elif cmd == '*':
-            result = 1
-            for arg in args:
-                result *= arg
-            return result
-        elif cmd == '/':
-            return args[0] / args[1] if len(args) == 2 and args[1] != 0 else 0
-        elif cmd == '%':
-            return args[0] % args[1] if len(args) == 2 else 0
-        
-        # Advanced math
-        elif cmd == 'sin':
-            return math.sin(args[0]) if args else 0
-        elif cmd == 'cos':
-            return math.cos(args[0]) if args else 0
-        elif cmd == 'tan':
-            return math.tan(args[0]) if args else 0
-        elif cmd == 'sqrt':
-            return math.sqrt(args[0]) if args and args[0] >= 0 else 0
-        elif cmd == 'pow':
-            return math.pow(args[0], args[1]) if len(args) == 2 else 0
-        elif cmd == 'abs':
-            return abs(args[0]) if args else 0
-        elif cmd == 'min':
-            return min(args) if args else 0
-        elif cmd == 'max':
-            return max(args) if args else 0
-        elif cmd == 'floor':
-            return math.floor(args[0]) if args else 0
-        elif cmd == 'ceil':
-            return math.ceil(args[0]) if args else 0
-        elif cmd == 'round':
-            return round(args[0]) if args else 0
-        
-        # Comparison
-        elif cmd == '>':
-            return args[0] > args[1] if len(args) == 2 else False
-        elif cmd == '<':
-            return args[0] < args[1] if len(args) == 2 else False
-        elif cmd == '>=':
-            return args[0] >= args[1] if len(args) == 2 else False
-        elif cmd == '<=':
-            return args[0] <= args[1] if len(args) == 2 else False
-        elif cmd == '=':
-            return args[0] == args[1] if len(args) == 2 else False
-        
-        # Logic
-        elif cmd == 'and':
-            return all(args)
-        elif cmd == 'or':
-            return any(args)
-        elif cmd == 'not':
-            return not args[0] if args else True
-        
-        # Drawing state
-        elif cmd == 'fill':
-            self.current_color = args[0] if args else '#ffffff'
-            self.current_fill = True
-            return None
-        
-        elif cmd == 'stroke':
-            self.current_color = args[0] if args else '#ffffff'
-            self.current_fill = False
-            return None
-        
-        elif cmd == 'stroke-width':
-            self.current_stroke_width = args[0] if args else 2
-            return None
-        
-        # Drawing commands
-        elif cmd == 'rect':
-            if len(args) >= 4:
-                return {
-                    'type': 'rect',
-                    'x': args[0],
-                    'y': args[1],
-                    'width': args[2],
-                    'height': args[3],
-                    'color': self.current_color,
-                    'fill': self.current_fill,
-                    'stroke_width': self.current_stroke_width
-                }
-        
-        elif cmd == 'circle':
-            if len(args) >= 3:
-                return {
-                    'type': 'circle',
-                    'x': args[0],
-                    'y': args[1],
-                    'radius': args[2],
-                    'color': self.current_color,
-                    'fill': self.current_fill,
-                    'stroke_width': self.current_stroke_width
-                }
-        
-        elif cmd == 'line':
-            if len(args) >= 4:
-                return {
-                    'type': 'line',
-                    'x1': args[0],
-                    'y1': args[1],
-                    'x2': args[2],
-                    'y2': args[3],
-                    'color': self.current_color,
-                    'stroke_width': self.current_stroke_width
-                }
-        
-        elif cmd == 'text':
-            if len(args) >= 3:
-                return {
-                    'type': 'text',
-                    'x': args[0],
-                    'y': args[1],
-                    'text': str(args[2]),
-                    'size': args[3] if len(args) > 3 else 12,
-                    'color': self.current_color
-                }
-        
-        elif cmd == 'polygon':
-            # (polygon ((x1 y1) (x2 y2) (x3 y3) ...))
-            if args and isinstance(args[0], list):
-                points = []
-                for point in args[0]:
-                    if isinstance(point, list) and len(point) >= 2:
-                        points.append({'x': point[0], 'y': point[1]})
-                return {
-                    'type': 'polygon',
-                    'points': points,
-                    'color': self.current_color,
-                    'fill': self.current_fill,
-                    'stroke_width': self.current_stroke_width
-                }
-        
-        elif cmd == 'arc':
-            # (arc x y radius start-angle end-angle)
-            if len(args) >= 5:
-                return {
-                    'type': 'arc',
-                    'x': args[0],
-                    'y': args[1],
-                    'radius': args[2],
-                    'start': args[3],
-                    'end': args[4],
-                    'color': self.current_color,
-                    'fill': self.current_fill,
-                    'stroke_width': self.current_stroke_width
-                }
+        env = Environment(self.variables)
+        if local_scope is not None:
+            env = env.child(local_scope)
+        return compile_expr(expr)(self, env)
+    
+    def compile(self, code: str) -> List[CompiledNode]:
+        """
+        Parse and compile Lisp code into closures
+        
+        Compiled programs are shared through the process-wide program
+        cache, so unchanged source is only compiled once; the parsed
+        forms also go to the disk cache for other processes. Constants are
+        folded first unless optimization is off or a defined function
+        shadows a builtin.
+        
+        Args:
+            code: Lisp source code
+        
+        Returns:
+            Compiled top-level forms, ready for run()
+        """
+        if self.optimize and not any(name in ADVANCED_BUILTINS for name in self.functions):
+            return get_program_cache().get_or_build(
+                'optimized', code,
+                lambda source: compile_program(get_disk_cache().get_or_build(
+                    'optimized', source,
+                    lambda text: optimize_program(read_all(self.tokenize(text)))
+                ))
+            )
+        return get_program_cache().get_or_build(
+            'compiled', code,
+            lambda source: compile_program(get_disk_cache().get_or_build(
+                'parsed', source, lambda text: read_all(self.tokenize(text))
+            ))
+        )
+    
+    def precompile(self, codes: Iterable[str]) -> int:
+        """
+        Compile programs ahead of time, filling the memory and disk caches
+        
+        Args:
+            codes: Lisp sources to compile
+        
+        Returns:
+            Number of programs that compiled
+        """
+        compiled = 0
+        for code in codes:
+            try:
+                self.compile(code)
+                compiled += 1
+            except Exception:
+                continue
+        return compiled
+    
+    def set_budget(self, max_steps: Optional[int] = None,
+                   max_seconds: Optional[float] = None,
+                   max_primitives: Optional[int] = None):
+        """
+        Limit the work of each execution
+        
+        A script passing a limit is aborted and reported as an error
+        command. Calling without limits removes the budget.
+        
+        Args:
+            max_steps: Maximum top-level forms, loop iterations and function calls
+            max_seconds: Maximum wall-clock time in seconds
+            max_primitives: Maximum number of drawing commands created
+        """
+        if max_steps is None and max_seconds is None and max_primitives is None:
+            self.budget = None
+        else:
+            self.budget = ExecutionBudget(max_steps, max_seconds, max_primitives)
+    
+    def enable_profiling(self, enabled: bool = True):
+        """Record per-form and per-function counts and time in later executions"""
+        self.profiler = ExecutionProfiler() if enabled else None
+    
+    def get_profile(self) -> Dict[str, Any]:
+        """Get the profile of the last execution (empty when profiling is off)"""
+        return self.profiler.report() if self.profiler is not None else {}
+    
+    def set_memoization(self, enabled: bool = True):
+        """Turn result caching of pure user functions on or off"""
+        self.memo = FunctionMemo() if enabled else None
+    
+    def set_optimization(self, enabled: bool = True):
+        """Turn constant folding of compiled programs on or off"""
+        self.optimize = enabled
+    
+    def get_memo_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics of the function memo"""
+        if self.memo is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.memo.get_stats()}
+    
+    def _form_labels(self, code: str) -> List[Dict[str, Any]]:
+        """Line number and shortened source of every top-level form"""
+        tokens = self.tokenize(code)
+        labels = []
+        pos = 0
+        while pos < len(tokens):
+            _, end = read_form(tokens, pos)
+            start_offset = tokens.offset(pos)[0]
+            end_offset = tokens.offset(end - 1)[1]
+            source = ' '.join(code[start_offset:end_offset].split())
+            if len(source) > 60:
+                source = source[:57] + '...'
+            labels.append({'line': tokens.span(pos)[0], 'source': source})
+            pos = end
+        return labels
+    
+    def _begin(self, code: str):
+        """Reset the budget and profiler before executing code"""
+        if self.budget is not None:
+            self.budget.reset()
+        if self.profiler is not None:
+            self.profiler.reset(self._form_labels(code))
+    
+    def run(self, program: List[CompiledNode], output: Any = None) -> Any:
+        """
+        Run a compiled program and collect drawing commands
+        
+        Args:
+            program: Compiled top-level forms
+            output: Collector with an append() method (list or DrawList);
+                a new list when omitted
+        
+        Returns:
+            The collector holding the drawing commands
+        """
+        commands = [] if output is None else output
+        env = Environment(self.variables)
+        # Collectors taking column batches get vectorized loops unexpanded
+        takes_batches = hasattr(commands, 'extend_batch')
+        budget = self.budget
+        profiler = self.profiler
+        
+        for index, node in enumerate(program):
+            if budget is not None:
+                budget.step()
+                budget.check_time()
+            started = time.perf_counter() if profiler is not None else 0.0
+            
+            batched = getattr(node, 'batched', None) if takes_batches else None
+            result = node(self, env) if batched is None else batched(self, env)
+            
+            if profiler is not None:
+                profiler.record_form(index, time.perf_counter() - started)
+            
+            if isinstance(result, PrimitiveBatch):
+                commands.extend_batch(result)
+            
+            # Handle single command
+            elif isinstance(result, dict) and 'type' in result:
+                commands.append(result)
+            
+            # Handle list of commands (from loops)
+            elif isinstance(result, list):
+                for item in result:
+                    if isinstance(item, dict) and 'type' in item:
+                        commands.append(item)
         
-        return None
+        return commands
     
     def execute(self, code: str) -> List[Dict]:
         """Execute Lisp code and return drawing commands"""
         try:
-            tokens = self.tokenize(code)
-            commands = []
-            
-            while tokens:
-                expr = self.parse(tokens)
-                if expr is not None:
-                    result = self.evaluate(expr)
-                    
-                    # Handle single command
-                    if isinstance(result, dict) and 'type' in result:
-                        commands.append(result)
-                    
-                    # Handle list of commands (from loops)
-                    elif isinstance(result, list):
-                        for item in result:
-                            if isinstance(item, dict) and 'type' in item:
-                                commands.append(item)
-            
-            return commands
+            program = self.compile(code)
+            self._begin(code)
+            return self.run(program)
         
         except Exception as e:
             return [{
@@ -364,6 +230,139 @@ class AdvancedLispInterpreter:
                 'message': str(e)
             }]
     
+    def iter_execute(self, code: str,
+                     max_primitives: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Execute Lisp code, yielding drawing commands as they are produced
+        
+        Top-level loops (also as the last expression of a top-level do)
+        yield per iteration instead of building a list, so consumers can
+        process very large drawings in bounded memory. The commands are
+        the same as execute() returns, except that on an error the
+        commands already yielded stay delivered and a single error command
+        ends the stream.
+        
+        Args:
+            code: Lisp source code
+            max_primitives: Stop after yielding this many commands
+        
+        Yields:
+            Drawing command dictionaries
+        """
+        if max_primitives is not None and max_primitives <= 0:
+            return
+        
+        emitted = 0
+        try:
+            program = self.compile(code)
+            self._begin(code)
+            env = Environment(self.variables)
+            for index, node in enumerate(program):
+                if self.budget is not None:
+                    self.budget.step()
+                    self.budget.check_time()
+                started = time.perf_counter()
+                
+                stream = getattr(node, 'stream', None)
+                commands = stream(self, env) if stream else iter_commands(node(self, env))
+                for cmd in commands:
+                    yield cmd
+                    emitted += 1
+                    if emitted == max_primitives:
+                        return
+                
+                if self.profiler is not None:
+                    # Includes time the consumer spent between commands
+                    self.profiler.record_form(index, time.perf_counter() - started)
+        
+        except Exception as e:
+            yield {
+                'type': 'error',
+                'message': str(e)
+            }
+    
+    def execute_drawlist(self, code: str) -> DrawList:
+        """
+        Execute Lisp code into a columnar DrawList
+        
+        Commands go straight into NumPy-backed columns instead of being kept
+        as one dictionary per primitive; iterating the result still yields
+        dictionaries.
+        
+        Args:
+            code: Lisp source code
+        
+        Returns:
+            DrawList of drawing commands (a single error command on failure)
+        """
+        try:
+            program = self.compile(code)
+            self._begin(code)
+            return self.run(program, DrawList())
+        
+        except Exception as e:
+            return DrawList([{
+                'type': 'error',
+                'message': str(e)
+            }])
+    
+    def execute_incremental(self, code: str) -> List[Dict]:
+        """
+        Execute Lisp code, re-evaluating only forms affected since the last
+        incremental run (live preview on every edit)
+        
+        Each run starts from the state this interpreter had on the first
+        incremental call; the result matches a full execute() from there.
+        
+        Args:
+            code: Lisp source code
+        
+        Returns:
+            List of drawing command dictionaries
+        """
+        if self._incremental is None:
+            self._incremental = IncrementalExecutor(self)
+        return self._incremental.execute(code)
+    
+    def get_incremental_stats(self) -> Dict[str, int]:
+        """Get the form counts of the last incremental run (forms, evaluated, reused)"""
+        if self._incremental is None:
+            return {'forms': 0, 'evaluated': 0, 'reused': 0}
+        return dict(self._incremental.last_stats)
+    
+    def fork(self) -> 'AdvancedLispInterpreter':
+        """
+        Create an independent interpreter starting from this one's state
+        
+        The fork gets its own variable and function tables, as shallow
+        copies: values and parsed function bodies are shared, never
+        copied, since execution rebinds names instead of mutating what
+        they hold. Defs and defns in either interpreter are invisible to
+        the other. The drawing state, optimization setting and budget
+        limits carry over; the function memo is shared, so results of
+        prelude functions are reused across forks (use forks of one
+        interpreter from a single thread). Run a long prelude once, then
+        fork per variant and execute only the varying tail.
+        
+        Returns:
+            New interpreter with the current variables, functions and
+            drawing state
+        """
+        fork = type(self)()
+        fork.variables = dict(self.variables)
+        fork.functions = dict(self.functions)
+        fork.current_color = self.current_color
+        fork.current_fill = self.current_fill
+        fork.current_stroke_width = self.current_stroke_width
+        budget = self.budget
+        fork.budget = None if budget is None else ExecutionBudget(
+            budget.max_steps, budget.max_seconds, budget.max_primitives
+        )
+        fork.profiler = ExecutionProfiler() if self.profiler is not None else None
+        fork.memo = self.memo
+        fork.optimize = self.optimize
+        return fork
+    
     def get_variables(self) -> Dict[str, Any]:
         """Get all defined variables"""
         return self.variables.copy()
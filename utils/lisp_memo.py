@@ -0,0 +1,313 @@
+"""
+Memoization of Pure User Functions
+Bounded result caches for defn functions without side effects
+"""
+
+import math
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from utils.lisp_builtins import ADVANCED_BUILTINS
+
+
+_MISSING = object()
+
+# Loops count as this many expression nodes when estimating body cost
+LOOP_COST = 100
+
+
+def scan_function(body: Any) -> Tuple[bool, Set[str], Set[Any], int]:
+    """
+    Collect what a function body needs to be classified as pure
+    
+    Defs inside a function bind in its own frame and are not side
+    effects; a nested defn changes the global function table and is.
+    
+    Args:
+        body: Parsed function body
+    
+    Returns:
+        Tuple of (locally pure, symbols read, names called, cost), where
+        cost counts expression nodes and weighs loops as LOOP_COST
+    """
+    symbols, calls = set(), set()
+    pure = True
+    cost = 0
+    pending = [body]
+    while pending:
+        expr = pending.pop()
+        cost += 1
+        if isinstance(expr, str):
+            symbols.add(expr)
+            continue
+        if not isinstance(expr, list) or not expr:
+            continue
+        
+        cmd = expr[0]
+        if cmd == 'defn':
+            pure = False
+            continue
+        if cmd == 'def':
+            pending.extend(expr[2:3])
+            continue
+        if cmd == 'for':
+            pending.extend(expr[2:5])
+            continue
+        if cmd in ('repeat', 'for'):
+            cost += LOOP_COST
+        if cmd in ('if', 'do', 'repeat'):
+            pending.extend(expr[1:])
+            continue
+        
+        try:
+            hash(cmd)
+            calls.add(cmd)
+        except TypeError:
+            pending.append(cmd)
+        pending.extend(expr[1:])
+    return pure, symbols, calls, cost
+
+
+def _key(value: Any) -> Tuple:
+    """Type-exact key part, so 1, 1.0, True and -0.0/0.0 stay apart"""
+    kind = type(value)
+    if kind is float:
+        return (kind, value, math.copysign(1.0, value))
+    return (kind, value)
+
+
+def _anchor(func: Optional[Dict]) -> Optional[List]:
+    """
+    Identity of a defn form: its parsed argument list
+    
+    Argument lists are created once per compiled defn, so they identify
+    the definition across calls and re-executions of a cached program.
+    """
+    return func['args'] if func is not None else None
+
+
+def _fresh(value: Any) -> Any:
+    """Copy drawing commands out of the cache so callers never share them"""
+    if isinstance(value, dict):
+        value = dict(value)
+        if isinstance(value.get('points'), list):
+            value['points'] = [dict(p) if isinstance(p, dict) else p
+                               for p in value['points']]
+        return value
+    if isinstance(value, list):
+        return [_fresh(item) for item in value]
+    return value
+
+
+class _Analysis:
+    """Purity of one function under the function table it was checked against"""
+    
+    __slots__ = ('bindings', 'pure', 'symbols', 'draws', 'cost', 'cacheable')
+    
+    def __init__(self, bindings: Dict[Any, Any], pure: bool,
+                 symbols: Tuple[str, ...], draws: bool, cost: int):
+        self.bindings = bindings
+        self.pure = pure
+        self.symbols = symbols
+        self.draws = draws
+        self.cost = cost
+        self.cacheable = pure and cost >= FunctionMemo.MIN_COST
+    
+    def matches(self, functions: Dict) -> bool:
+        """Check that every called name is still bound to the same defn"""
+        for name, anchor in self.bindings.items():
+            callee = functions.get(name)
+            if (callee['args'] if callee is not None else None) is not anchor:
+                return False
+        return True
+
+
+class _Table:
+    """Result cache and counters of one defn"""
+    
+    __slots__ = ('anchor', 'body', 'summary', 'analysis', 'results',
+                 'hits', 'misses', 'cold')
+    
+    def __init__(self, anchor: List, body: Any):
+        self.anchor = anchor
+        self.body = body
+        self.summary = None
+        self.analysis = None
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cold = False
+
+
+class FunctionMemo:
+    """
+    Bounded result caches for pure user functions
+    
+    A function is pure when neither its body nor any function it calls
+    (transitively) defines functions or changes the drawing state; only
+    pure functions expensive enough to beat a lookup are cached. Results
+    are keyed on the arguments, the global variables the functions read
+    and, for functions that draw, the drawing state. Caches belong to the
+    defn form (its parsed argument list), so they survive re-executions
+    of the same (cached) program, and are dropped when a called function
+    is bound to a different defn. Functions that miss almost every time stop being
+    cached to keep the overhead low.
+    """
+    
+    # A function is given up after this many calls below MIN_HIT_RATE
+    WARMUP_CALLS = 256
+    MIN_HIT_RATE = 0.05
+    
+    # Bodies cheaper than this (in expression nodes, including called
+    # functions) evaluate faster than a cache lookup
+    MIN_COST = 32
+    
+    def __init__(self, max_entries: int = 1024, max_functions: int = 256):
+        """
+        Initialize memo
+        
+        Args:
+            max_entries: Cached results per function (LRU)
+            max_functions: Functions tracked before all caches are reset
+        """
+        self.max_entries = max_entries
+        self.max_functions = max_functions
+        self._tables = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def _table(self, func: Dict) -> _Table:
+        anchor = func['args']
+        table = self._tables.get(id(anchor))
+        if table is None or table.anchor is not anchor or table.body is not func['body']:
+            if len(self._tables) >= self.max_functions:
+                self._tables.clear()
+            table = _Table(anchor, func['body'])
+            self._tables[id(anchor)] = table
+        return table
+    
+    def _summary(self, func: Dict) -> Tuple[bool, Set[str], Set[Any], int]:
+        table = self._table(func)
+        if table.summary is None:
+            table.summary = scan_function(table.body)
+        return table.summary
+    
+    def _analyze(self, functions: Dict, func: Dict) -> _Analysis:
+        """Check purity of func and everything it calls"""
+        bindings = {}
+        symbols = set()
+        pure = True
+        draws = False
+        cost = 0
+        pending = [func]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if id(current) in seen:
+                continue
+            seen.add(id(current))
+            
+            local_pure, local_symbols, calls, local_cost = self._summary(current)
+            pure = pure and local_pure
+            cost += local_cost
+            args = current.get('args', [])
+            symbols |= {name for name in local_symbols if name not in args}
+            
+            for name in calls:
+                callee = functions.get(name)
+                bindings[name] = _anchor(callee)
+                if callee is not None:
+                    # Calls may recurse: always worth caching
+                    cost += self.MIN_COST
+                    pending.append(callee)
+                    continue
+                builtin = ADVANCED_BUILTINS.get(name)
+                if builtin is not None:
+                    pure = pure and builtin.pure
+                    draws = draws or builtin.reads_style
+        return _Analysis(bindings, pure, tuple(sorted(symbols)), draws, cost)
+    
+    def key(self, rt, func: Dict, args: List[Any],
+            variables: Dict[str, Any]) -> Optional[Tuple]:
+        """
+        Build the cache key of a call
+        
+        Args:
+            rt: Interpreter
+            func: Function entry being called
+            args: Evaluated arguments
+            variables: Global bindings the function body sees
+        
+        Returns:
+            Hashable key, or None when the call must not be cached
+        """
+        table = self._table(func)
+        if table.cold:
+            return None
+        
+        analysis = table.analysis
+        functions = rt.functions
+        if analysis is None or not analysis.matches(functions):
+            if analysis is not None:
+                # A callee changed: earlier results may be stale
+                table.results.clear()
+            analysis = table.analysis = self._analyze(functions, func)
+        if not analysis.cacheable:
+            return None
+        
+        parts = [tuple(_key(arg) for arg in args),
+                 tuple(_key(variables.get(name, _MISSING))
+                       for name in analysis.symbols)]
+        if analysis.draws:
+            parts.append((_key(rt.current_color), _key(rt.current_fill),
+                          _key(rt.current_stroke_width)))
+        key = tuple(parts)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    def get(self, func: Dict, key: Tuple) -> Tuple[bool, Any]:
+        """Look up a result; returns (found, value)"""
+        table = self._table(func)
+        value = table.results.get(key, _MISSING)
+        if value is _MISSING:
+            table.misses += 1
+            self.misses += 1
+            calls = table.hits + table.misses
+            if calls >= self.WARMUP_CALLS and table.hits < calls * self.MIN_HIT_RATE:
+                table.cold = True
+                table.results.clear()
+            return False, None
+        table.results.move_to_end(key)
+        table.hits += 1
+        self.hits += 1
+        return True, _fresh(value)
+    
+    def put(self, func: Dict, key: Tuple, value: Any):
+        """Store a result"""
+        table = self._table(func)
+        if table.cold:
+            return
+        table.results[key] = _fresh(value)
+        while len(table.results) > self.max_entries:
+            table.results.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached results and counters"""
+        self._tables.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'functions': len(self._tables),
+            'entries': sum(len(t.results) for t in self._tables.values()),
+            'cold_functions': sum(1 for t in self._tables.values() if t.cold)
+        }
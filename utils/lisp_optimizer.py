@@ -0,0 +1,142 @@
+"""
+Constant Folding for the Advanced Lisp Interpreter
+Partial evaluation of parsed programs before they are compiled
+"""
+
+from typing import List, Dict, Any, Set
+
+from utils.lisp_builtins import ADVANCED_BUILTINS
+
+
+def _is_constant(expr: Any) -> bool:
+    """Numbers evaluate to themselves; symbols and strings depend on bindings"""
+    return type(expr) in (int, float, bool)
+
+
+def _hashable(value: Any) -> bool:
+    """Check whether a value can be used as a binding name"""
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+def _collect(expr: Any, defs: Dict[Any, int], bound: Set, functions: Set):
+    """
+    Gather the bindings that decide what may be propagated
+    
+    Args:
+        expr: Parsed expression
+        defs: Receives the number of defs per name, at any depth
+        bound: Receives function parameters and loop variables
+        functions: Receives the names of defined functions
+    """
+    if not isinstance(expr, list) or not expr:
+        return
+    cmd = expr[0]
+    if cmd == 'def' and len(expr) > 1 and _hashable(expr[1]):
+        defs[expr[1]] = defs.get(expr[1], 0) + 1
+    elif cmd == 'defn':
+        if len(expr) > 1 and _hashable(expr[1]):
+            functions.add(expr[1])
+        if len(expr) > 2 and isinstance(expr[2], list):
+            bound.update(arg for arg in expr[2] if _hashable(arg))
+    elif cmd == 'repeat':
+        bound.add('i')
+    elif cmd == 'for' and len(expr) > 1 and _hashable(expr[1]):
+        bound.add(expr[1])
+    for e in expr:
+        _collect(e, defs, bound, functions)
+
+
+class _Folder:
+    """Rewrites one program's top-level forms"""
+    
+    def __init__(self, functions: Set):
+        self.functions = functions
+        self.known = {}
+    
+    def fold(self, expr: Any) -> Any:
+        """Fold an evaluated expression, returning a new one"""
+        if isinstance(expr, str):
+            return self.known.get(expr, expr)
+        
+        if not isinstance(expr, list) or not expr:
+            return expr
+        
+        cmd = expr[0]
+        if cmd == 'def':
+            return expr[:2] + [self.fold(e) for e in expr[2:]]
+        if cmd == 'defn':
+            # Bodies run after later executions may have rebound globals
+            return expr
+        if cmd == 'for':
+            return expr[:2] + [self.fold(e) for e in expr[2:]]
+        if cmd == 'if':
+            return self._fold_if(expr)
+        if cmd in ('do', 'repeat'):
+            return [cmd] + [self.fold(e) for e in expr[1:]]
+        return self._fold_call(cmd, [self.fold(e) for e in expr[1:]])
+    
+    def _fold_if(self, expr: List) -> Any:
+        folded = ['if'] + [self.fold(e) for e in expr[1:]]
+        if len(folded) < 3 or not _is_constant(folded[1]):
+            return folded
+        if folded[1]:
+            return folded[2]
+        # An if without else evaluates to None, like an empty form
+        return folded[3] if len(folded) > 3 else []
+    
+    def _fold_call(self, cmd: Any, args: List) -> Any:
+        expr = [cmd] + args
+        builtin = ADVANCED_BUILTINS.get(cmd)
+        if (builtin is None or not builtin.pure or builtin.reads_style
+                or cmd in self.functions
+                or not all(_is_constant(arg) for arg in args)):
+            return expr
+        try:
+            value = builtin.func(None, args)
+        except Exception:
+            # Leave the error to be raised at run time
+            return expr
+        if not _is_constant(value):
+            return expr
+        return value
+
+
+def optimize_program(forms: List[Any]) -> List[Any]:
+    """
+    Fold constants in a parsed program
+    
+    Calls of pure builtins whose arguments are numbers are evaluated,
+    ifs with a constant condition are replaced by the taken branch, and
+    a variable bound once by a top-level def to a number is substituted
+    into the top-level forms after it. Defs are kept, so the program
+    leaves the same variables behind. Function bodies are not touched:
+    they may run in later executions with other globals, and builtins
+    shadowed by a user function in the program are never folded.
+    
+    The caller must not use the result when a function defined before
+    the program shadows a builtin.
+    
+    Args:
+        forms: Parsed top-level forms (not modified)
+    
+    Returns:
+        Optimized forms
+    """
+    defs, bound, functions = {}, set(), set()
+    for form in forms:
+        _collect(form, defs, bound, functions)
+    
+    folder = _Folder(functions)
+    optimized = []
+    for form in forms:
+        form = folder.fold(form)
+        if (isinstance(form, list) and len(form) >= 3 and form[0] == 'def'
+                and isinstance(form[1], str) and defs.get(form[1]) == 1
+                and form[1] not in bound and _is_constant(form[2])):
+            folder.known[form[1]] = form[2]
+        optimized.append(form)
+    return optimized
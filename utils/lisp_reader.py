@@ -0,0 +1,184 @@
+"""
+Lisp Reader - Tokenizer and Parser
+Single-pass regex tokenizer and cursor-based parser shared by both interpreters
+"""
+
+import re
+import bisect
+from typing import List, Any, Tuple
+
+
+class TokenList(list):
+    """
+    List of token strings that can report source spans
+    
+    Tokens are plain strings so the hot tokenize/parse path stays cheap;
+    start offsets are recovered with one extra scan the first time a span
+    is requested, and line/column numbers are 1-based.
+    """
+    
+    def __init__(self, tokens=(), code: str = ''):
+        super().__init__(tokens)
+        self.code = code
+        self.first = 0
+        self._offsets = None
+        self._newlines = None
+    
+    def __delitem__(self, index):
+        # Keep spans aligned when a parser consumes tokens from the front
+        if isinstance(index, slice) and index.start is None and index.step is None:
+            self.first += len(range(*index.indices(len(self))))
+        super().__delitem__(index)
+    
+    def span(self, index: int) -> Tuple[int, int, int, int]:
+        """
+        Get the source span of a token
+        
+        Args:
+            index: Token index in this list
+        
+        Returns:
+            Tuple of (line, col, end_line, end_col), end exclusive
+        """
+        start, end = self.offset(index)
+        return self._position(start) + self._position(end)
+    
+    def offset(self, index: int) -> Tuple[int, int]:
+        """Get the (start, end) character offsets of a token in the source"""
+        if self._offsets is None:
+            self._offsets = [
+                m.span() for m in _TOKEN_PATTERN.finditer(self.code)
+                if not m.group().startswith(';')
+            ]
+            self._newlines = [m.start() for m in re.finditer('\n', self.code)]
+        return self._offsets[self.first + index]
+    
+    def _position(self, offset: int) -> Tuple[int, int]:
+        """Convert a character offset to (line, col)"""
+        line = bisect.bisect_left(self._newlines, offset)
+        line_start = self._newlines[line - 1] + 1 if line else 0
+        return line + 1, offset - line_start + 1
+
+
+_TOKEN_PATTERN = re.compile(r';[^\n]*|[()]|"[^"]*"?|[^\s()";]+')
+
+# First characters that can never start a number, so int()/float() is skipped
+_SYMBOL_START = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ#*/<>=%!?&|^~:_@$'
+)
+
+
+def tokenize(code: str) -> TokenList:
+    """
+    Convert Lisp code to tokens in one pass
+    
+    Args:
+        code: Lisp source code
+    
+    Returns:
+        TokenList of strings; string literals keep their quotes
+    """
+    tokens = TokenList(
+        [t for t in _TOKEN_PATTERN.findall(code) if t[0] != ';'], code
+    )
+    
+    # Only the last token can be an unterminated string (it runs to the end)
+    if tokens:
+        last = tokens[-1]
+        if last[0] == '"' and (len(last) == 1 or last[-1] != '"'):
+            stripped = last[1:].strip()
+            if stripped:
+                tokens[-1] = stripped
+            else:
+                tokens.pop()
+    
+    return tokens
+
+
+def parse_atom(token: str) -> Any:
+    """Convert an atom token to a string, number or symbol"""
+    if token[0] in _SYMBOL_START:
+        return token
+    if token.startswith('"') and token.endswith('"'):
+        return token[1:-1]
+    try:
+        if '.' in token:
+            return float(token)
+        return int(token)
+    except ValueError:
+        return token
+
+
+def _unexpected(tokens: List[str], index: int) -> SyntaxError:
+    """Build the error for a stray closing parenthesis"""
+    if isinstance(tokens, TokenList) and tokens.code:
+        line, col = tokens.span(index)[:2]
+        return SyntaxError(f"Unexpected ) at line {line}, column {col}")
+    return SyntaxError("Unexpected )")
+
+
+def read_form(tokens: List[str], pos: int = 0) -> Tuple[Any, int]:
+    """
+    Parse one expression starting at a cursor position
+    
+    Lists left open at the end of input are closed implicitly.
+    
+    Args:
+        tokens: Token list (not modified)
+        pos: Index of the first token of the expression
+    
+    Returns:
+        Tuple of (expression, index after the expression)
+    """
+    n = len(tokens)
+    if pos >= n:
+        return None, pos
+    
+    stack = []
+    while pos < n:
+        token = tokens[pos]
+        pos += 1
+        
+        if token == '(':
+            stack.append([])
+            continue
+        
+        if token == ')':
+            if not stack:
+                raise _unexpected(tokens, pos - 1)
+            value = stack.pop()
+        else:
+            value = parse_atom(token)
+        
+        if not stack:
+            return value, pos
+        stack[-1].append(value)
+    
+    while len(stack) > 1:
+        done = stack.pop()
+        stack[-1].append(done)
+    return stack[0], pos
+
+
+def read_all(tokens: List[str]) -> List[Any]:
+    """
+    Parse every top-level expression in linear time
+    
+    Args:
+        tokens: Token list
+    
+    Returns:
+        List of top-level expressions
+    """
+    forms = []
+    pos = 0
+    n = len(tokens)
+    while pos < n:
+        expr, pos = read_form(tokens, pos)
+        forms.append(expr)
+    return forms
+
+
+def read(code: str) -> List[Any]:
+    """Tokenize and parse Lisp code into top-level expressions"""
+    return read_all(tokenize(code))
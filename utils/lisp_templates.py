@@ -350,3 +350,23 @@ def get_all_templates() -> dict:
 def list_templates() -> list:
     """Get list of template names"""
     return list(TEMPLATES.keys())
+
+
+def precompile_templates() -> int:
+    """
+    Compile every template into the program caches
+    
+    Run once at start-up so the first preview of any template skips
+    parsing: the previews' LispInterpreter gets the parsed forms and the
+    AdvancedLispInterpreter (batches, sweeps, exports) the compiled ones.
+    With the disk cache enabled, later workers only load the forms.
+    
+    Returns:
+        Number of templates compiled
+    """
+    from utils.lisp_interpreter import LispInterpreter
+    from utils.lisp_interpreter_advanced import AdvancedLispInterpreter
+    
+    codes = [template['code'] for template in TEMPLATES.values()]
+    LispInterpreter().precompile(codes)
+    return AdvancedLispInterpreter().precompile(codes)
@@ -0,0 +1,385 @@
+"""
+Vectorized Loop Evaluation
+Evaluates pure arithmetic loop bodies once over a NumPy index vector
+"""
+
+import math
+from itertools import repeat
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+
+# Loops with fewer iterations run through the scalar path
+MIN_ITERATIONS = 16
+
+# Geometry fields of the primitives a loop body may produce in one batch
+PRIMITIVE_LAYOUTS = {
+    'rect': ('x', 'y', 'width', 'height'),
+    'circle': ('x', 'y', 'radius'),
+    'line': ('x1', 'y1', 'x2', 'y2'),
+    'arc': ('x', 'y', 'radius', 'start', 'end'),
+}
+
+# Integers are computed in float64 and must stay below this magnitude
+_INT_LIMIT = 2.0 ** 53
+
+_MISSING = object()
+
+# A value is (data, is_int): data is a float64 array over the iterations
+# or a plain float, is_int tells whether the scalar path would hold ints
+Value = Tuple[Any, bool]
+
+
+class _Fallback(Exception):
+    """The batch cannot reproduce the scalar results exactly"""
+
+
+def _checked(data: Any, is_int: bool) -> Value:
+    """Reject values the scalar path would compute differently"""
+    if is_int:
+        if not np.all(np.abs(data) < _INT_LIMIT):
+            raise _Fallback()
+        # Integer zero has no sign
+        data = data + 0.0
+    elif not np.all(np.isfinite(data)):
+        raise _Fallback()
+    return data, is_int
+
+
+def _each(func: Callable, *columns: Any) -> Any:
+    """Apply a Python math function per iteration (bit-identical to scalar)"""
+    if not any(np.ndim(c) for c in columns):
+        return float(func(*columns))
+    arrays = np.broadcast_arrays(*columns)
+    return np.array([func(*row) for row in zip(*(a.tolist() for a in arrays))],
+                    dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# Operations - mirror the scalar builtins of utils.lisp_compiler
+# ---------------------------------------------------------------------------
+
+def _add(args: List[Value]) -> Value:
+    # The scalar + folds from int 0, adding left to right
+    data, is_int = 0.0, True
+    for arg_data, arg_int in args:
+        data, is_int = _checked(data + arg_data, is_int and arg_int)
+    return data, is_int
+
+
+def _sub(args: List[Value]) -> Value:
+    if not args:
+        raise _Fallback()
+    first, first_int = args[0]
+    if len(args) == 1:
+        return _checked(-first, first_int)
+    rest, rest_int = _add(args[1:])
+    return _checked(first - rest, first_int and rest_int)
+
+
+def _mul(args: List[Value]) -> Value:
+    data, is_int = 1.0, True
+    for arg_data, arg_int in args:
+        data, is_int = _checked(data * arg_data, is_int and arg_int)
+    return data, is_int
+
+
+def _div(args: List[Value]) -> Value:
+    if len(args) != 2:
+        return 0.0, True
+    (a, _), (b, _) = args
+    if np.any(b == 0):
+        raise _Fallback()
+    return _checked(a / b, False)
+
+
+def _mod(args: List[Value]) -> Value:
+    if len(args) != 2:
+        return 0.0, True
+    (a, a_int), (b, b_int) = args
+    if np.any(b == 0):
+        raise _Fallback()
+    # np.remainder follows Python's sign rules for %
+    return _checked(np.remainder(a, b), a_int and b_int)
+
+
+def _unary(func: Callable, int_result: Optional[bool]) -> Callable:
+    """One-argument operation; int_result None keeps the argument's type"""
+    def op(args):
+        if not args:
+            return 0.0, True
+        data, is_int = args[0]
+        return _checked(func(data), is_int if int_result is None else int_result)
+    return op
+
+
+def _libm(func: Callable) -> Callable:
+    """Wrap a math function so results match the scalar path bit for bit"""
+    return lambda data: _each(func, data)
+
+
+def _sqrt(args: List[Value]) -> Value:
+    if not args:
+        return 0.0, True
+    data, _ = args[0]
+    if np.any(data < 0):
+        raise _Fallback()
+    return _checked(np.sqrt(data), False)
+
+
+def _pow(args: List[Value]) -> Value:
+    if len(args) != 2:
+        return 0.0, True
+    (a, _), (b, _) = args
+    return _checked(_each(math.pow, a, b), False)
+
+
+def _extreme(pick: Callable) -> Callable:
+    """min/max keeping the first of equal values, like the builtins"""
+    def op(args):
+        if not args:
+            return 0.0, True
+        data, is_int = args[0]
+        for arg_data, arg_int in args[1:]:
+            if arg_int != is_int:
+                raise _Fallback()
+            data = np.where(pick(arg_data, data), arg_data, data)
+        return _checked(data, is_int)
+    return op
+
+
+OPERATIONS: Dict[str, Callable[[List[Value]], Value]] = {
+    '+': _add,
+    '-': _sub,
+    '*': _mul,
+    '/': _div,
+    '%': _mod,
+    'sin': _unary(_libm(math.sin), False),
+    'cos': _unary(_libm(math.cos), False),
+    'tan': _unary(_libm(math.tan), False),
+    'sqrt': _sqrt,
+    'pow': _pow,
+    'abs': _unary(np.abs, None),
+    'min': _extreme(lambda a, b: a < b),
+    'max': _extreme(lambda a, b: a > b),
+    'floor': _unary(np.floor, True),
+    'ceil': _unary(np.ceil, True),
+    'round': _unary(np.rint, True),
+}
+
+
+# ---------------------------------------------------------------------------
+# Batches
+# ---------------------------------------------------------------------------
+
+class PrimitiveBatch:
+    """
+    Primitives of one type produced by a vectorized loop
+    
+    Geometry is held as float64 columns; the drawing style is shared by
+    every primitive because a vectorizable body cannot change it.
+    """
+    
+    __slots__ = ('kind', 'count', 'columns', 'color', 'fill', 'stroke_width')
+    
+    def __init__(self, kind: str, count: int, columns: Dict[str, Value],
+                 color: Any, fill: Any, stroke_width: Any):
+        """
+        Initialize batch
+        
+        Args:
+            kind: Primitive type
+            count: Number of primitives
+            columns: Field name -> (float64 array, holds ints)
+            color: Current color when the loop ran
+            fill: Current fill flag (ignored for lines)
+            stroke_width: Current stroke width
+        """
+        self.kind = kind
+        self.count = count
+        self.columns = columns
+        self.color = color
+        self.fill = fill
+        self.stroke_width = stroke_width
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def values(self, field: str) -> list:
+        """Get one column as Python numbers of the scalar path's types"""
+        data, is_int = self.columns[field]
+        return data.astype(np.int64).tolist() if is_int else data.tolist()
+    
+    def to_commands(self) -> List[Dict]:
+        """Expand into drawing command dictionaries"""
+        fields = PRIMITIVE_LAYOUTS[self.kind]
+        if self.kind == 'line':
+            style_keys = ('color', 'stroke_width')
+            style = (self.color, self.stroke_width)
+        else:
+            style_keys = ('color', 'fill', 'stroke_width')
+            style = (self.color, self.fill, self.stroke_width)
+        keys = ('type',) + fields + style_keys
+        
+        rows = zip(repeat(self.kind, self.count),
+                   *(self.values(field) for field in fields),
+                   *(repeat(value, self.count) for value in style))
+        return [dict(zip(keys, row)) for row in rows]
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+class _Context:
+    """State of one batch evaluation"""
+    
+    __slots__ = ('env', 'scope', 'free')
+    
+    def __init__(self, env, scope: Dict[str, Value]):
+        self.env = env
+        self.scope = scope
+        self.free = {}
+    
+    def lookup(self, name: str) -> Value:
+        """Resolve a variable bound outside the loop"""
+        value = self.free.get(name, _MISSING)
+        if value is _MISSING:
+            raw = self.env.lookup(name, _MISSING)
+            if type(raw) is int:
+                value = _checked(float(raw), True)
+            elif type(raw) is float:
+                value = _checked(raw, False)
+            else:
+                # Unbound symbols and non-numbers take the scalar path
+                raise _Fallback()
+            self.free[name] = value
+        return value
+
+
+def _compile_value(expr: Any, scope: set, calls: set) -> Optional[Callable]:
+    """Compile an arithmetic expression, None when it is not vectorizable"""
+    if type(expr) is int:
+        if abs(expr) >= _INT_LIMIT:
+            return None
+        value = (float(expr), True)
+        return lambda ctx: value
+    
+    if type(expr) is float:
+        if not math.isfinite(expr):
+            return None
+        value = (expr, False)
+        return lambda ctx: value
+    
+    if isinstance(expr, str):
+        if expr in scope:
+            return lambda ctx: ctx.scope[expr]
+        return lambda ctx: ctx.lookup(expr)
+    
+    if isinstance(expr, list) and expr and isinstance(expr[0], str):
+        op = OPERATIONS.get(expr[0])
+        if op is None:
+            return None
+        args = [_compile_value(e, scope, calls) for e in expr[1:]]
+        if any(arg is None for arg in args):
+            return None
+        calls.add(expr[0])
+        return lambda ctx: op([arg(ctx) for arg in args])
+    
+    return None
+
+
+def _compile_draw(expr: Any, scope: set, calls: set) -> Optional[Tuple]:
+    """Compile a primitive call into (kind, field nodes, extra nodes)"""
+    if not isinstance(expr, list) or not expr or not isinstance(expr[0], str):
+        return None
+    fields = PRIMITIVE_LAYOUTS.get(expr[0])
+    if fields is None or len(expr) - 1 < len(fields):
+        return None
+    args = [_compile_value(e, scope, calls) for e in expr[1:]]
+    if any(arg is None for arg in args):
+        return None
+    calls.add(expr[0])
+    return expr[0], args[:len(fields)], args[len(fields):]
+
+
+def compile_loop(body: Any, var_name: Any) -> Optional[Callable]:
+    """
+    Compile a loop body for batch evaluation
+    
+    Vectorizable bodies are one primitive call, or a do block of defs and
+    primitive calls ending in a primitive call, whose arguments are
+    arithmetic over numbers, the loop variable and variables bound outside
+    the loop. Such a body has no side effects, so evaluating it once over
+    all iterations is equivalent to the scalar loop.
+    
+    Args:
+        body: Parsed loop body
+        var_name: Loop variable name
+    
+    Returns:
+        Function (interpreter, environment, indices) returning a
+        PrimitiveBatch or None when the scalar path must be used,
+        or None when the body is not vectorizable at all
+    """
+    if not isinstance(var_name, str):
+        return None
+    
+    if isinstance(body, list) and body and body[0] == 'do':
+        forms = body[1:]
+    else:
+        forms = [body]
+    if not forms:
+        return None
+    
+    scope = {var_name}
+    calls = set()
+    steps = []
+    for index, form in enumerate(forms):
+        last = index == len(forms) - 1
+        if (not last and isinstance(form, list) and len(form) >= 3
+                and form[0] == 'def' and isinstance(form[1], str)):
+            value = _compile_value(form[2], scope, calls)
+            if value is None:
+                return None
+            scope.add(form[1])
+            steps.append((form[1], value))
+            continue
+        
+        draw = _compile_draw(form, scope, calls)
+        if draw is None:
+            return None
+        steps.append((None, draw))
+    
+    def batch(rt, env, indices: range) -> Optional[PrimitiveBatch]:
+        if any(name in rt.functions for name in calls):
+            return None
+        
+        count = len(indices)
+        scope = {var_name: (np.arange(indices.start, indices.stop,
+                                      dtype=np.float64), True)}
+        ctx = _Context(env, scope)
+        try:
+            with np.errstate(all='ignore'):
+                for name, step in steps:
+                    if name is not None:
+                        scope[name] = step(ctx)
+                        continue
+                    kind, field_nodes, extra_nodes = step
+                    columns = [node(ctx) for node in field_nodes]
+                    for node in extra_nodes:
+                        node(ctx)
+        except (_Fallback, ArithmeticError, ValueError):
+            return None
+        
+        fields = PRIMITIVE_LAYOUTS[kind]
+        return PrimitiveBatch(
+            kind, count,
+            {field: (np.broadcast_to(np.asarray(data, dtype=np.float64),
+                                     (count,)), is_int)
+             for field, (data, is_int) in zip(fields, columns)},
+            rt.current_color, rt.current_fill, rt.current_stroke_width
+        )
+    
+    return batch
@@ -59,6 +59,12 @@ class PerformanceMonitor:
         
         return stats
     
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss counters of the shared Lisp program cache"""
+        from utils.lisp_cache import get_program_cache
+        
+        return {'lisp_programs': get_program_cache().get_stats()}
+    
     def clear(self):
         """Clear all metrics"""
         self.metrics.clear()
@@ -0,0 +1,316 @@
+"""
+Spatial Index for Drawing Commands
+Uniform grid over primitive bounding boxes for viewport culling and hit-testing
+"""
+
+import math
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.draw_list import DrawList, KINDS
+
+
+# Items overlapping more grid cells than this are kept in a separate list
+MAX_CELLS_PER_ITEM = 16
+
+# Approximate glyph width as a fraction of the font size
+TEXT_ADVANCE = 0.6
+
+Box = Tuple[float, float, float, float]
+
+
+def _number(value: Any) -> bool:
+    return type(value) in (int, float) and math.isfinite(value)
+
+
+def command_bounds(cmd: Dict) -> Optional[Box]:
+    """
+    Get the bounding box of one drawing command
+    
+    Boxes include half the stroke width; text is estimated from its
+    size and length around the anchor point.
+    
+    Args:
+        cmd: Drawing command dictionary
+    
+    Returns:
+        (x0, y0, x1, y1), or None when the command has no usable geometry
+        (errors, unknown types, symbolic coordinates)
+    """
+    if not isinstance(cmd, dict):
+        return None
+    kind = cmd.get('type')
+    try:
+        if kind == 'rect':
+            x, y, w, h = cmd['x'], cmd['y'], cmd['width'], cmd['height']
+            box = (min(x, x + w), min(y, y + h), max(x, x + w), max(y, y + h))
+        elif kind in ('circle', 'arc'):
+            x, y, r = cmd['x'], cmd['y'], abs(cmd['radius'])
+            box = (x - r, y - r, x + r, y + r)
+        elif kind == 'line':
+            x1, y1, x2, y2 = cmd['x1'], cmd['y1'], cmd['x2'], cmd['y2']
+            box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        elif kind == 'text':
+            x, y, size = cmd['x'], cmd['y'], abs(cmd['size'])
+            half = TEXT_ADVANCE * size * len(str(cmd.get('text', '')))
+            box = (x - half, y - size, x + half, y + size)
+        elif kind == 'polygon':
+            xs = [p['x'] for p in cmd['points']]
+            ys = [p['y'] for p in cmd['points']]
+            if not xs:
+                return None
+            box = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not all(_number(v) for v in box):
+        return None
+    
+    stroke = cmd.get('stroke_width', 0)
+    pad = abs(stroke) / 2 if _number(stroke) else 0
+    return (box[0] - pad, box[1] - pad, box[2] + pad, box[3] + pad)
+
+
+def _drawlist_bounds(draw_list: DrawList) -> np.ndarray:
+    """Bounding boxes of a DrawList computed column-wise (NaN rows: unbounded)"""
+    boxes = np.full((len(draw_list), 4), np.nan)
+    order = draw_list.order()
+    
+    for code, kind in enumerate(KINDS):
+        if kind == 'other' or not draw_list.count(kind):
+            continue
+        rows = np.flatnonzero(order['kind'] == code)
+        cols = draw_list.columns(kind)
+        if kind == 'rect':
+            x, y = cols['x'], cols['y']
+            x2, y2 = x + cols['width'], y + cols['height']
+            box = [np.minimum(x, x2), np.minimum(y, y2), np.maximum(x, x2), np.maximum(y, y2)]
+        elif kind in ('circle', 'arc'):
+            x, y, r = cols['x'], cols['y'], np.abs(cols['radius'])
+            box = [x - r, y - r, x + r, y + r]
+        elif kind == 'line':
+            x1, y1, x2, y2 = cols['x1'], cols['y1'], cols['x2'], cols['y2']
+            box = [np.minimum(x1, x2), np.minimum(y1, y2), np.maximum(x1, x2), np.maximum(y1, y2)]
+        elif kind == 'text':
+            x, y, size = cols['x'], cols['y'], np.abs(cols['size'])
+            length = np.array([len(t) for t in cols['text']], dtype=np.float64)
+            half = TEXT_ADVANCE * size * length
+            box = [x - half, y - size, x + half, y + size]
+        else:
+            offsets, points = cols['offsets'], cols['points']
+            counts = np.diff(offsets)
+            box = [np.full(len(counts), np.nan) for _ in range(4)]
+            filled = np.flatnonzero(counts > 0)
+            if len(filled):
+                # Empty polygons add no points, so filled starts delimit segments
+                starts = offsets[:-1][filled]
+                for i, (axis, reduce) in enumerate(((0, np.minimum), (1, np.minimum),
+                                                    (0, np.maximum), (1, np.maximum))):
+                    box[i][filled] = reduce.reduceat(points[:, axis], starts)
+        
+        pad = np.where(cols['has_stroke'] == 1, np.abs(cols['stroke_width']) / 2, 0.0)
+        table = np.column_stack([box[0] - pad, box[1] - pad, box[2] + pad, box[3] + pad])
+        boxes[rows] = table[order['row'][rows]]
+    
+    boxes[~np.isfinite(boxes).all(axis=1)] = np.nan
+    return boxes
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the bounding boxes of drawing commands
+    
+    Each primitive is registered in every grid cell its box overlaps;
+    boxes spanning more than MAX_CELLS_PER_ITEM cells (backgrounds, long
+    beams) and commands without geometry (errors) are kept aside and
+    tested directly. Queries return command indexes, so the result can
+    be mapped back to the command list, a DrawList or source forms.
+    The grid is a CSR table (sorted cell keys with index slices) built
+    with NumPy; a DrawList's boxes are computed column by column.
+    """
+    
+    def __init__(self, commands: Iterable[Dict], cell_size: Optional[float] = None):
+        """
+        Build the index
+        
+        Args:
+            commands: Drawing commands (list or DrawList); not copied
+            cell_size: Grid cell size in drawing units (default: twice the
+                median primitive size, bounded to a 1024 x 1024 grid)
+        """
+        if isinstance(commands, DrawList):
+            self.commands = commands
+            boxes = _drawlist_bounds(commands)
+        else:
+            self.commands = commands if isinstance(commands, list) else list(commands)
+            boxes = np.array([command_bounds(cmd) or (np.nan,) * 4
+                              for cmd in self.commands], dtype=np.float64).reshape(-1, 4)
+        self.boxes = boxes
+        
+        bounded = ~np.isnan(boxes[:, 0])
+        self.unbounded = np.flatnonzero(~bounded)
+        if not bounded.any():
+            self.extent = None
+            self.cell_size = cell_size or 1.0
+            self.large = np.zeros(0, dtype=np.int64)
+            self._keys = np.zeros(0, dtype=np.int64)
+            self._items = np.zeros(0, dtype=np.int64)
+            self._origin = (0.0, 0.0)
+            self._rows = 1
+            return
+        
+        b = boxes[bounded]
+        self.extent = (float(b[:, 0].min()), float(b[:, 1].min()),
+                       float(b[:, 2].max()), float(b[:, 3].max()))
+        span = max(self.extent[2] - self.extent[0], self.extent[3] - self.extent[1])
+        if cell_size is None:
+            sizes = np.maximum(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1])
+            cell_size = 2 * float(np.median(sizes))
+            cell_size = max(cell_size, span / 1024, 1e-9)
+        self.cell_size = cell_size
+        self._origin = (self.extent[0], self.extent[1])
+        self._rows = int((self.extent[3] - self.extent[1]) // cell_size) + 1
+        
+        ids = np.flatnonzero(bounded)
+        cx0, cy0 = self._cell(b[:, 0], b[:, 1])
+        cx1, cy1 = self._cell(b[:, 2], b[:, 3])
+        width = cx1 - cx0 + 1
+        cells = width * (cy1 - cy0 + 1)
+        small = cells <= MAX_CELLS_PER_ITEM
+        self.large = ids[~small]
+        
+        # One entry per (item, cell) pair, then sorted by cell key
+        ids, cx0, cy0, width, cells = ids[small], cx0[small], cy0[small], width[small], cells[small]
+        items = np.repeat(ids, cells)
+        starts = np.repeat(np.cumsum(cells) - cells, cells)
+        k = np.arange(len(items)) - starts
+        w = np.repeat(width, cells)
+        keys = (np.repeat(cx0, cells) + k % w) * self._rows + np.repeat(cy0, cells) + k // w
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._items = items[order]
+    
+    def _cell(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid coordinates of points inside the extent"""
+        size = self.cell_size
+        return ((x - self._origin[0]) // size).astype(np.int64), \
+            ((y - self._origin[1]) // size).astype(np.int64)
+    
+    def __len__(self) -> int:
+        return len(self.boxes)
+    
+    def _candidates(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """Indexes that may overlap the box, before the exact box test"""
+        extent = self.extent
+        parts = [self.large]
+        if (extent is not None and x0 <= extent[2] and x1 >= extent[0]
+                and y0 <= extent[3] and y1 >= extent[1]):
+            # Clamp to the extent: every registered cell lies inside it
+            lo = self._cell(np.array([max(x0, extent[0])]), np.array([max(y0, extent[1])]))
+            hi = self._cell(np.array([min(x1, extent[2])]), np.array([min(y1, extent[3])]))
+            cx0, cy0, cx1, cy1 = int(lo[0][0]), int(lo[1][0]), int(hi[0][0]), int(hi[1][0])
+            columns = np.arange(cx0, cx1 + 1, dtype=np.int64) * self._rows
+            if len(columns) * 2 >= len(self._keys):
+                # Wide viewport: testing every box is cheaper than the slices
+                parts.append(self._items)
+            else:
+                lows = np.searchsorted(self._keys, columns + cy0, side='left')
+                highs = np.searchsorted(self._keys, columns + cy1, side='right')
+                parts.extend(self._items[lo:hi] for lo, hi in zip(lows, highs) if hi > lo)
+        return np.unique(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+    
+    def query(self, x0: float, y0: float, x1: float, y1: float,
+              include_unbounded: bool = True) -> List[int]:
+        """
+        Find the commands whose bounding box overlaps a viewport
+        
+        Args:
+            x0, y0, x1, y1: Viewport corners in drawing units
+            include_unbounded: Also return commands without geometry
+                (errors, unknown types), which cannot be culled safely
+        
+        Returns:
+            Command indexes in draw order
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        ids = self._candidates(x0, y0, x1, y1)
+        b = self.boxes[ids]
+        hit = ids[(b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)]
+        if include_unbounded and len(self.unbounded):
+            hit = np.union1d(hit, self.unbounded)
+        else:
+            hit = np.sort(hit)
+        return hit.tolist()
+    
+    def visible(self, x0: float, y0: float, x1: float, y1: float) -> List[Dict]:
+        """Get the commands to draw for a viewport, in draw order"""
+        commands = self.commands
+        return [commands[i] for i in self.query(x0, y0, x1, y1)]
+    
+    def zoom_viewport(self, zoom: float,
+                      center: Tuple[float, float] = (0.5, 0.5)) -> Optional[Box]:
+        """
+        Get the viewport showing part of the drawing at a zoom factor
+        
+        Args:
+            zoom: Magnification over the whole drawing (1 shows everything)
+            center: Viewport center as fractions of the drawing's width
+                and height; the viewport is kept inside the drawing
+        
+        Returns:
+            (x0, y0, x1, y1) in drawing units, or None without geometry
+        """
+        if self.extent is None:
+            return None
+        x0, y0, x1, y1 = self.extent
+        zoom = max(zoom, 1.0)
+        width, height = (x1 - x0) / zoom, (y1 - y0) / zoom
+        left = x0 + center[0] * (x1 - x0) - width / 2
+        top = y0 + center[1] * (y1 - y0) - height / 2
+        left = min(max(left, x0), x1 - width)
+        top = min(max(top, y0), y1 - height)
+        return (left, top, left + width, top + height)
+    
+    def hit_test(self, x: float, y: float, tolerance: float = 0.0) -> List[int]:
+        """
+        Find the primitives under a point, e.g. a mouse click
+        
+        Circles, arcs and lines are tested against their geometry (with
+        half the stroke width), other primitives against their box.
+        
+        Args:
+            x, y: Point in drawing units
+            tolerance: Extra distance accepted around each primitive
+        
+        Returns:
+            Command indexes, topmost (last drawn) first
+        """
+        hits = []
+        for index in reversed(self.query(x - tolerance, y - tolerance,
+                                         x + tolerance, y + tolerance,
+                                         include_unbounded=False)):
+            cmd = self.commands[index]
+            kind = cmd.get('type')
+            stroke = cmd.get('stroke_width', 0)
+            reach = tolerance + (abs(stroke) / 2 if _number(stroke) else 0)
+            if kind in ('circle', 'arc'):
+                if math.hypot(x - cmd['x'], y - cmd['y']) > abs(cmd['radius']) + reach:
+                    continue
+            elif kind == 'line':
+                if _segment_distance(x, y, cmd['x1'], cmd['y1'],
+                                     cmd['x2'], cmd['y2']) > reach:
+                    continue
+            hits.append(index)
+        return hits
+
+
+def _segment_distance(px: float, py: float, x1: float, y1: float,
+                      x2: float, y2: float) -> float:
+    """Distance from a point to a line segment"""
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
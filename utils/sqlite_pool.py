@@ -0,0 +1,160 @@
+"""
+Pooled SQLite Connections
+Thread-safe pool of tuned, long-lived connections shared per database file
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+# Applied to every new connection; WAL lets readers run alongside a writer
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",     # Safe with WAL, no fsync per commit
+    "PRAGMA cache_size = -8000",       # 8 MB page cache per connection
+    "PRAGMA mmap_size = 67108864",     # Read through a 64 MB memory map
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ConnectionPool:
+    """
+    Small pool of open connections to one SQLite database
+    
+    Opening a connection repeats file setup and schema parsing, so
+    connections are kept open and handed out one caller at a time; each
+    keeps its own prepared statement cache, so repeated queries are not
+    re-parsed. Connections are created lazily up to max_connections and
+    callers wait for a free one beyond that. In-memory databases are
+    private to their connection and get a single one.
+    """
+    
+    def __init__(self, db_path: str, max_connections: int = 4,
+                 timeout: float = 30.0, cached_statements: int = 256):
+        """
+        Initialize connection pool
+        
+        Args:
+            db_path: Path to SQLite database
+            max_connections: Maximum number of open connections
+            timeout: Seconds to wait for a free connection or a lock
+            cached_statements: Prepared statements kept per connection
+        """
+        self.db_path = db_path
+        self.max_connections = 1 if db_path == ':memory:' else max(1, max_connections)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._all = []
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.max_connections
+            if create:
+                self._created += 1
+        if create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._all.append(conn)
+            return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No free connection to {self.db_path} after {self.timeout:g} s"
+            )
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for one unit of work
+        
+        The transaction is committed when the block ends and rolled back
+        when it raises; the connection then returns to the pool.
+        
+        Yields:
+            Open connection, used by the caller's thread only
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                pooled = any(c is conn for c in self._all)
+            if pooled:
+                self._idle.put(conn)
+            else:
+                # The pool was closed while the connection was borrowed
+                conn.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of open and idle connections"""
+        with self._lock:
+            connections = self._created
+        return {
+            'connections': connections,
+            'idle': self._idle.qsize(),
+            'max_connections': self.max_connections
+        }
+    
+    def close(self):
+        """Close idle connections now and borrowed ones when they are returned"""
+        with self._lock:
+            self._all = []
+            self._created = 0
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Pools per database file
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(db_path: str) -> ConnectionPool:
+    """
+    Get the process-wide pool of a database file
+    
+    Every call for ':memory:' returns a new pool, since each in-memory
+    database belongs to its caller alone.
+    """
+    if db_path == ':memory:':
+        return ConnectionPool(db_path)
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
@@ -0,0 +1,380 @@
+"""
+SVG Renderer for Lisp Drawings
+Renders interpreter draw commands to compact SVG, cached by draw-list hash
+"""
+
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from utils.draw_list import DrawList
+from utils.level_of_detail import LevelOfDetail
+from utils.spatial_index import Box, command_bounds
+
+
+# Style key of a batched path: ('fill' | 'stroke', color, stroke width)
+Style = Tuple[str, Any, Any]
+
+
+def _number(value: Any) -> bool:
+    return type(value) in (int, float) and math.isfinite(value)
+
+
+def _fmt(value: float) -> str:
+    """Shortest coordinate text, rounded to 1/1000 of a drawing unit"""
+    if type(value) is int:
+        return str(value)
+    text = '%.3f' % value
+    text = text.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+def drawlist_hash(commands: Iterable[Dict]) -> str:
+    """
+    Content hash of drawing commands
+    
+    DrawLists are hashed from their column buffers without rebuilding
+    any dictionaries; other iterables are hashed from their repr.
+    
+    Args:
+        commands: Drawing commands (list or DrawList)
+    
+    Returns:
+        Hex digest identifying the drawing
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(commands, DrawList):
+        digest.update(b'drawlist')
+        digest.update(bytes(commands.kinds))
+        digest.update(commands.rows.tobytes())
+        digest.update(repr(commands.colors).encode('utf-8', 'replace'))
+        for kind, table in commands._tables.items():
+            digest.update(kind.encode())
+            for column in table.columns.values():
+                digest.update(column.data.tobytes())
+                digest.update(bytes([column.all_int]))
+                if column.int_rows is not None:
+                    digest.update(column.int_rows.tobytes())
+            for data in (table.color, table.fill, table.stroke_width.data, table.has_stroke):
+                digest.update(data.tobytes())
+            if table.text is not None:
+                digest.update(repr(table.text).encode('utf-8', 'replace'))
+            if table.points is not None:
+                digest.update(table.point_offsets.tobytes())
+                digest.update(table.points.data.tobytes())
+        digest.update(repr(commands.others).encode('utf-8', 'replace'))
+    else:
+        commands = commands if isinstance(commands, list) else list(commands)
+        digest.update(b'list')
+        digest.update(repr(commands).encode('utf-8', 'replace'))
+    return digest.hexdigest()
+
+
+def _style(cmd: Dict) -> Style:
+    stroke_width = cmd.get('stroke_width', 2)
+    if not _number(stroke_width):
+        stroke_width = 2
+    if cmd['type'] != 'line' and cmd.get('fill') is True:
+        return 'fill', cmd.get('color'), None
+    return 'stroke', cmd.get('color'), stroke_width
+
+
+def _path_data(cmd: Dict) -> Optional[str]:
+    """
+    Path data of one primitive, or None when it has no usable geometry
+    
+    Every closed outline runs clockwise on screen, so filled outlines
+    batched into one path union under the nonzero fill rule.
+    """
+    kind = cmd['type']
+    if kind == 'rect':
+        x, y, w, h = cmd['x'], cmd['y'], cmd['width'], cmd['height']
+        if not all(_number(v) for v in (x, y, w, h)):
+            return None
+        x, w = (x + w, -w) if w < 0 else (x, w)
+        y, h = (y + h, -h) if h < 0 else (y, h)
+        return f"M{_fmt(x)} {_fmt(y)}h{_fmt(w)}v{_fmt(h)}h{_fmt(-w)}Z"
+    if kind == 'circle':
+        x, y, r = cmd['x'], cmd['y'], cmd['radius']
+        if not all(_number(v) for v in (x, y, r)) or r <= 0:
+            return None
+        r, d = _fmt(r), _fmt(2 * r)
+        return f"M{_fmt(x - cmd['radius'])} {_fmt(y)}a{r} {r} 0 1 1 {d} 0a{r} {r} 0 1 1 -{d} 0Z"
+    if kind == 'arc':
+        return _arc_data(cmd)
+    if kind == 'polygon':
+        points = [(p['x'], p['y']) for p in cmd['points']]
+        if len(points) < 2 or not all(_number(v) for p in points for v in p):
+            return None
+        # Reverse counter-clockwise outlines (shoelace area, y down)
+        area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1)
+                   in zip(points, points[1:] + points[:1]))
+        if area < 0:
+            points.reverse()
+        return 'M' + 'L'.join(f"{_fmt(x)} {_fmt(y)}" for x, y in points) + 'Z'
+    return None
+
+
+def _arc_data(cmd: Dict) -> Optional[str]:
+    """Clockwise arc from start to end (radians, like canvas arc()), closed by its chord"""
+    x, y, r, start, end = cmd['x'], cmd['y'], cmd['radius'], cmd.get('start'), cmd.get('end')
+    if not all(_number(v) for v in (x, y, r, start, end)) or r <= 0:
+        return None
+    sweep = end - start
+    if sweep >= 2 * math.pi:
+        sweep = 2 * math.pi
+    else:
+        sweep %= 2 * math.pi
+    if sweep == 0:
+        return None
+    
+    # A full turn is drawn as two half arcs
+    steps = [start, start + sweep / 2, start + sweep] if sweep > math.pi else [start, start + sweep]
+    parts = [f"M{_fmt(x + r * math.cos(start))} {_fmt(y + r * math.sin(start))}"]
+    radius = _fmt(r)
+    for a, b in zip(steps, steps[1:]):
+        large = 1 if b - a > math.pi else 0
+        parts.append(f"A{radius} {radius} 0 {large} 1 "
+                     f"{_fmt(x + r * math.cos(b))} {_fmt(y + r * math.sin(b))}")
+    closed = cmd.get('fill') is True or sweep == 2 * math.pi
+    return ''.join(parts) + ('Z' if closed else '')
+
+
+def _line_data(cmd: Dict, pen: Optional[Tuple]) -> Tuple[Optional[str], Optional[Tuple]]:
+    """Path data of a line, skipping the move when it starts where the pen is"""
+    x1, y1, x2, y2 = cmd['x1'], cmd['y1'], cmd['x2'], cmd['y2']
+    if not all(_number(v) for v in (x1, y1, x2, y2)):
+        return None, pen
+    end = (_fmt(x2), _fmt(y2))
+    start = (_fmt(x1), _fmt(y1))
+    data = f"L{end[0]} {end[1]}"
+    if start != pen:
+        data = f"M{start[0]} {start[1]}" + data
+    return data, end
+
+
+def _path_element(style: Style, data: List[str]) -> str:
+    mode, color, stroke_width = style
+    color = quoteattr(str(color))
+    if mode == 'fill':
+        return f'<path d="{"".join(data)}" fill={color}/>'
+    return (f'<path d="{"".join(data)}" fill="none" stroke={color} '
+            f'stroke-width="{_fmt(stroke_width)}"/>')
+
+
+def render_svg(commands: Iterable[Dict], width: Optional[int] = None,
+               height: Optional[int] = None, padding: float = 10,
+               background: Optional[str] = None,
+               viewport: Optional[Box] = None) -> str:
+    """
+    Render drawing commands as an SVG document
+    
+    Consecutive primitives with the same color, fill mode and stroke
+    width are written as a single <path>, so a loop of bars or stirrups
+    costs one element instead of one per primitive; draw order is kept.
+    Filled polygons get a path each, as their outlines may cross. Text
+    is centered on its anchor point. Commands without usable geometry
+    (errors, symbolic values, unknown types) are skipped.
+    
+    Args:
+        commands: Drawing commands (list or DrawList)
+        width: Width attribute in pixels (default: drawing width)
+        height: Height attribute in pixels (default: drawing height)
+        padding: Margin around the drawing in drawing units
+        background: Optional background color
+        viewport: (x0, y0, x1, y1) to show, in drawing units, without
+            padding (default: the whole drawing)
+    
+    Returns:
+        SVG markup
+    """
+    commands = commands if isinstance(commands, (list, DrawList)) else list(commands)
+    
+    x0 = y0 = math.inf
+    x1 = y1 = -math.inf
+    elements = []
+    style, data, pen = None, [], None
+    
+    def flush():
+        if data:
+            elements.append(_path_element(style, data))
+            data.clear()
+    
+    for cmd in commands:
+        box = command_bounds(cmd)
+        if box is None:
+            continue
+        kind = cmd['type']
+        if kind == 'text':
+            flush()
+            style = None
+            elements.append(
+                f'<text x="{_fmt(cmd["x"])}" y="{_fmt(cmd["y"])}" '
+                f'font-size="{_fmt(cmd["size"])}" fill={quoteattr(str(cmd.get("color")))}>'
+                f'{escape(str(cmd.get("text", "")))}</text>'
+            )
+        else:
+            cmd_style = _style(cmd)
+            if kind == 'line':
+                path, next_pen = _line_data(cmd, pen if cmd_style == style else None)
+            else:
+                path, next_pen = _path_data(cmd), None
+            if path is None:
+                continue
+            if cmd_style != style or (kind == 'polygon' and cmd_style[0] == 'fill'):
+                flush()
+                style = cmd_style
+            data.append(path)
+            pen = next_pen
+        x0, y0 = min(x0, box[0]), min(y0, box[1])
+        x1, y1 = max(x1, box[2]), max(y1, box[3])
+    flush()
+    
+    if viewport is not None:
+        x0, y0, x1, y1 = viewport
+        padding = 0
+    if x0 > x1:
+        x0 = y0 = 0
+        x1 = y1 = 1
+    x0, y0 = x0 - padding, y0 - padding
+    view_width, view_height = x1 - x0 + padding, y1 - y0 + padding
+    size = (f' width="{width if width is not None else _fmt(view_width)}"'
+            f' height="{height if height is not None else _fmt(view_height)}"')
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg"{size} '
+        f'viewBox="{_fmt(x0)} {_fmt(y0)} {_fmt(view_width)} {_fmt(view_height)}" '
+        f'font-family="sans-serif" text-anchor="middle" dominant-baseline="middle" '
+        f'stroke-linecap="round">'
+    ]
+    if background is not None:
+        parts.append(f'<rect x="{_fmt(x0)}" y="{_fmt(y0)}" width="{_fmt(view_width)}" '
+                     f'height="{_fmt(view_height)}" fill={quoteattr(str(background))}/>')
+    parts.extend(elements)
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+class SVGRenderer:
+    """
+    SVG rendering with an LRU cache keyed by draw-list hash
+    
+    Streamlit reruns the page on every interaction; while the drawing
+    is unchanged its SVG is served from the cache, so a rerun costs one
+    hash of the draw list instead of a render.
+    """
+    
+    def __init__(self, max_entries: int = 64):
+        """
+        Initialize renderer
+        
+        Args:
+            max_entries: Maximum number of cached SVG documents
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def render(self, commands: Iterable[Dict], width: Optional[int] = None,
+               height: Optional[int] = None, padding: float = 10,
+               background: Optional[str] = None,
+               viewport: Optional[Box] = None) -> str:
+        """
+        Render drawing commands as SVG, reusing the cached document
+        
+        Args:
+            commands: Drawing commands (list or DrawList)
+            width: Width attribute in pixels (default: drawing width)
+            height: Height attribute in pixels (default: drawing height)
+            padding: Margin around the drawing in drawing units
+            background: Optional background color
+            viewport: (x0, y0, x1, y1) to show, in drawing units
+        
+        Returns:
+            SVG markup
+        """
+        commands = commands if isinstance(commands, (list, DrawList)) else list(commands)
+        key = (drawlist_hash(commands), width, height, padding, background, viewport)
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return svg
+            self.misses += 1
+        
+        svg = render_svg(commands, width, height, padding, background, viewport)
+        with self._lock:
+            self._entries[key] = svg
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return svg
+    
+    def render_thumbnail(self, commands: Iterable[Dict], size: int = 160,
+                         background: Optional[str] = None) -> str:
+        """
+        Render a small square preview
+        
+        Detail below half a pixel at the thumbnail scale is dropped
+        through LevelOfDetail before rendering, which keeps thumbnails
+        of dense drawings small.
+        
+        Args:
+            commands: Drawing commands (list or DrawList)
+            size: Width and height in pixels
+            background: Optional background color
+        
+        Returns:
+            SVG markup
+        """
+        commands = LevelOfDetail(tolerance=0.5).fit(commands, size, size)
+        return self.render(commands, width=size, height=size, background=background)
+    
+    def clear(self):
+        """Drop all cached documents and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+def use_svg_preview() -> bool:
+    """
+    Check whether previews should be sent as SVG
+    
+    Set LISP_PREVIEW=svg on slow-network deployments: one batched SVG
+    document is far smaller than the per-primitive canvas payload.
+    """
+    return os.getenv("LISP_PREVIEW", "canvas").lower() == "svg"
+
+
+# Singleton renderer
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_svg_renderer() -> SVGRenderer:
+    """Get process-wide SVG renderer"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = SVGRenderer()
+    return _renderer
@@ -6,11 +6,99 @@ Manages templates, variables, and code generation
 import json
 import sqlite3
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Tuple
 from pathlib import Path
 import hashlib
 import re
 
+from utils.sqlite_pool import get_connection_pool
+
+
+_MISSING = object()
+
+# Columns of the templates table; seq is the stable rowid of the full-text index
+_TEMPLATES_COLUMNS = '''(
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    code TEXT NOT NULL,
+    element_type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    tags TEXT,
+    variables TEXT,
+    author TEXT,
+    is_public BOOLEAN,
+    rating REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    use_count INTEGER DEFAULT 0
+)'''
+
+
+# {{name}} placeholder; names contain no braces
+_PLACEHOLDER = re.compile(r'\{\{([^{}]*)\}\}')
+
+# Literal segments around the placeholder names: literals[i] comes before names[i]
+Segments = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+@lru_cache(maxsize=256)
+def split_placeholders(code: str) -> Segments:
+    """
+    Tokenize template code into literal and placeholder segments
+    
+    Args:
+        code: Lisp code template
+    
+    Returns:
+        (literals, names), with one more literal than names
+    """
+    parts = _PLACEHOLDER.split(code)
+    return tuple(parts[0::2]), tuple(parts[1::2])
+
+
+def render_segments(segments: Segments, values: Dict[str, Any]) -> str:
+    """
+    Join literal segments with placeholder values
+    
+    Substitution is a single pass: values are inserted as str(value),
+    verbatim, and placeholders that only form around inserted text stay
+    as they are, like placeholders without a value.
+    
+    Args:
+        segments: Result of split_placeholders()
+        values: Dictionary of variable values
+    
+    Returns:
+        Code with variables substituted
+    """
+    literals, names = segments
+    if not names:
+        return literals[0]
+    pieces = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+        value = values.get(name, _MISSING)
+        pieces.append('{{' + name + '}}' if value is _MISSING else str(value))
+        pieces.append(literal)
+    return ''.join(pieces)
+
+
+def apply_placeholders(code: str, values: Dict[str, Any]) -> str:
+    """
+    Replace {{name}} placeholders in template code
+    
+    Args:
+        code: Lisp code template
+        values: Dictionary of variable values
+    
+    Returns:
+        Code with variables substituted
+    """
+    return render_segments(split_placeholders(code), values)
+
+
 class Template:
     """Represents a design template"""
     
@@ -41,7 +129,7 @@ class Template:
         self.element_type = element_type
         self.category = category
         self.description = description
-        self.tags = tags or []
+        self._tags = tags or []
         self.variables = variables or {}
         self.author = author
         self.is_public = is_public
@@ -49,6 +137,18 @@ class Template:
         self.created_at = datetime.now().isoformat()
         self.updated_at = datetime.now().isoformat()
         self.use_count = 0
+        self._segment_cache = None
+    
+    @property
+    def tags(self) -> List[str]:
+        """Tags, decoded from their stored JSON on first access"""
+        if isinstance(self._tags, str):
+            self._tags = json.loads(self._tags)
+        return self._tags
+    
+    @tags.setter
+    def tags(self, tags: List[str]):
+        self._tags = tags or []
     
     def to_dict(self) -> Dict:
         """Convert template to dictionary"""
@@ -100,18 +200,46 @@ class Template:
         Returns:
             Code with variables substituted
         """
-        code = self.code
-        
         # Merge with defaults
-        all_values = {**self.variables, **values}
+        return render_segments(self._segments(), {**self.variables, **values})
+    
+    def render_many(self, values_list: List[Dict[str, Any]]) -> List[str]:
+        """
+        Apply many sets of variable values to template code
         
-        # Replace variables in code
-        for var_name, var_value in all_values.items():
-            # Replace {{variable}} patterns
-            pattern = r'\{\{' + re.escape(var_name) + r'\}\}'
-            code = re.sub(pattern, str(var_value), code)
+        Default values are converted to text once for the whole batch;
+        each set then only converts the values it overrides.
+        
+        Args:
+            values_list: Dictionaries of variable values
         
-        return code
+        Returns:
+            Code with variables substituted, one per set of values
+        """
+        literals, names = self._segments()
+        if not names:
+            return [literals[0]] * len(values_list)
+        
+        fallbacks = [
+            str(self.variables[name]) if name in self.variables else '{{' + name + '}}'
+            for name in names
+        ]
+        slots = list(zip(names, fallbacks))
+        pieces = [None] * (2 * len(names) + 1)
+        pieces[0::2] = literals
+        rendered = []
+        for values in values_list:
+            pieces[1::2] = [str(values[name]) if name in values else fallback
+                            for name, fallback in slots]
+            rendered.append(''.join(pieces))
+        return rendered
+    
+    def _segments(self) -> Segments:
+        """Literal and placeholder segments of the code, cached until the code changes"""
+        cached = self._segment_cache
+        if cached is None or cached[0] is not self.code:
+            cached = self._segment_cache = (self.code, split_placeholders(self.code))
+        return cached[1]
     
     def get_variables(self) -> List[Dict]:
         """
@@ -143,74 +271,162 @@ class TemplateEngine:
         Initialize template engine
         
         Args:
-            db_path: Path to SQLite database
+            db_path: Path to SQLite database (connections come from the
+                process-wide pool of this file; ':memory:' gets a private
+                database per engine)
         """
         self.db_path = db_path
+        self.pool = get_connection_pool(db_path)
         self.init_db()
     
     def init_db(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            # Databases from before the explicit row key get a new table
+            c.execute("PRAGMA table_info(templates)")
+            columns = [row[1] for row in c.fetchall()]
+            if columns and 'seq' not in columns:
+                self._migrate_row_key(c)
+            
+            # Templates table
+            c.execute("CREATE TABLE IF NOT EXISTS templates " + _TEMPLATES_COLUMNS)
+            
+            # Create indexes
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_element_type ON templates(element_type)
+            ''')
+            
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_category ON templates(category)
+            ''')
+            
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_author ON templates(author)
+            ''')
+            
+            # User favorites table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS favorites (
+                    user_id TEXT NOT NULL,
+                    template_id TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (user_id, template_id),
+                    FOREIGN KEY (template_id) REFERENCES templates(id)
+                )
+            ''')
+            
+            # Template ratings table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS ratings (
+                    user_id TEXT NOT NULL,
+                    template_id TEXT NOT NULL,
+                    rating INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (user_id, template_id),
+                    FOREIGN KEY (template_id) REFERENCES templates(id)
+                )
+            ''')
+            
+            # Template tags, one row per tag
+            c.execute("SELECT 1 FROM sqlite_master WHERE name = 'template_tags'")
+            tags_existed = c.fetchone() is not None
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS template_tags (
+                    tag TEXT NOT NULL,
+                    template_id TEXT NOT NULL,
+                    PRIMARY KEY (tag, template_id)
+                ) WITHOUT ROWID
+            ''')
+            
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_template_tags_template ON template_tags(template_id)
+            ''')
+            
+            if not tags_existed:
+                c.execute('SELECT id, tags FROM templates')
+                for template_id, tags_json in c.fetchall():
+                    self._save_tags(c, template_id, json.loads(tags_json) if tags_json else [])
+            
+            # Full-text index for search
+            self.fts_enabled = self._init_fts(c)
+    
+    def _migrate_row_key(self, c):
+        """
+        Rebuild a templates table keyed only by its TEXT id with a seq column
         
-        # Templates table
+        The implicit rowid of such a table may be renumbered by VACUUM,
+        which would desynchronize the full-text index; seq keeps the old
+        rowids and is an INTEGER PRIMARY KEY, so it never changes. The
+        index is dropped and rebuilt over the new table by _init_fts.
+        """
+        c.execute("DROP TABLE IF EXISTS templates_fts")
+        c.execute("CREATE TABLE templates_migrated " + _TEMPLATES_COLUMNS)
         c.execute('''
-            CREATE TABLE IF NOT EXISTS templates (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                code TEXT NOT NULL,
-                element_type TEXT NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT,
-                tags TEXT,
-                variables TEXT,
-                author TEXT,
-                is_public BOOLEAN,
-                rating REAL,
-                created_at TEXT,
-                updated_at TEXT,
-                use_count INTEGER DEFAULT 0
-            )
+            INSERT INTO templates_migrated
+            (seq, id, name, code, element_type, category, description, tags,
+             variables, author, is_public, rating, created_at, updated_at, use_count)
+            SELECT rowid, id, name, code, element_type, category, description, tags,
+                   variables, author, is_public, rating, created_at, updated_at, use_count
+            FROM templates
         ''')
+        # Dropping the old table also drops its indexes and triggers
+        c.execute("DROP TABLE templates")
+        c.execute("ALTER TABLE templates_migrated RENAME TO templates")
+    
+    def _init_fts(self, c) -> bool:
+        """
+        Create the FTS5 index over name, description and tags
         
-        # Create indexes
-        c.execute('''
-            CREATE INDEX IF NOT EXISTS idx_element_type ON templates(element_type)
-        ''')
+        The index stores no copy of the text (external content) and
+        triggers keep it in sync with the templates table through its
+        seq key; a database created before the index existed is indexed
+        once here.
         
-        c.execute('''
-            CREATE INDEX IF NOT EXISTS idx_category ON templates(category)
-        ''')
+        Returns:
+            False when SQLite is built without FTS5
+        """
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'templates_fts'")
+        existed = c.fetchone() is not None
+        try:
+            c.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS templates_fts USING fts5(
+                    name, description, tags,
+                    content='templates', content_rowid='seq', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return False
         
         c.execute('''
-            CREATE INDEX IF NOT EXISTS idx_author ON templates(author)
+            CREATE TRIGGER IF NOT EXISTS templates_fts_insert AFTER INSERT ON templates BEGIN
+                INSERT INTO templates_fts (rowid, name, description, tags)
+                VALUES (new.seq, new.name, new.description, new.tags);
+            END
         ''')
         
-        # User favorites table
         c.execute('''
-            CREATE TABLE IF NOT EXISTS favorites (
-                user_id TEXT NOT NULL,
-                template_id TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                PRIMARY KEY (user_id, template_id),
-                FOREIGN KEY (template_id) REFERENCES templates(id)
-            )
+            CREATE TRIGGER IF NOT EXISTS templates_fts_delete AFTER DELETE ON templates BEGIN
+                INSERT INTO templates_fts (templates_fts, rowid, name, description, tags)
+                VALUES ('delete', old.seq, old.name, old.description, old.tags);
+            END
         ''')
         
-        # Template ratings table
+        # Use count and rating updates leave the index alone
         c.execute('''
-            CREATE TABLE IF NOT EXISTS ratings (
-                user_id TEXT NOT NULL,
-                template_id TEXT NOT NULL,
-                rating INTEGER NOT NULL,
-                created_at TEXT NOT NULL,
-                PRIMARY KEY (user_id, template_id),
-                FOREIGN KEY (template_id) REFERENCES templates(id)
-            )
+            CREATE TRIGGER IF NOT EXISTS templates_fts_update
+            AFTER UPDATE OF name, description, tags ON templates BEGIN
+                INSERT INTO templates_fts (templates_fts, rowid, name, description, tags)
+                VALUES ('delete', old.seq, old.name, old.description, old.tags);
+                INSERT INTO templates_fts (rowid, name, description, tags)
+                VALUES (new.seq, new.name, new.description, new.tags);
+            END
         ''')
         
-        conn.commit()
-        conn.close()
+        if not existed:
+            c.execute("INSERT INTO templates_fts (templates_fts) VALUES ('rebuild')")
+        return True
     
     def save_template(self, template: Template) -> str:
         """
@@ -222,35 +438,45 @@ class TemplateEngine:
         Returns:
             Template ID
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        template.updated_at = datetime.now().isoformat()
-        
-        c.execute('''
-            INSERT OR REPLACE INTO templates 
-            (id, name, code, element_type, category, description, tags, 
-             variables, author, is_public, rating, created_at, updated_at, use_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            template.id,
-            template.name,
-            template.code,
-            template.element_type,
-            template.category,
-            template.description,
-            json.dumps(template.tags),
-            json.dumps(template.variables),
-            template.author,
-            template.is_public,
-            template.rating,
-            template.created_at,
-            template.updated_at,
-            template.use_count
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            template.updated_at = datetime.now().isoformat()
+            
+            # Update in place on conflict: a REPLACE would delete the row
+            # without firing the full-text index's delete trigger
+            c.execute('''
+                INSERT INTO templates 
+                (id, name, code, element_type, category, description, tags, 
+                 variables, author, is_public, rating, created_at, updated_at, use_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name, code = excluded.code,
+                    element_type = excluded.element_type, category = excluded.category,
+                    description = excluded.description, tags = excluded.tags,
+                    variables = excluded.variables, author = excluded.author,
+                    is_public = excluded.is_public, rating = excluded.rating,
+                    created_at = excluded.created_at, updated_at = excluded.updated_at,
+                    use_count = excluded.use_count
+            ''', (
+                template.id,
+                template.name,
+                template.code,
+                template.element_type,
+                template.category,
+                template.description,
+                json.dumps(template.tags),
+                json.dumps(template.variables),
+                template.author,
+                template.is_public,
+                template.rating,
+                template.created_at,
+                template.updated_at,
+                template.use_count
+            ))
+            
+            c.execute('DELETE FROM template_tags WHERE template_id = ?', (template.id,))
+            self._save_tags(c, template.id, template.tags)
         
         return template.id
     
@@ -264,18 +490,17 @@ class TemplateEngine:
         Returns:
             Template or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            SELECT id, name, code, element_type, category, description, tags,
-                   variables, author, is_public, rating, created_at, updated_at, use_count
-            FROM templates
-            WHERE id = ?
-        ''', (template_id,))
-        
-        row = c.fetchone()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                SELECT id, name, code, element_type, category, description, tags,
+                       variables, author, is_public, rating, created_at, updated_at, use_count
+                FROM templates
+                WHERE id = ?
+            ''', (template_id,))
+            
+            row = c.fetchone()
         
         if not row:
             return None
@@ -287,7 +512,8 @@ class TemplateEngine:
                       author: Optional[str] = None,
                       tags: Optional[List[str]] = None,
                       public_only: bool = True,
-                      limit: int = 50) -> List[Template]:
+                      limit: int = 50,
+                      match_all_tags: bool = False) -> List[Template]:
         """
         List templates with filters
         
@@ -295,59 +521,72 @@ class TemplateEngine:
             element_type: Filter by element type
             category: Filter by category
             author: Filter by author
-            tags: Filter by tags
+            tags: Filter by tags (templates having any of them)
             public_only: Only show public templates
             limit: Maximum number of templates
+            match_all_tags: Only keep templates having every tag
             
         Returns:
             List of templates
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        query = '''
-            SELECT id, name, code, element_type, category, description, tags,
-                   variables, author, is_public, rating, created_at, updated_at, use_count
-            FROM templates
-            WHERE 1=1
-        '''
-        params = []
-        
-        if element_type:
-            query += ' AND element_type = ?'
-            params.append(element_type)
-        
-        if category:
-            query += ' AND category = ?'
-            params.append(category)
-        
-        if author:
-            query += ' AND author = ?'
-            params.append(author)
-        
-        if public_only:
-            query += ' AND is_public = 1'
-        
-        query += ' ORDER BY rating DESC, use_count DESC, created_at DESC LIMIT ?'
-        params.append(limit)
-        
-        c.execute(query, params)
-        rows = c.fetchall()
-        conn.close()
-        
-        templates = [self._row_to_template(row) for row in rows]
-        
-        # Filter by tags if specified
-        if tags:
-            templates = [t for t in templates if any(tag in t.tags for tag in tags)]
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            query = '''
+                SELECT id, name, code, element_type, category, description, tags,
+                       variables, author, is_public, rating, created_at, updated_at, use_count
+                FROM templates
+                WHERE 1=1
+            '''
+            params = []
+            
+            if element_type:
+                query += ' AND element_type = ?'
+                params.append(element_type)
+            
+            if category:
+                query += ' AND category = ?'
+                params.append(category)
+            
+            if author:
+                query += ' AND author = ?'
+                params.append(author)
+            
+            if public_only:
+                query += ' AND is_public = 1'
+            
+            # Filter by tags before the limit, through the tag index
+            if tags:
+                tags = list(dict.fromkeys(tags))
+                query += f''' AND id IN (
+                    SELECT template_id FROM template_tags
+                    WHERE tag IN ({', '.join('?' * len(tags))})
+                '''
+                params.extend(tags)
+                if match_all_tags:
+                    query += ' GROUP BY template_id HAVING COUNT(*) = ?'
+                    params.append(len(tags))
+                query += ')'
+            
+            query += ' ORDER BY rating DESC, use_count DESC, created_at DESC LIMIT ?'
+            params.append(limit)
+            
+            c.execute(query, params)
+            rows = c.fetchall()
         
-        return templates
+        return [self._row_to_template(row) for row in rows]
     
     def search_templates(self, query: str, element_type: Optional[str] = None,
                         limit: int = 20) -> List[Template]:
         """
         Search templates by name, description, or tags
         
+        Every word of the query must match the start of a word in the
+        template ('lin bea' finds 'Lintel Beam'). Results are ranked by
+        bm25 relevance, with name matches weighing most and then tags,
+        boosted by rating and use count. Without FTS5, or for a query
+        without words, templates are matched by substring instead.
+        
         Args:
             query: Search query
             element_type: Filter by element type
@@ -356,28 +595,75 @@ class TemplateEngine:
         Returns:
             List of matching templates
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        search_query = '''
-            SELECT id, name, code, element_type, category, description, tags,
-                   variables, author, is_public, rating, created_at, updated_at, use_count
-            FROM templates
-            WHERE is_public = 1
-            AND (name LIKE ? OR description LIKE ? OR tags LIKE ?)
-        '''
-        params = [f'%{query}%', f'%{query}%', f'%{query}%']
-        
-        if element_type:
-            search_query += ' AND element_type = ?'
-            params.append(element_type)
+        match = self._fts_query(query) if self.fts_enabled else None
+        if match is None:
+            return self._search_like(query, element_type, limit)
         
-        search_query += ' ORDER BY rating DESC, use_count DESC LIMIT ?'
-        params.append(limit)
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            search_query = '''
+                SELECT t.id, t.name, t.code, t.element_type, t.category, t.description,
+                       t.tags, t.variables, t.author, t.is_public, t.rating,
+                       t.created_at, t.updated_at, t.use_count
+                FROM templates_fts
+                JOIN templates t ON t.seq = templates_fts.rowid
+                WHERE templates_fts MATCH ?
+                AND t.is_public = 1
+            '''
+            params = [match]
+            
+            if element_type:
+                search_query += ' AND t.element_type = ?'
+                params.append(element_type)
+            
+            # bm25 is negative, more so for better matches; the boost
+            # grows with rating (0-5) and saturates with use count
+            search_query += '''
+                ORDER BY bm25(templates_fts, 10.0, 2.0, 5.0) * (
+                    1.0 + COALESCE(t.rating, 0) / 5.0
+                    + COALESCE(t.use_count, 0) / (COALESCE(t.use_count, 0) + 10.0)
+                )
+                LIMIT ?
+            '''
+            params.append(limit)
+            
+            c.execute(search_query, params)
+            rows = c.fetchall()
         
-        c.execute(search_query, params)
-        rows = c.fetchall()
-        conn.close()
+        return [self._row_to_template(row) for row in rows]
+    
+    def _fts_query(self, query: str) -> Optional[str]:
+        """FTS5 query matching every word of a search query by prefix (None without words)"""
+        words = re.findall(r'\w+', query)
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+    
+    def _search_like(self, query: str, element_type: Optional[str],
+                     limit: int) -> List[Template]:
+        """Substring search scanning the templates table"""
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            search_query = '''
+                SELECT id, name, code, element_type, category, description, tags,
+                       variables, author, is_public, rating, created_at, updated_at, use_count
+                FROM templates
+                WHERE is_public = 1
+                AND (name LIKE ? OR description LIKE ? OR tags LIKE ?)
+            '''
+            params = [f'%{query}%', f'%{query}%', f'%{query}%']
+            
+            if element_type:
+                search_query += ' AND element_type = ?'
+                params.append(element_type)
+            
+            search_query += ' ORDER BY rating DESC, use_count DESC LIMIT ?'
+            params.append(limit)
+            
+            c.execute(search_query, params)
+            rows = c.fetchall()
         
         return [self._row_to_template(row) for row in rows]
     
@@ -391,16 +677,14 @@ class TemplateEngine:
         Returns:
             True if deleted successfully
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('DELETE FROM templates WHERE id = ?', (template_id,))
-        c.execute('DELETE FROM favorites WHERE template_id = ?', (template_id,))
-        c.execute('DELETE FROM ratings WHERE template_id = ?', (template_id,))
-        
-        deleted = c.rowcount > 0
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('DELETE FROM templates WHERE id = ?', (template_id,))
+            deleted = c.rowcount > 0
+            c.execute('DELETE FROM favorites WHERE template_id = ?', (template_id,))
+            c.execute('DELETE FROM ratings WHERE template_id = ?', (template_id,))
+            c.execute('DELETE FROM template_tags WHERE template_id = ?', (template_id,))
         
         return deleted
     
@@ -411,17 +695,14 @@ class TemplateEngine:
         Args:
             template_id: Template identifier
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            UPDATE templates
-            SET use_count = use_count + 1
-            WHERE id = ?
-        ''', (template_id,))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                UPDATE templates
+                SET use_count = use_count + 1
+                WHERE id = ?
+            ''', (template_id,))
     
     def add_favorite(self, user_id: str, template_id: str):
         """
@@ -431,16 +712,13 @@ class TemplateEngine:
             user_id: User identifier
             template_id: Template identifier
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            INSERT OR IGNORE INTO favorites (user_id, template_id, created_at)
-            VALUES (?, ?, ?)
-        ''', (user_id, template_id, datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                INSERT OR IGNORE INTO favorites (user_id, template_id, created_at)
+                VALUES (?, ?, ?)
+            ''', (user_id, template_id, datetime.now().isoformat()))
     
     def remove_favorite(self, user_id: str, template_id: str):
         """
@@ -450,16 +728,13 @@ class TemplateEngine:
             user_id: User identifier
             template_id: Template identifier
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            DELETE FROM favorites
-            WHERE user_id = ? AND template_id = ?
-        ''', (user_id, template_id))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                DELETE FROM favorites
+                WHERE user_id = ? AND template_id = ?
+            ''', (user_id, template_id))
     
     def get_favorites(self, user_id: str) -> List[Template]:
         """
@@ -471,21 +746,20 @@ class TemplateEngine:
         Returns:
             List of favorite templates
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            SELECT t.id, t.name, t.code, t.element_type, t.category, t.description,
-                   t.tags, t.variables, t.author, t.is_public, t.rating,
-                   t.created_at, t.updated_at, t.use_count
-            FROM templates t
-            JOIN favorites f ON t.id = f.template_id
-            WHERE f.user_id = ?
-            ORDER BY f.created_at DESC
-        ''', (user_id,))
-        
-        rows = c.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                SELECT t.id, t.name, t.code, t.element_type, t.category, t.description,
+                       t.tags, t.variables, t.author, t.is_public, t.rating,
+                       t.created_at, t.updated_at, t.use_count
+                FROM templates t
+                JOIN favorites f ON t.id = f.template_id
+                WHERE f.user_id = ?
+                ORDER BY f.created_at DESC
+            ''', (user_id,))
+            
+            rows = c.fetchall()
         
         return [self._row_to_template(row) for row in rows]
     
@@ -501,28 +775,25 @@ class TemplateEngine:
         if not 1 <= rating <= 5:
             raise ValueError("Rating must be between 1 and 5")
         
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Save user rating
-        c.execute('''
-            INSERT OR REPLACE INTO ratings (user_id, template_id, rating, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, template_id, rating, datetime.now().isoformat()))
-        
-        # Update template average rating
-        c.execute('''
-            SELECT AVG(rating) FROM ratings WHERE template_id = ?
-        ''', (template_id,))
-        
-        avg_rating = c.fetchone()[0]
-        
-        c.execute('''
-            UPDATE templates SET rating = ? WHERE id = ?
-        ''', (avg_rating, template_id))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            # Save user rating
+            c.execute('''
+                INSERT OR REPLACE INTO ratings (user_id, template_id, rating, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, template_id, rating, datetime.now().isoformat()))
+            
+            # Update template average rating
+            c.execute('''
+                SELECT AVG(rating) FROM ratings WHERE template_id = ?
+            ''', (template_id,))
+            
+            avg_rating = c.fetchone()[0]
+            
+            c.execute('''
+                UPDATE templates SET rating = ? WHERE id = ?
+            ''', (avg_rating, template_id))
     
     def get_categories(self, element_type: Optional[str] = None) -> List[Dict]:
         """
@@ -534,25 +805,24 @@ class TemplateEngine:
         Returns:
             List of categories with counts
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        query = '''
-            SELECT category, COUNT(*) as count
-            FROM templates
-            WHERE is_public = 1
-        '''
-        params = []
-        
-        if element_type:
-            query += ' AND element_type = ?'
-            params.append(element_type)
-        
-        query += ' GROUP BY category ORDER BY count DESC'
-        
-        c.execute(query, params)
-        rows = c.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            
+            query = '''
+                SELECT category, COUNT(*) as count
+                FROM templates
+                WHERE is_public = 1
+            '''
+            params = []
+            
+            if element_type:
+                query += ' AND element_type = ?'
+                params.append(element_type)
+            
+            query += ' GROUP BY category ORDER BY count DESC'
+            
+            c.execute(query, params)
+            rows = c.fetchall()
         
         return [{'category': row[0], 'count': row[1]} for row in rows]
     
@@ -615,8 +885,15 @@ class TemplateEngine:
         
         return template
     
+    def _save_tags(self, c, template_id: str, tags: List[str]):
+        """Insert the tag rows of a template"""
+        c.executemany(
+            'INSERT OR IGNORE INTO template_tags (tag, template_id) VALUES (?, ?)',
+            [(str(tag), template_id) for tag in tags]
+        )
+    
     def _row_to_template(self, row) -> Template:
-        """Convert database row to Template object"""
+        """Convert database row to Template object (tags are decoded on first use)"""
         return Template.from_dict({
             'id': row[0],
             'name': row[1],
@@ -624,7 +901,7 @@ class TemplateEngine:
             'element_type': row[3],
             'category': row[4],
             'description': row[5],
-            'tags': json.loads(row[6]) if row[6] else [],
+            'tags': row[6],
             'variables': json.loads(row[7]) if row[7] else {},
             'author': row[8],
             'is_public': bool(row[9]),